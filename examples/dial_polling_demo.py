@@ -42,7 +42,7 @@ async def main():
             wasAnswered = True
             print('Call has been answered; waiting a while...')
             # Wait for a bit - some older modems struggle to send DTMF tone immediately after answering a call
-            asyncio.sleep(3.0)
+            await asyncio.sleep(3.0)
             print('Playing DTMF tones...')
             try:
                 if call.active: # Call could have been ended by remote party while we waited in the time.sleep() call
@@ -60,7 +60,7 @@ async def main():
                     print('Call has been ended by remote party')
         else:
             # Wait a bit and check again
-            asyncio.sleep(0.5)
+            await asyncio.sleep(0.5)
     if not wasAnswered:
         print('Call was not answered by remote party')
     print('Closing modem...')
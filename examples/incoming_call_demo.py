@@ -29,7 +29,7 @@ async def handleIncomingCall(call: IncomingCall):
             print('Answering call and playing some DTMF tones...')
             await call.answer()
             # Wait for a bit - some older modems struggle to send DTMF tone immediately after answering a call
-            asyncio.sleep(2.0)
+            await asyncio.sleep(2.0)
             try:
                 await call.sendDtmfTone('9515999955951')
             except InterruptedException as e:
@@ -54,7 +54,7 @@ async def main():
     await modem.connect(PIN)
     print('Waiting for incoming calls... [ctrl-c to exit]')
     try:
-        asyncio.sleep(60*60) # you have an hour to receive the call
+        await asyncio.sleep(60*60) # you have an hour to receive the call
     finally:
         print('Closing modem...')
         await modem.close()
@@ -31,13 +31,14 @@ async def main():
     logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.DEBUG)
     modem = GsmModem(PORT, BAUDRATE, smsReceivedCallbackFunc=handleSms)
     modem.smsTextMode = False
-    modem.connect(PIN)
+    await modem.connect(PIN)
     print('Waiting for SMS message...')
     try:
-        modem.rxThread.join(2**31) # Specify a (huge) timeout so that it essentially blocks indefinitely, but still receives CTRL+C interrupt signal
+        # Wait without blocking the event loop, so received messages still get handled - CTRL+C exits
+        await asyncio.Event().wait()
     finally:
         print('Closing modem...')
         await modem.close()
 
 if __name__ == '__main__':
-    asyncio.main()
+    asyncio.run(main())
@@ -145,13 +145,15 @@ class GsmModem(SerialComms):
     CDSI_REGEX = re.compile('\+CDSI:\s*"([^"]+)",(\d+)$')
     CDS_REGEX  = re.compile('\+CDS:\s*([0-9]+)"$')
 
-    def __init__(self, port, baudrate=115200, incomingCallCallbackFunc=None, smsReceivedCallbackFunc=None, smsStatusReportCallback=None, requestDelivery=True, AT_CNMI="", *a, **kw):
+    def __init__(self, port, baudrate=115200, incomingCallCallbackFunc=None, smsReceivedCallbackFunc=None, smsStatusReportCallback=None, requestDelivery=True, AT_CNMI="", *a, fastInit=False, **kw):
         super(GsmModem, self).__init__(port, baudrate, notifyCallbackFunc=self._handleModemNotification, *a, **kw)
         self.incomingCallCallback = incomingCallCallbackFunc or self._placeholderCallback
         self.smsReceivedCallback = smsReceivedCallbackFunc or self._placeholderCallback
         self.smsStatusReportCallback = smsStatusReportCallback or self._placeholderCallback
         self.requestDelivery = requestDelivery
         self.AT_CNMI = AT_CNMI or "2,1,0,2"
+        # Whether connect() tries to set the SMS storage and notifications in a single (chained) command line
+        self.fastInit = fastInit
         # Flag indicating whether caller ID for incoming call notification has been set up
         self._callingLineIdentification = False
         # Flag indicating whether incoming call notifications have extended information
@@ -164,6 +166,7 @@ class GsmModem(SerialComms):
         self._ussdResponse = None # gsmmodem.modem.Ussd
         self._smsStatusReportEvent = None # asyncio.Event
         self._dialEvent = None # asyncio.Event
+        self._callStatusPollInterval = 0.5 # Seconds between call status polls (for modems without call status update notifications)
         self._dialResponse = None # gsmmodem.modem.Call
         self._waitForAtdResponse = True # Flag that controls if we should wait for an immediate response to ATD, or not
         self._waitForCallInitUpdate = True # Flag that controls if we should wait for a ATD "call initiated" message
@@ -171,6 +174,7 @@ class GsmModem(SerialComms):
         self._mustPollCallStatus = False # whether or not the modem must be polled for outgoing call status updates
         self._pollCallStatusRegex = None # Regular expression used when polling outgoing call status
         self._writeWait = 0 # Time (in seconds to wait after writing a command (adjusted when 515 errors are detected)
+        self._simBusyRetryDelay = 0.2 # Time (in seconds) added to self._writeWait each time a command is retried after a 515/14 (busy) error
         self._smsTextMode = False # Storage variable for the smsTextMode property
         self._gsmBusy = 0 # Storage variable for the GSMBUSY property
         self._smscNumber = None # Default SMSC number
@@ -317,7 +321,7 @@ class GsmModem(SerialComms):
             self._waitForAtdResponse = False # ZTE modems do not return an immediate  OK only when the call is answered
             self._mustPollCallStatus = False
             self._waitForCallInitUpdate = False # ZTE modems do not provide "call initiated" updates
-            if not self.commands: # ZTE uses standard +VTS for DTMF
+            if not self._commands: # ZTE uses standard +VTS for DTMF
                 Call.dtmfSupport = True
         else:
             # Unknown modem - we do not know what its call updates look like. Use polling instead
@@ -348,6 +352,8 @@ class GsmModem(SerialComms):
         if currentSmscNumber != None and (await self.smsc()) != currentSmscNumber:
             await self.smsc(currentSmscNumber)
 
+        # Set when message notifications got set up along with the message storage
+        cnmiSet = False
         # Set message storage, but first check what the modem supports - example response: +CPMS: (("SM","BM","SR"),("SM"))
         try:
             cpmsLine = lineStartingWith('+CPMS', await self.write('AT+CPMS=?'))
@@ -375,11 +381,22 @@ class GsmModem(SerialComms):
                                 self._smsMemReadDelete = memType
                             cpmsItems[i] = memType
                             break
-                await self.write('AT+CPMS={0}'.format(','.join(cpmsItems))) # Set message storage
+                cpmsCommand = 'AT+CPMS={0}'.format(','.join(cpmsItems))
+                if self.fastInit:
+                    # Set message storage and notifications in one round trip
+                    try:
+                        await self.write('{0};+CNMI={1}'.format(cpmsCommand, self.AT_CNMI))
+                    except CommandError:
+                        # Chained command lines (or one of the settings) not supported - set them one at a time
+                        await self.write(cpmsCommand)
+                    else:
+                        cnmiSet = True
+                else:
+                    await self.write(cpmsCommand) # Set message storage
             del cpmsSupport
             del cpmsLine
 
-        if self._smsReadSupported:
+        if self._smsReadSupported and not cnmiSet:
             try:
                 await self.write('AT+CNMI=' + self.AT_CNMI)  # Set message notifications
             except CommandError:
@@ -471,7 +488,7 @@ class GsmModem(SerialComms):
                         if errorCode == 515 or errorCode == 14:
                             # 515 means: "Please wait, init or command processing in progress."
                             # 14 means "SIM busy"
-                            self._writeWait += 0.2 # Increase waiting period temporarily
+                            self._writeWait += self._simBusyRetryDelay # Increase waiting period temporarily
                             # Retry the command after waiting a bit
                             self.log.debug('Device/SIM busy error detected; self._writeWait adjusted to %fs', self._writeWait)
                             await asyncio.sleep(self._writeWait)
@@ -871,7 +888,8 @@ class GsmModem(SerialComms):
             try:
                 encodedText = encodeTextMode(text)
             except ValueError:
-                self._smsTextMode = False
+                # not representable in text mode - switch the modem to PDU mode, not just our idea of its mode
+                await self.smsTextMode(False)
 
         if self._smsTextMode:
             # Send SMS via AT commands
@@ -917,11 +935,10 @@ class GsmModem(SerialComms):
         self.sentSms[reference] = sms
         if waitForDeliveryReport:
             self._smsStatusReportEvent = asyncio.Event()
-            future = self._smsStatusReportEvent.wait()
             try:
-                future.result(deliveryTimeout)
+                await asyncio.wait_for(self._smsStatusReportEvent.wait(), deliveryTimeout)
                 self._smsStatusReportEvent = None
-            except TimeoutError:
+            except asyncio.TimeoutError:
                 self._smsStatusReportEvent = None
                 raise TimeoutException()
         return sms
@@ -954,12 +971,11 @@ class GsmModem(SerialComms):
         # Wait for the +CUSD notification message
         try:
             self._log.debug(f"Waiting for ussd session event {self._ussdSessionEvent}")
-            await self._ussdSessionEvent.wait()
-            # await asyncio.wait_for(self._ussdSessionEvent.wait(), responseTimeout)
+            await asyncio.wait_for(self._ussdSessionEvent.wait(), responseTimeout)
             self._log.debug(f"Awaited ussd session event!")
             self._ussdSessionEvent = None
             return self._ussdResponse
-        except TimeoutError:
+        except asyncio.TimeoutError:
             self._log.debug(f"Timeout ussd session event {self._ussdSessionEvent}")
             self._ussdSessionEvent = None
             raise TimeoutException()
@@ -1025,15 +1041,14 @@ class GsmModem(SerialComms):
                 self._pollCallStatus(expectedState=0, timeout=timeout)
             )
 
-        future = self._dialEvent.wait()
         try:
-            future.result(timeout)
+            await asyncio.wait_for(self._dialEvent.wait(), timeout)
             self._dialEvent = None
             callId, callType = self._dialResponse
             call = Call(self, callId, callType, number, callStatusUpdateCallbackFunc)
             self.activeCalls[callId] = call
             return call
-        except TimeoutError:
+        except asyncio.TimeoutError:
             self._dialEvent = None
             raise TimeoutException()
 
@@ -1155,22 +1170,32 @@ class GsmModem(SerialComms):
     async def _handleModemNotification(self, lines):
         """ Handler for unsolicited notifications from the modem
 
+        Handles every notification in lines - a single read can contain several of them (e.g. two +CMTI indications)
+
         :param lines The lines that were read
         """
+        handled = False
         next_line_is_te_statusreport = False
-        for line in lines:
+        notification, lines = lines, list(lines)
+        while lines:
+            line = lines[0]
             if 'RING' in line:
-                # Incoming call (or existing call is ringing)
-                return await self._handleIncomingCall(lines)
-            elif line.startswith('+CMTI'):
-                # New SMS message indication
-                return await self._handleSmsReceived(line)
+                # Incoming call (or existing call is ringing); takes the RING line and the +CLIP line after it (if any) off lines
+                await self._handleIncomingCall(lines)
+                handled = True
+                continue
             elif line.startswith('+CUSD'):
-                # USSD notification - either a response or a MT-USSD ("push USSD") message
-                return await self._handleUssd(lines)
+                # USSD notification - either a response or a MT-USSD ("push USSD") message; its message can span
+                # several lines (and some modems issue more than one +CUSD), so it takes the rest of the lines
+                await self._handleUssd(lines)
+                return
+            lines.pop(0)
+            if line.startswith('+CMTI'):
+                # New SMS message indication
+                await self._handleSmsReceived(line)
             elif line.startswith('+CDSI'):
                 # SMS status report
-                return await self._handleSmsStatusReport(line)
+                await self._handleSmsStatusReport(line)
             elif line.startswith('+CDS'):
                 # SMS status report at next line
                 next_line_is_te_statusreport = True
@@ -1179,20 +1204,26 @@ class GsmModem(SerialComms):
                     next_line_is_te_statusreport_length = int(cdsMatch.group(1))
                 else:
                     next_line_is_te_statusreport_length = -1
+                continue
             elif next_line_is_te_statusreport:
-                return await self._handleSmsStatusReportTe(next_line_is_te_statusreport_length, line)
+                next_line_is_te_statusreport = False
+                await self._handleSmsStatusReportTe(next_line_is_te_statusreport_length, line)
             elif line.startswith('+DTMF'):
                 # New incoming DTMF
-                return await self._handleIncomingDTMF(line)
+                await self._handleIncomingDTMF(line)
             else:
                 # Check for call status updates
                 for updateRegex, handlerFunc in self._callStatusUpdates:
                     match = updateRegex.match(line)
                     if match:
                         # Handle the update
-                        return await handlerFunc(match)
-        # If this is reached, the notification wasn't handled
-        self.log.debug('Unhandled unsolicited modem notification: %s', lines)
+                        await handlerFunc(match)
+                        break
+                else:
+                    continue
+            handled = True
+        if not handled:
+            self.log.debug('Unhandled unsolicited modem notification: %s', notification)
 
     #Simcom modem able detect incoming DTMF
     async def _handleIncomingDTMF(self,line):
@@ -1299,8 +1330,9 @@ class GsmModem(SerialComms):
                             callId = call.id
                             break
         if callId and callId in self.activeCalls:
-            self.activeCalls[callId].answered = False
+            # mark the call inactive first, so the status update callback (triggered by "answered") sees the ended call
             self.activeCalls[callId].active = False
+            self.activeCalls[callId].answered = False
             del self.activeCalls[callId]
 
     async def _handleCallRejected(self, regexMatch, callId=None):
@@ -1531,9 +1563,9 @@ class GsmModem(SerialComms):
         callDone = False
         timeout = timeout or 999999
         while not callDone and timeout > 0:
-            await asyncio.sleep(0.5)
+            await asyncio.sleep(self._callStatusPollInterval)
             if expectedState == 0: # Only initiated call can timeout
-                timeout -= 0.5
+                timeout -= self._callStatusPollInterval
             try:
                 clcc = self._pollCallStatusRegex.match((await self.write('AT+CLCC'))[0])
             except TimeoutException:
@@ -4,7 +4,7 @@
 
 from __future__ import unicode_literals
 
-import sys, codecs
+import sys
 from datetime import datetime, timedelta, tzinfo
 from copy import copy
 from .exceptions import EncodingError
@@ -13,7 +13,7 @@ MAX_INT = sys.maxsize
 dictItemsIter = dict.items
 xrange = range
 unichr = chr
-toByteArray = lambda x: bytearray(codecs.decode(x, 'hex_codec')) if type(x) == bytes else bytearray(codecs.decode(bytes(x, 'ascii'), 'hex_codec')) if type(x)  == str else x
+toByteArray = lambda x: bytearray.fromhex(x) if type(x) == str else bytearray.fromhex(x.decode('ascii')) if type(x) == bytes else x
 rawStrToByteArray = lambda x: bytearray(bytes(x, 'latin-1'))
 
 TEXT_MODE = ('\n\r !\"#%&\'()*+,-./0123456789:;<=>?ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz') # TODO: Check if all of them are supported inside text mode
@@ -238,7 +238,7 @@ class Pdu(object):
         self.tpduLength = tpduLength
 
     def __str__(self):
-        return str(self.data).encode('hex').upper()
+        return self.data.hex().upper()
 
 
 def encodeSmsSubmitPdu(number, text, reference=0, validity=None, smsc=None, requestStatusReport=True, rejectDuplicates=False, sendFlash=False):
@@ -382,7 +382,7 @@ def decodeSmsPdu(pdu):
     try:
         pdu = toByteArray(pdu)
     except Exception as e:
-        # Python 2 raises TypeError, Python 3 raises binascii.Error
+        # non-hex (or odd-length) data raises ValueError, non-ASCII bytes UnicodeDecodeError
         raise EncodingError(e)
     result = {}
     pduIter = iter(pdu)
@@ -656,7 +656,7 @@ def decodeSemiOctets(encodedNumber, numberOfOctets=None):
     """
     number = []
     if type(encodedNumber) in (str, bytes):
-        encodedNumber = bytearray(codecs.decode(encodedNumber, 'hex_codec'))
+        encodedNumber = toByteArray(encodedNumber)
     i = 0
     for octet in encodedNumber:
         hexVal = hex(octet)[2:].zfill(2)
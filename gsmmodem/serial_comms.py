@@ -2,17 +2,23 @@
 
 """ Low-level serial communications handling """
 
-import copy
 import logging
-import re
 import asyncio
-import traceback
 import serial_asyncio_fast # https://github.com/home-assistant-libs/pyserial-asyncio-fast
 import threading
 
 from .exceptions import TimeoutException
 
 
+def _is_response_term(line):
+    """ Checks whether the line terminates a command response (OK, ERROR, +CME/+CMS ERROR: <code> or COMMAND NOT SUPPORT) """
+    if line.startswith(('OK', 'ERROR')) or line == 'COMMAND NOT SUPPORT':
+        return True
+    if line.startswith(('+CME ERROR: ', '+CMS ERROR: ')):
+        return line[12:13].isdigit()
+    return False
+
+
 class SerialComms():
     """ Wraps all low-level serial communications (actual read/write operations) """
 
@@ -36,21 +42,27 @@ class SerialComms():
     _writer = None
     # reading task
     _reading_task = None
+    # event loop of the serial thread, set while connected
+    _loop = None
     # let's go! flag
     _started_lock = threading.Lock()
     _started = None
-    _ended = None
 
     # End-of-line read terminator
     RX_EOL_SEQ = b'\r\n'
-    # End-of-response terminator
-    RESPONSE_TERM = re.compile('^OK|ERROR|(\+CM[ES] ERROR: \d+)|(COMMAND NOT SUPPORT)$')
+    # Maximum number of bytes to read from the device at once
+    RX_CHUNK_SIZE = 4096
+    # Number of written bytes after which the writer is drained
+    TX_HIGH_WATER = 16 * 1024
 
-    def __init__(self, port, baudrate=115200, notifyCallbackFunc=None, fatalErrorCallbackFunc=None, *args, **kwargs):
+    def __init__(self, port, baudrate=115200, notifyCallbackFunc=None, fatalErrorCallbackFunc=None, *args, lowLatency=False, **kwargs):
         """ Constructor
 
         :param fatalErrorCallbackFunc: function to call if a fatal error occurs in the serial device reading thread
         :type fatalErrorCallbackFunc: func
+        :param lowLatency: put the serial port into low latency mode once it is opened (if the platform/driver supports it);
+                           cuts the response time of USB serial adapters that otherwise hold back received data for several milliseconds
+        :type lowLatency: bool
         """
         self._log.debug(f"Initializing serial on {port}")
         # serial port
@@ -61,9 +73,16 @@ class SerialComms():
         self._notificationCallback = notifyCallbackFunc
         # callback for fatal errors
         self._fatalErrorCallback = fatalErrorCallbackFunc
+        # whether to switch the port to low latency mode when opening it
+        self._lowLatency = lowLatency
         # additional arguments for opening serial port
         self._com_args = args
         self._com_kwargs = kwargs
+        # per-instance receive and notification buffers (the class-level defaults are shared)
+        self._rxBuffer = bytearray()
+        self._notification = []
+        # bytes written since the writer was last drained
+        self._txPending = 0
 
     def _init_response_queue(self):
         if not self._responseQueue:
@@ -73,7 +92,7 @@ class SerialComms():
         if self._response is not None:
             # a response has been requested on write
             self._response.append(line)
-            if not checkForResponseTerm or self.RESPONSE_TERM.match(line):
+            if not checkForResponseTerm or _is_response_term(line):
                 self._init_response_queue()
                 self._responseQueue.put_nowait(self._response)
                 self._response = None
@@ -82,115 +101,191 @@ class SerialComms():
             self._notification.append(line)
 
     def _read(self, data):
-        self._log.debug(f"Read [{self._port}]: {data.decode().strip()}")
-        self._rxBuffer += data
-        lines = self._rxBuffer.split(self.RX_EOL_SEQ)
-        for line in lines[:-1]:
-            self._handle_line(line.decode(), not (self._expectResponseTermSeq == line))
-        self._rxBuffer = lines[-1]
+        self._log.debug('Read [%s]: %s', self._port, data)
+        # local aliases for the per-line loop
+        rxBuffer = self._rxBuffer
+        eol = self.RX_EOL_SEQ
+        rxBuffer += data
+        end = rxBuffer.rfind(eol)
+        if end >= 0:
+            # copy all complete lines out at once, then split them in a single pass
+            with memoryview(rxBuffer) as view:
+                complete = bytes(view[:end])
+            del rxBuffer[:end + len(eol)]
+            handleLine = self._handle_line
+            expectedTermSeq = self._expectResponseTermSeq
+            for line in complete.split(eol):
+                handleLine(line.decode(), not (expectedTermSeq == line))
         if not self._rxBuffer and self._notification:
             # nothing else waiting for this notification
-            self._log.debug('Notification: %s', self._notification)
+            # hand the collected lines over as-is and start a fresh list (no copy needed)
+            notification, self._notification = self._notification, []
+            self._log.debug('Notification: %s', notification)
             if self._notificationCallback:
-                asyncio.run_coroutine_threadsafe(self._notificationCallback(copy.copy(self._notification)), self._modem_loop)
-            self._notification = []
+                self._dispatchCallback(self._notificationCallback, notification)
+
+    def _dispatchCallback(self, callback, arg):
+        """ Hands arg over to callback, on the caller's loop if connect() was called from one """
+        if self._modem_loop is not None:
+            asyncio.run_coroutine_threadsafe(callback(arg), self._modem_loop)
+        else:
+            # no caller loop (synchronous caller, e.g. GSMTerm): call it right here in the serial thread
+            result = callback(arg)
+            if asyncio.iscoroutine(result):
+                self._loop.create_task(result)
 
     def _init_started(self):
         # self._log.debug(f'init_started: {self._started}')
         with self._started_lock:
             if self._started is None:
                 self._started = asyncio.Event()
-                self._ended = threading.Event()
 
     async def _open(self):
         """ Opens serial communication with the device """
         self._log.debug(f"Opening [{self._port}]")
         self._init_started()
-        self._reader, self._writer = await serial_asyncio_fast.open_serial_connection(
-            loop=self._loop, url=self._port, baudrate=self._baudrate,
-            *self._com_args,**self._com_kwargs
-        )
-        self._started.set()
+        try:
+            self._reader, self._writer = await serial_asyncio_fast.open_serial_connection(
+                loop=self._loop, url=self._port, baudrate=self._baudrate,
+                *self._com_args,**self._com_kwargs
+            )
+        finally:
+            # set even if opening failed, so _close() never waits for an open that won't complete
+            self._started.set()
+        if self._lowLatency:
+            try:
+                self._writer.transport.serial.set_low_latency_mode(True)
+            except (AttributeError, NotImplementedError, OSError, ValueError) as e:
+                # not a local serial port, or the platform/driver doesn't support it - carry on as normal
+                self._log.debug('Low latency mode not available on %s: %s', self._port, e)
+        # a single long-lived reading task; chunks may hold several (or partial) lines
+        self._reading_task = asyncio.current_task()
+        # local aliases for the reading loop
+        read = self._reader.read
+        chunkSize = self.RX_CHUNK_SIZE
+        handleData = self._read
         while True:
-            # self._reading_task = self._reader.readuntil(self.RX_EOL_SEQ)
             try:
-                self._reading_task = asyncio.ensure_future(self._reader.readuntil(self.RX_EOL_SEQ))
-                # self._log.debug(f"Reading task await")
-                r = await self._reading_task
-                # self._log.debug(f"Reading task result = {r}")
-                self._read(r)
+                data = await read(chunkSize)
+                if not data:
+                    raise EOFError('Serial device closed')
+                handleData(data)
             except asyncio.CancelledError:
                 self._log.debug(f"Reading task CancelledError")
                 break
             except Exception as e:
-                self._log.debug(f"Serial error: {e}")
-                self._log.debug(traceback.format_exc())
+                # the traceback only gets formatted if the record is actually emitted
+                self._log.debug('Serial error: %s', e, exc_info=True)
                 if self._fatalErrorCallback:
-                    asyncio.run_coroutine_threadsafe(self._fatalErrorCallback(e), self._modem_loop)
+                    self._dispatchCallback(self._fatalErrorCallback, e)
                 break
-            self._reading_task = None
         self._log.debug(f"Finished [{self._port}]")
 
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, excType, excValue, traceback):
+        await self.close()
+
     async def close(self):
-        """ Closes serial communication with the device """
+        """ Closes serial communication with the device (does nothing if it isn't connected) """
+        loop = self._loop
+        if loop is None:
+            self._log.debug(f"Not connected [{self._port}]")
+            return
         self._log.debug('Closing the device')
-        asyncio.run_coroutine_threadsafe(self._close(), self._loop)
+        future = asyncio.run_coroutine_threadsafe(self._close(), loop)
         self._log.debug('Waiting for cleanup of the device')
-        self._ended.wait()
+        # await rather than block, so the caller's loop keeps running meanwhile
+        await asyncio.wrap_future(future)
+        # stopped only now, so the future above still gets its result
+        loop.call_soon_threadsafe(loop.stop)
         self._log.debug('Device cleaned up')
 
     async def _close(self):
+        if self._started is not None:
+            # closing right after connect(): let the device finish opening first, or it would be left open
+            await self._started.wait()
         if self._reading_task:
             self._log.debug(f"Closing writer")
             self._writer.close()
             self._log.debug(f"Cancelling reading task")
             self._reading_task.cancel()
-            # sleep for _reading_task to get cancelled
-            while not self._reading_task.cancelled():
-                await asyncio.sleep(0)
+            # wait for _reading_task to unwind
+            try:
+                await self._reading_task
+            except (asyncio.CancelledError, Exception):
+                pass
             self._log.debug(f"Reading task {'is' if self._reading_task.cancelled() else 'not'} cancelled")
         else:
             self._log.debug(f"Nothing to close [{self._port}]")
-        if self._loop:
-            self._log.debug("Stopping the loop")
-            self._loop.stop()
-            self._log.debug("Loop stopped")
         self._reading_task = None
         self._reader = None
         self._writer = None
         self._loop = None
-        self._ended.set()
 
     async def write(self, data, waitForResponse=True, timeout=5, expectedResponseTermSeq=None):
         """ Writes data to serial device """
         # self._log.debug(f"write [{self._port}]: {data}")
-        future = asyncio.run_coroutine_threadsafe(self._write(data, waitForResponse, expectedResponseTermSeq), self._loop)
-        try:
-            return future.result(timeout)
-        except TimeoutError:
-            with self._expectResponseTermSeq_lock:
-                self._expectResponseTermSeq = None
-            raise TimeoutException()
+        # await rather than block, so the caller's loop keeps running meanwhile
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._write(data, waitForResponse, expectedResponseTermSeq, timeout), self._loop))
 
-    async def _write(self, data, waitForResponse, expectedResponseTermSeq):
+    async def _write(self, data, waitForResponse, expectedResponseTermSeq, timeout=None):
         """ Writes data to serial device """
         self._log.debug(f"_write [{self._port}]: {str(data).strip()} -> expecting ({waitForResponse}) {expectedResponseTermSeq}")
-        self._init_started()
-        await self._started.wait()
-        if waitForResponse:
-            if expectedResponseTermSeq:
+        timer = None
+        timedOut = False
+        if timeout is not None:
+            # time out by cancelling this task from a timer - unlike asyncio.wait_for(), no extra waiter
+            # future and callbacks for every command
+            task = asyncio.current_task()
+            def onTimeout():
+                nonlocal timedOut
+                timedOut = True
+                task.cancel()
+            timer = asyncio.get_running_loop().call_later(timeout, onTimeout)
+        try:
+            self._init_started()
+            await self._started.wait()
+            if waitForResponse:
+                if expectedResponseTermSeq:
+                    with self._expectResponseTermSeq_lock:
+                        self._expectResponseTermSeq = bytearray(expectedResponseTermSeq.encode())
+                self._response = []
+            if self._writer:
+                data = data.encode()
+                self._writer.write(data)
+                # rely on the transport's buffering; only wait for it to flush when a lot is pending
+                self._txPending += len(data)
+                if self._txPending > self.TX_HIGH_WATER:
+                    self._txPending = 0
+                    await self._writer.drain()
+            if waitForResponse:
+                self._init_response_queue()
+                response = await self._responseQueue.get()
+                with self._expectResponseTermSeq_lock:
+                    self._expectResponseTermSeq = None
+                return response
+        except asyncio.CancelledError:
+            response = None
+            if waitForResponse:
+                # stop collecting the response here on the serial loop, so anything arriving later is handled as a
+                # notification instead of ending up in the next command's response
+                response, self._response = self._response, None
+                # the complete response may have been queued just as the task got cancelled - take it out, or the
+                # next command would get it instead of its own
+                while self._responseQueue is not None and not self._responseQueue.empty():
+                    response = self._responseQueue.get_nowait()
                 with self._expectResponseTermSeq_lock:
-                    self._expectResponseTermSeq = bytearray(expectedResponseTermSeq.encode())
-            self._response = []
-        if self._writer:
-            self._writer.write(data.encode())
-            await self._writer.drain()
-        if waitForResponse:
-            self._init_response_queue()
-            response = await self._responseQueue.get()
-            with self._expectResponseTermSeq_lock:
-                self._expectResponseTermSeq = None
-            return response
+                    self._expectResponseTermSeq = None
+            if not timedOut:
+                # cancelled by the caller
+                raise
+            # pass on whatever was read before timing out (e.g. Wavecom modems don't end +CPIN responses with OK)
+            raise TimeoutException(list(response) if response else None) from None
+        finally:
+            if timer is not None:
+                timer.cancel()
 
     def connect(self):
         """ Start serial communication in another thead """
@@ -201,8 +296,14 @@ class SerialComms():
             loop.run_forever()
             self._log.debug('Thread SerialComms finished')
 
-        self._modem_loop = asyncio.get_event_loop()
+        try:
+            # loop of the caller, used for dispatching callbacks
+            self._modem_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # called from synchronous code (e.g. GSMTerm): callbacks run in the serial thread instead
+            self._modem_loop = None
         self._loop = asyncio.new_event_loop()
-        threading.Thread(target=lambda: theloop(self._loop)).start()
+        # daemon thread: a modem that was never closed must not keep the interpreter alive
+        threading.Thread(target=theloop, args=(self._loop,), name='SerialComms', daemon=True).start()
         asyncio.run_coroutine_threadsafe(self._open(), self._loop)
         self._log.debug('Serial started')
@@ -4,6 +4,7 @@
 """ Some common utility classes used by tests """
 
 from datetime import datetime, timedelta, tzinfo
+from functools import cached_property
 import re
 
 class SimpleOffsetTzInfo(tzinfo):    
@@ -23,6 +24,13 @@ class SimpleOffsetTzInfo(tzinfo):
     
     def dst(self, dt):
         return timedelta(0)
+
+    @cached_property
+    def textModeTzStr(self):
+        """ The timezone offset as used in SMS text mode time strings: a sign followed by (at least) two digits,
+        in quarters of an hour - e.g. "+08" for 2 hours (see parseTextModeTimeStr()) """
+        quarterHours = int(self.offsetInHours * 4)
+        return '{0}{1:0>2}'.format('-' if quarterHours < 0 else '+', abs(quarterHours))
     
     def __repr__(self):
         return 'gsmmodem.util.SimpleOffsetTzInfo({0})'.format(self.offsetInHours)
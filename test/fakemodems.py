@@ -1,6 +1,7 @@
 """ Module containing fake modem descriptors, for testing """
 
 import abc
+from collections import ChainMap
 from copy import copy
 
 class FakeModem(object):
@@ -43,10 +44,21 @@ class FakeModem(object):
                 return ['+CSCA: "{0}",145\r\n'.format(self.smscNumber), 'OK\r\n']
             else:
                 return ['OK\r\n']
-        if cmd in self.responses:
-            return copy(self.responses[cmd])
-        else:
-            return copy(self.defaultResponse)
+        return copy(self.responses.get(cmd, self.defaultResponse))
+
+    @classmethod
+    def clone(cls, responses=None):
+        """ Returns a fresh instance of this modem profile, copied from a template that is only built once per class
+
+        :param responses: Responses (by command) to override in the clone, if any
+        """
+        template = cls.__dict__.get('_template') # not inherited: each profile class gets its own
+        if template is None:
+            template = cls._template = cls()
+        modem = copy(template)
+        # tests override responses, so each clone layers its own dict over the template's shared one
+        modem.responses = ChainMap(dict(responses) if responses else {}, template.responses)
+        return modem
 
     @property
     def pinLock(self):
@@ -595,4 +607,4 @@ modemClasses = [HuaweiK3715, HuaweiE1752, WavecomMultiband900E1800, QualcommM628
 
 
 def createModems():
-    return [modem() for modem in modemClasses]
+    return [modem.clone() for modem in modemClasses]
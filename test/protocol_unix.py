@@ -0,0 +1,48 @@
+""" pySerial URL handler for unix:///path/to/socket ports, used to reach the mock modem during tests """
+
+import socket
+import urllib.parse as urlparse
+
+from serial.serialutil import SerialException
+from serial.urlhandler import protocol_socket
+
+
+class Serial(protocol_socket.Serial):
+    """ Same as pySerial's socket:// handler, but connects to a unix domain socket instead of TCP """
+
+    def open(self):
+        self.logger = None
+        if self._port is None:
+            raise SerialException("Port must be configured before it can be used.")
+        if self.is_open:
+            raise SerialException("Port is already open.")
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._socket.connect(self.from_url(self.portstr))
+        except OSError as e:
+            self._socket.close()
+            self._socket = None
+            raise SerialException("Could not open port {}: {}".format(self.portstr, e))
+        self._socket.setblocking(False)
+        self.is_open = True
+        self.reset_input_buffer()
+        self.reset_output_buffer()
+
+    def close(self):
+        # no TIME_WAIT to wait out for unix domain sockets
+        if self.is_open:
+            if self._socket:
+                try:
+                    self._socket.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                self._socket.close()
+                self._socket = None
+            self.is_open = False
+
+    def from_url(self, url):
+        """ Extracts the socket path from an URL string """
+        parts = urlparse.urlsplit(url)
+        if parts.scheme != 'unix' or not parts.path:
+            raise SerialException('expected a string in the form "unix:///path/to/socket": {!r}'.format(url))
+        return parts.path
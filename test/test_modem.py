@@ -4,21 +4,28 @@
 """ Test suite for gsmmodem.modem """
 
 import asyncio
-import queue
-
+import binascii
+import collections
+import contextlib
+import contextvars
+import functools
+import itertools
+
+import os
+import socket
 import sys
-import threading
-import time
+import tempfile
 import logging
-import codecs
 from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
 from datetime import datetime
-from copy import copy
 import unittest
 
+import serial
+
 from gsmmodem.exceptions import PinRequiredError, CommandError, InvalidStateException, TimeoutException,\
     CmsError, CmeError, EncodingError
-from gsmmodem.modem import StatusReport, Sms, ReceivedSms
+from gsmmodem.modem import StatusReport, Sms, SentSms, ReceivedSms, CTRLZ
 
 import gsmmodem.serial_comms
 import gsmmodem.modem
@@ -31,192 +38,386 @@ from . import fakemodems
 # logging.raiseExceptions = False
 # logging.getLogger('gsmmodem').addHandler(logging.NullHandler())
 
-# debug logging
-root = logging.getLogger()
-root.setLevel(logging.DEBUG)
-handler = logging.StreamHandler(sys.stdout)
-handler.setLevel(logging.DEBUG)
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-handler.setFormatter(formatter)
-root.addHandler(handler)
+# debug logging (every AT command and response), only when asked for with GSMMODEM_TEST_DEBUG=1
+if os.environ.get('GSMMODEM_TEST_DEBUG'):
+    root = logging.getLogger()
+    root.setLevel(logging.DEBUG)
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setLevel(logging.DEBUG)
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    root.addHandler(handler)
 
-# The fake modem to use (if any)
-FAKE_MODEM = None
-# # Write callback to use during Serial.__init__() - usually None, but useful for setting write callbacks during modem.connect()
-SERIAL_WRITE_CALLBACK_FUNC = None
+class MockModemState(object):
+    """ Per-test state of the mock modem: the fake modem to use, write callback and queued up responses """
 
-def set_writeCallbackFunc(wcb=None):
-    global SERIAL_WRITE_CALLBACK_FUNC
-    SERIAL_WRITE_CALLBACK_FUNC = wcb
+    def __init__(self):
+        # The fake modem to use (if any)
+        self.fakeModem = None
+        # Write callback - usually None, but useful for checking what gets written during modem.connect()
+        self.writeCallbackFunc = None
+        # Whether the write callback takes the raw bytes written, instead of them decoded to str
+        self.rawWrites = False
+        # Responses to send instead of the fake modem's; deque append/popleft are atomic, so no locking is needed
+        self.responseSequence = collections.deque()
+        # The currently connected MockModem, if any
+        self.mockModem = None
+        # Set whenever the GsmModem has handled a notification or a command response (see TestUsingMockModem.waitFor())
+        self.activity = asyncio.Event()
+
+# The current test's MockModemState - a context variable instead of module globals, so tests can run concurrently
+mock_modem_state = contextvars.ContextVar('mock_modem_state')
+
+def set_fakeModem(fm=None):
+    mock_modem_state.get().fakeModem = fm
 
-response_sequence = queue.Queue()
+def set_writeCallbackFunc(wcb=None):
+    state = mock_modem_state.get()
+    state.writeCallbackFunc, state.rawWrites = wcb, False
+
+@contextlib.contextmanager
+def fake_modem(fm):
+    """ Makes the mock modem act as fake modem fm inside the with block, restoring the previous one on exit """
+    state = mock_modem_state.get()
+    previous, state.fakeModem = state.fakeModem, fm
+    try:
+        yield fm
+    finally:
+        state.fakeModem = previous
+
+@contextlib.contextmanager
+def write_callback(wcb, rawWrites=False):
+    """ Installs write callback wcb inside the with block, restoring the previous one on exit (even if the block fails)
+
+    :param rawWrites: pass wcb the bytes written as they are, instead of decoding them to str first
+    """
+    state = mock_modem_state.get()
+    previous = state.writeCallbackFunc, state.rawWrites
+    state.writeCallbackFunc, state.rawWrites = wcb, rawWrites
+    try:
+        yield wcb
+    finally:
+        state.writeCallbackFunc, state.rawWrites = previous
+
+def _flagWrites(flags):
+    """ :return: a write callback that sets flags[command] to True once command has been written (flags maps commands to False initially) """
+    def writeCallbackFunc(data):
+        if data in flags:
+            flags[data] = True
+    return writeCallbackFunc
+
+class _ScriptedWrites(object):
+    """ Write callback that checks every write against a script of (expected write, responses) steps, queueing up
+    each step's responses (if any) in reply - one table lookup per write instead of a chain of callbacks """
+
+    def __init__(self, steps):
+        self.steps = collections.deque(steps)
+        # first mismatch, if any (write callbacks run outside the test, so check() reports it)
+        self.error = None
+
+    def dispatch(self, data):
+        if self.error is not None:
+            return
+        if not self.steps:
+            self.error = 'Unexpected data written to modem: "{0}"'.format(data)
+            return
+        expected, responses = self.steps.popleft()
+        if data != expected:
+            self.error = 'Invalid data written to modem; expected "{0}", got: "{1}"'.format(expected, data)
+        elif responses:
+            set_response_sequence(responses)
+
+    def check(self, testCase):
+        """ Fails testCase if a write did not match the script, or if scripted writes are missing """
+        if self.error is not None:
+            testCase.fail(self.error)
+        if self.steps:
+            testCase.fail('Expected data not written to modem: {0}'.format([expected for expected, responses in self.steps]))
+
+class _LazyMsg(object):
+    """ Assertion message that is only formatted if it is actually needed, i.e. when the assertion fails """
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def __str__(self):
+        return self.fn()
+
+# Encoded responses, by response string - the fake modems keep sending the same few responses
+_encodedResponses = {}
+
+def _encode_response(r):
+    if (encoded := _encodedResponses.get(r)) is None:
+        encoded = _encodedResponses[r] = r.encode()
+    return encoded
+
+def _encode_responses(rs):
+    """ Encodes responses to bytes up front; numbers (delays) are kept as they are """
+    return (_encode_response(r) if type(r) == str else r for r in rs)
 
 def set_response_sequence(rs):
-    global response_sequence
-    for r in rs: response_sequence.put(r)
-
-class MockModem(asyncio.Protocol):
-    """ Mock modem protocol that uses whatever is set in FAKE_MODEM for responding """
+    mock_modem_state.get().responseSequence.extend(_encode_responses(rs))
+
+def send_response_sequence(rs):
+    """ Like set_response_sequence(), but sends the responses right away instead of in reply to the next command (e.g. to fake unsolicited notifications) """
+    set_response_sequence(rs)
+    mock_modem_state.get().mockModem.drain()
+
+# Frequently queued responses, already encoded
+_OK = b'OK\r\n'
+_ERROR = b'ERROR\r\n'
+# Unsolicited ZTE network status notifications, as mixed into command responses in github issue #11
+_ZDONR_CS_ONLY = b'+ZDONR: "METEOR",272,3,"CS_ONLY","ROAM_OFF"\r\n'
+_ZDONR_CS_PS = b'+ZDONR: "METEOR",272,3,"CS_PS","ROAM_OFF"\r\n'
+_ZPASR_UMTS = b'+ZPASR: "UMTS"\r\n'
+# AT+CMGR response of a ZTE modem reading a status report, as one burst: the PDU is semi-invalid (SMSC length
+# incorrect) and the +CMGR line is missing the message status
+_ZTE_CMGR_STATUS_REPORT = b'+CMGR: ,,27\r\n0297F1061C0F910B487228297020F5317062419272803170624192138000\r\n' + _OK
+_CTRLZ = CTRLZ.encode()
+
+# Commands checked for during connect(); interned, since they are used as dict keys by many tests
+_AT_CFUN1 = sys.intern('AT+CFUN=1\r')
+_AT_CFUN_Q = sys.intern('AT+CFUN?\r')
+_AT_CLIP1 = sys.intern('AT+CLIP=1\r')
+_AT_CRC1 = sys.intern('AT+CRC=1\r')
+_AT_CPMS_Q = sys.intern('AT+CPMS=?\r')
+_AT_CNMI_STD = sys.intern('AT+CNMI=2,1,0,2\r')
+
+@functools.lru_cache(maxsize=64)
+def _smsSubmitPduHex(number, message, ref):
+    """ :return: (TPDU length, hex bytes) of the first SMS-SUBMIT PDU GsmModem.sendSms() should write for the message """
+    pdu = gsmmodem.pdu.encodeSmsSubmitPdu(number, message, ref)[0]
+    return pdu.tpduLength, binascii.hexlify(pdu.data).upper()
+
+def _readAndDeleteSteps(modem, mem, index, cmgrResponses):
+    """ :return: _ScriptedWrites steps for modem reading (cmgrResponses answering the AT+CMGR), then deleting the
+    message at index in memory mem - switching to that memory first if needed (decided once, up front) """
+    steps = [(f'AT+CPMS="{mem}"\r', None)] if modem._smsMemReadDelete != mem else []
+    steps += [(f'AT+CMGR={index}\r', cmgrResponses),
+              (f'AT+CMGD={index},0\r', None)]
+    return steps
+
+def _textModeTimestamp(smsTime):
+    """ :return: smsTime formatted like text-mode +CMGR responses do: "yy/MM/dd,hh:mm:ss" followed by the
+    timezone offset in quarter hours (e.g. "13/03/08,15:02:16+08") """
+    return smsTime.strftime('%y/%m/%d,%H:%M:%S') + smsTime.tzinfo.textModeTzStr
+
+class MockModem(asyncio.BufferedProtocol):
+    """ Mock modem protocol that responds as the current test's fake modem (see MockModemState) """
     
     log = logging.getLogger('gsmmodem.test.MockModem')
     # log.setLevel(logging.INFO)
 
-    _REPONSE_TIME = 0.0123
+    # Simulated response latency in seconds (0 to respond right away)
+    _RESPONSE_TIME = 0
+    _RX_BUFFER_SIZE = 4096
 
     def __init__(self):
-        self.log.debug(f"Initializing MockModem")
+        self.log.debug("Initializing MockModem")
         super().__init__()
         self._transport = None
-        global FAKE_MODEM
-        if FAKE_MODEM != None:
-            self._modem = copy(FAKE_MODEM)
+        # receive buffer, reused for every read on this connection
+        self._rxBuffer = bytearray(self._RX_BUFFER_SIZE)
+        # pending delayed _drain() call, if any
+        self._drainHandle = None
+        # responses waiting to be sent, and the pending _flush() call (only used with _RESPONSE_TIME)
+        self._pending = []
+        self._flushHandle = None
+        # state of the test this connection belongs to (the server runs in a copy of the test's context)
+        self._state = mock_modem_state.get()
+        if self._state.fakeModem != None:
+            # used as is: tests set up a fresh fake modem for every connection anyway
+            self._modem = self._state.fakeModem
         else:
-            self._modem = fakemodems.GenericTestModem()
+            self._modem = fakemodems.GenericTestModem.clone()
         self.log.debug("Initialized MockModem")
 
     def connection_made(self, transport):
-        self.log.debug(f"Connection to MockModem made {transport}")
+        self.log.debug("Connection to MockModem made %s", transport)
         self._transport = transport
+        self._state.mockModem = self
+
+    def get_buffer(self, sizehint):
+        if sizehint > len(self._rxBuffer):
+            self._rxBuffer = bytearray(sizehint)
+        return self._rxBuffer
+
+    def buffer_updated(self, nbytes):
+        state = self._state
+        with memoryview(self._rxBuffer) as view:
+            if state.rawWrites:
+                # left to the fake modem to decode, if it has to respond at all
+                data = bytes(view[:nbytes])
+            else:
+                # decode straight from the receive buffer, without an intermediate bytes copy
+                data = str(view[:nbytes], 'utf-8')
+        self.log.debug("Data received: %r", data)
+        if state.writeCallbackFunc is not None:
+            state.writeCallbackFunc(data)
+        if not state.responseSequence:
+            # nothing queued up by the test - let the fake modem respond
+            state.responseSequence.extend(_encode_responses(self._modem.getResponse(data)))
+        self.drain()
+
+    def drain(self):
+        """ Starts sending the queued up responses, unless a delay in the sequence is still pending """
+        if self._drainHandle is None:
+            self._drain()
+
+    def _drain(self):
+        """ Sends the queued up responses; a number in the sequence delays the rest by that many seconds """
+        self._drainHandle = None
+        # send everything up to the next delay in one go
+        pending = self._pending
+        responseSequence = self._state.responseSequence
+        while responseSequence:
+            if type(r := responseSequence.popleft()) in (float, int):
+                self._drainHandle = asyncio.get_running_loop().call_later(r, self._drain)
+                break
+            pending.append(r)
+        if pending and self._flushHandle is None:
+            if self._RESPONSE_TIME:
+                # one wake-up for the whole burst, not one per response
+                self._flushHandle = asyncio.get_running_loop().call_later(self._RESPONSE_TIME, self._flush)
+            else:
+                self._flush()
+
+    def _flush(self):
+        """ Sends all pending responses """
+        self._flushHandle = None
+        self._transport.writelines(self._pending)
+        self.log.debug("Data sent: %s", self._pending)
+        self._pending.clear()
 
-    def data_received(self, data):
-        self.log.debug(f"Data received: {str(data).strip()}")
-        global SERIAL_WRITE_CALLBACK_FUNC
-        if SERIAL_WRITE_CALLBACK_FUNC is not None:
-            SERIAL_WRITE_CALLBACK_FUNC(data.decode())
-        for r in self._modem.getResponse(data):
-            response_sequence.put(r)
-        try:
-            while True:
-                if type(r := response_sequence.get_nowait()) in (float, int):
-                    asyncio.sleep(r)
-                else:
-                    self._transport.write(r.encode())
-                    self.log.debug(f"Data sent: {r.strip()}")
-        except queue.Empty:
-            ...
-            
     def connection_lost(self, e):
-        self.log.debug(f"Connection to MockModem lost with exception {e}")
+        self.log.debug("Connection to MockModem lost with exception %s", e)
+        if self._state.mockModem is self:
+            self._state.mockModem = None
+        for handle in (self._drainHandle, self._flushHandle):
+            if handle is not None:
+                handle.cancel()
         self._transport.close()
-        self.log.debug(f"MockModem closed _transport")
+        self._rxBuffer = None
+        self.log.debug("MockModem closed _transport")
+
+
+def _signalling(coroutineFunc, event):
+    """ Wraps coroutineFunc so that event gets set whenever it returns (the event is captured here, since
+    notifications are handled outside the test's context) """
+    async def wrapper(*args, **kwargs):
+        try:
+            return await coroutineFunc(*args, **kwargs)
+        finally:
+            event.set()
+    return wrapper
 
 
 _HOST = "127.0.0.1"
-_PORT = 8888
-_SERIAL = f"socket://{_HOST}:{_PORT}"
 
-mock_modem = None
-mock_modem_server = None
+# serve unix:// ports via test/protocol_unix.py
+serial.protocol_handler_packages.append(__package__)
 
-class TestUsingMockModem(IsolatedAsyncioTestCase):
+class FakeModemProfiles(object):
+    """ Test case mixin handing out fresh fake modem profiles, cloned from prebuilt templates (see FakeModem.clone()) """
 
-    async def startMockModem(self):
-        async def mockModemServer(reader, writer):
-            self._started.set()
-            while True:
-                try:
-                    self._reading_task = asyncio.ensure_future(self._reader.readuntil(self.RX_EOL_SEQ))
-                    # self._log.debug(f"Reading task await")
-                    r = await self._reading_task
-                    # self._log.debug(f"Reading task result = {r}")
-                    self._read(r)
-                except asyncio.CancelledError:
-                    self._log.debug(f"Reading task CancelledError")
-                    break
-                except Exception as e:
-                    self._log.debug(f"Serial error: {e}")
-                    self._log.debug(traceback.format_exc())
-                    if self._fatalErrorCallback:
-                        asyncio.run_coroutine_threadsafe(self._fatalErrorCallback(e), self._modem_loop)
-                    break
-                self._reading_task = None
-            self._log.debug(f"Finished [{self._port}]")
-
-
-            data = await reader.read(100)
-            message = data.decode()
-            addr = writer.get_extra_info('peername')
-
-            print(f"Received {message!r} from {addr!r}")
-
-            print(f"Send: {message!r}")
-            writer.write(data)
-            await writer.drain()
-
-            print("Close the connection")
-            writer.close()
-            await writer.wait_closed()
-
-        server = await asyncio.start_server(self.mockModemServer, _HOST, _PORT)
-        addrs = ', '.join(str(sock.getsockname()) for sock in server.sockets)
-        print(f'Serving on {addrs}')
-        async with server:
-            await server.serve_forever()
+    def fakeModems(self):
+        """ :return: fresh copies of all fake modem profiles (like fakemodems.createModems()) """
+        return fakemodems.createModems()
 
+    def genericFakeModem(self, responses=None):
+        """ :return: a fresh copy of the generic test modem, with the given responses (by command) overridden """
+        return fakemodems.GenericTestModem.clone(responses)
+
+
+class TestUsingMockModem(FakeModemProfiles, IsolatedAsyncioTestCase):
+
+    # Whether asyncSetUp() runs the full GsmModem.connect() AT handshake, or only opens the serial link
+    connectHandshake = True
 
     async def startMockModem(self):
-        def theloop(loop):
-            self.log.debug('Thread MockModem started')
-            asyncio.set_event_loop(loop)
-            loop.run_forever()
-            self.log.debug(f"Thread MockModem finished")
-
-        self.log.debug(f"Starting theloop")
-        self._loop = asyncio.new_event_loop()
-        self._thread = threading.Thread(target=lambda: theloop(self._loop), daemon=True)
-        self._thread.start()
-        self.log.debug(f"Started theloop")
-
-        async def themodem(loop):
-            global mock_modem
-            global mock_modem_server
-            self.log.debug(f"MockModem creating server")
-            mock_modem = await loop.create_server(MockModem, _HOST, _PORT)
-            self.log.debug(f"MockModem starting serve_forever")
-            mock_modem_server = asyncio.create_task(mock_modem.serve_forever())
-            self.log.debug(f"MockModem serve_forever started")
-            self._started.set()
-            self.log.debug(f"MockModem started")
-
-        self.log.debug(f"Starting themodem")
-        self._started = threading.Event()
-        asyncio.run_coroutine_threadsafe(themodem(self._loop), self._loop)
-        self._started.wait()
-        self.log.debug(f"Started themodem")
-
-    async def _stopMockModem(self):
-        global mock_modem, mock_modem_server
-        self.log.debug(f"Closing mock_modem")
-        mock_modem.close()
-        self.log.debug(f"Cancelling mock_modem_server")
-        mock_modem_server.cancel()
-        # sleep for mock_modem_server to get cancelled
-        self.log.debug(f"Waiting for mock_modem_server to get cancelled")
-        while not mock_modem_server.cancelled():
-            await asyncio.sleep(0)
-        self.log.debug(f"mock_modem_server {'is' if mock_modem_server.cancelled() else 'not'} cancelled")
-        self.log.debug(f"Stopping the loop")
-        self._loop.stop()
-        self.log.debug("Loop stopped")
-        self._ended.set()
-        self.log.debug("MockModem ended")
+        # serve on the test's own loop, over a unix domain socket where available (skips the TCP/IP stack)
+        self.log.debug("MockModem creating server")
+        loop = asyncio.get_running_loop()
+        if hasattr(socket, 'AF_UNIX'):
+            self._socketPath = os.path.join(tempfile.gettempdir(), f"mockmodem-{os.getpid()}-{id(self)}.sock")
+            self._mockModem = await loop.create_unix_server(MockModem, self._socketPath)
+            self._serial = f"unix://{self._socketPath}"
+        else:
+            # port 0 picks a free port, so tests don't collide
+            self._socketPath = None
+            self._mockModem = await loop.create_server(MockModem, _HOST, 0)
+            self._serial = f"socket://{_HOST}:{self._mockModem.sockets[0].getsockname()[1]}"
+        self.log.debug("MockModem starting serve_forever")
+        self._mockModemServer = asyncio.create_task(self._mockModem.serve_forever())
+        self.log.debug("MockModem started on %s", self._serial)
 
     async def stopMockModem(self):
-        self.log.debug('Stopping themodem')
-        self._ended = threading.Event()
-        asyncio.run_coroutine_threadsafe(self._stopMockModem(), self._loop)
-        self._ended.wait()
-        self.log.debug('Stopped themodem')
+        self.log.debug("Closing mock_modem")
+        self._mockModem.close()
+        self.log.debug("Cancelling mock_modem_server")
+        self._mockModemServer.cancel()
+        self.log.debug("Waiting for self._mockModemServer to get cancelled")
+        try:
+            await self._mockModemServer
+        except asyncio.CancelledError:
+            pass
+        self.log.debug("self._mockModemServer %s cancelled", 'is' if self._mockModemServer.cancelled() else 'not')
+        await self._mockModem.wait_closed()
+        if self._socketPath:
+            os.unlink(self._socketPath)
+        self.log.debug("MockModem ended")
 
     async def asyncSetUp(self):
+        # connect() detects DTMF support and the DTMF command into Call class attributes; start every test (and
+        # every fake modem) from the defaults, and don't let one modem's settings leak into the next test
+        for attr in ('dtmfSupport', 'DTMF_COMMAND_BASE'):
+            patcher = patch.object(gsmmodem.modem.Call, attr, getattr(gsmmodem.modem.Call, attr))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # kept on the test case as well, so its own helpers need no context variable lookups
+        self.mockState = MockModemState()
+        mock_modem_state.set(self.mockState)
         self.log.debug("Starting MockModem")
         await self.startMockModem()
+        self.modem = None
+        await self.connectModem(handshake=self.connectHandshake)
+
+    async def createModem(self, fakeModem=None):
+        """ (Re)creates self.modem without connecting it; the mock modem will act as the given fake modem """
+        if self.modem is not None:
+            await self.modem.close()
+        self.mockState.fakeModem = fakeModem
         self.log.debug("Creating GsmModem")
-        self.modem = gsmmodem.modem.GsmModem(_SERIAL)
+        self.modem = gsmmodem.modem.GsmModem(self._serial)
+        # wake up waitFor() once a notification or a command response (e.g. call status polling) has been handled
+        self.modem._notificationCallback = _signalling(self.modem._notificationCallback, self.mockState.activity)
+        self.modem.write = _signalling(self.modem.write, self.mockState.activity)
+
+    async def connectModem(self, fakeModem=None, handshake=True):
+        """ (Re)connects self.modem to the mock modem, which then acts as the given fake modem
+
+        :param handshake: False to only open the serial link, skipping the GsmModem.connect() AT handshake
+        """
+        await self.createModem(fakeModem)
         self.log.debug("Connecting GsmModem")
-        await self.modem.connect()
+        if handshake:
+            await self.modem.connect()
+        else:
+            gsmmodem.serial_comms.SerialComms.connect(self.modem)
         self.log.debug("Connected to GsmModem")
 
+    async def waitFor(self, condition, msg=None, timeout=2):
+        """ Waits until condition() is true, re-checking it whenever the GsmModem has handled a notification or command response """
+        activity = self.mockState.activity
+        async def wait():
+            while not condition():
+                activity.clear()
+                await activity.wait()
+        try:
+            await asyncio.wait_for(wait(), timeout)
+        except asyncio.TimeoutError:
+            self.fail(msg or 'Timed out waiting for condition')
+
     async def asyncTearDown(self):
         # self.log.debug("Closing mock modem and gsmmodem")
         await self.modem.close()
@@ -230,70 +431,121 @@ class TestGsmModemGeneralApi(TestUsingMockModem):
     
     log = logging.getLogger('gsmmodem.test.TestGsmModemGeneralApi')
 
-    modem_lock = asyncio.Lock()
+    # IsolatedAsyncioTestCase gives every test its own event loop, so the modem cannot be shared
+    # between tests; skip the connect() handshake instead, none of these tests depend on it
+    connectHandshake = False
+
+    def _recordWrite(self, data):
+        """ Write callback shared by the tests below; records data if it isn't self._expectedWrite (failing right
+        here would only break the mock modem's connection, see _checkWritten()) """
+        if data != self._expectedWrite and self._writeMismatch is None:
+            self._writeMismatch = data
+
+    def _checkWritten(self):
+        """ Fails the test if anything other than self._expectedWrite was written since the last check """
+        mismatch, self._writeMismatch = self._writeMismatch, None
+        if mismatch is not None:
+            self.fail(f'Invalid data written to modem; expected "{self._expectedWrite}", got: "{mismatch}"')
+
+    async def _testInfoCommand(self, method, command, tests):
+        """ Checks that method writes command to the modem and returns each of the tests responses """
+        self._expectedWrite = command
+        self._writeMismatch = None
+        with write_callback(self._recordWrite):
+            for test in tests:
+                with self.subTest(response=test):
+                    set_response_sequence([f'{test}\r\n', _OK])
+                    response = await method()
+                    self._checkWritten()
+                    self.assertEqual(test, response)
 
     async def test_manufacturer(self):
-        async with self.modem_lock:
-            print("TEST: test_manufacturer")
-            set_writeCallbackFunc(lambda data: 
-                self.assertEqual('AT+CGMI\r', data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CGMI\r', data))
-            )
-            tests = ['huawei', 'ABCDefgh1235', 'Some Random Manufacturer']
-            for test in tests:
-                set_response_sequence(['{0}\r\n'.format(test), 'OK\r\n'])
-                self.assertEqual(test, await self.modem.manufacturer())
-            set_writeCallbackFunc()
+        await self._testInfoCommand(self.modem.manufacturer, 'AT+CGMI\r', ['huawei', 'ABCDefgh1235', 'Some Random Manufacturer'])
 
     async def test_model(self):
-        async with self.modem_lock:
-            print("TEST: test_model")
-            set_writeCallbackFunc(lambda data: 
-                self.assertEqual('AT+CGMM\r', data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CGMM\r', data))
-            )
-            tests = ['K3715', '1324-Qwerty', 'Some Random Model']
-            for test in tests:
-                set_response_sequence(['{0}\r\n'.format(test), 'OK\r\n'])
-                self.assertEqual(test, await self.modem.model())
-            set_writeCallbackFunc()
+        await self._testInfoCommand(self.modem.model, 'AT+CGMM\r', ['K3715', '1324-Qwerty', 'Some Random Model'])
 
     async def test_revision(self):
-        async with self.modem_lock:
-            print("TEST: test_revision")
-            set_writeCallbackFunc(lambda data: 
-                self.assertEqual('AT+CGMR\r', data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CGMR\r', data))
-            )
-            tests = ['1', '1324-56768-23414', 'r987']
-            for test in tests:
-                set_response_sequence(['{0}\r\n'.format(test), 'OK\r\n'])
-                self.assertEqual(test, await self.modem.revision())
-            # Fake a modem that does not support this command
-            response_sequence.put('ERROR\r\n')
-            self.assertEqual(None, await self.modem.revision())
-            set_writeCallbackFunc()
+        await self._testInfoCommand(self.modem.revision, 'AT+CGMR\r', ['1', '1324-56768-23414', 'r987'])
+        # Fake a modem that does not support this command
+        set_response_sequence([_ERROR])
+        with write_callback(self._recordWrite):
+            revision = await self.modem.revision()
+        self._checkWritten()
+        self.assertEqual(None, revision)
 
     async def test_imei(self):
-        async with self.modem_lock:
-            print("TEST: test_imei")
-            set_writeCallbackFunc(lambda data:
-                self.assertEqual('AT+CGSN\r', data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CGSN\r', data))
-            )
-            tests = ['012345678912345']
-            for test in tests:
-                set_response_sequence(['{0}\r\n'.format(test), 'OK\r\n'])
-                self.assertEqual(test, await self.modem.imei())
-            set_writeCallbackFunc()
-                
+        await self._testInfoCommand(self.modem.imei, 'AT+CGSN\r', ['012345678912345'])
+
     async def test_imsi(self):
-        async with self.modem_lock:
-            print("TEST: test_imsi")
-            set_writeCallbackFunc(lambda data:
-                self.assertEqual('AT+CIMI\r', data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CIMI\r', data))
-            )
-            tests = ['987654321012345']
-            for test in tests:
-                set_response_sequence(['{0}\r\n'.format(test), 'OK\r\n'])
-                self.assertEqual(test, await self.modem.imsi())
-            set_writeCallbackFunc()
+        await self._testInfoCommand(self.modem.imsi, 'AT+CIMI\r', ['987654321012345'])
+
+    def _recordNotifications(self):
+        """ :return: list collecting the lines of every notification the modem handles from now on """
+        notifications = []
+        handler = self.modem._notificationCallback
+        async def recordNotification(lines):
+            notifications.append(list(lines))
+            await handler(lines)
+        self.modem._notificationCallback = recordNotification
+        return notifications
+
+    async def test_notificationsInOneRead(self):
+        """ Tests that every unsolicited notification is handled when several of them arrive in one read """
+        received = []
+        async def smsReceived(line):
+            received.append(line)
+        # make sure the serial link is up before faking notifications
+        await self.modem.write('AT')
+        with patch.object(self.modem, '_handleSmsReceived', smsReceived):
+            # a single write, so that both notifications are read in one chunk
+            send_response_sequence([b'\r\n+CMTI: "SM",1\r\n\r\n+CMTI: "SM",2\r\n'])
+            await self.waitFor(lambda: len(received) == 2, 'Not every new message indication was handled')
+        self.assertEqual(['+CMTI: "SM",1', '+CMTI: "SM",2'], received)
+
+    async def test_writeTimeout_data(self):
+        """ Tests that TimeoutException passes on the lines read before the command timed out """
+        # nothing read at all last: its delay holds back any responses queued after it
+        for responses, data in ((['abc\r\n'], ['abc']), (['abc\r\n', 'def\r\n'], ['abc', 'def']), ([0.5], None)):
+            with self.subTest(responses=responses):
+                set_response_sequence(responses)
+                with self.assertRaises(TimeoutException) as cm:
+                    await self.modem.write('AT', timeout=0.1)
+                self.assertEqual(data, cm.exception.data)
+
+    async def test_writeTimeout_noResponseExpected(self):
+        """ Tests that a write that does not wait for a response still times out with TimeoutException (e.g. when
+        flushing the written data takes too long), rather than with a cancellation of the caller """
+        # make sure the serial link is up
+        await self.modem.write('AT')
+        async def drain():
+            await asyncio.sleep(5)
+        with patch.object(self.modem._writer, 'drain', drain), patch.object(self.modem, 'TX_HIGH_WATER', 0):
+            with self.assertRaises(TimeoutException) as cm:
+                await self.modem.write('AT', waitForResponse=False, timeout=0.1)
+        self.assertIsNone(cm.exception.data)
+
+    async def test_writeTimeout_notificationAfterwards(self):
+        """ Tests that a notification arriving after a command timed out is dispatched, and not added to its response """
+        notifications = self._recordNotifications()
+        set_response_sequence(['PARTIAL\r\n'])
+        with self.assertRaises(TimeoutException) as cm:
+            await self.modem.write('AT1', timeout=0.1)
+        self.assertEqual(['PARTIAL'], cm.exception.data)
+        send_response_sequence(['RING\r\n'])
+        await self.waitFor(lambda: notifications, 'Notification after a timed out command not dispatched')
+        self.assertEqual([['RING']], notifications)
+
+    async def test_writeTimeout_lateResponse(self):
+        """ Tests that the response to a command that timed out does not end up as the next command's response """
+        notifications = self._recordNotifications()
+        set_response_sequence([0.3, 'LATE1\r\n', _OK])
+        with self.assertRaises(TimeoutException):
+            await self.modem.write('AT1', timeout=0.1)
+        # the late response is handled as a notification
+        await self.waitFor(lambda: 'OK' in itertools.chain.from_iterable(notifications), 'Late response not received', timeout=1)
+        set_response_sequence(['RESP2\r\n', _OK])
+        self.assertEqual(['RESP2', 'OK'], await self.modem.write('AT2'))
 
     # async def test_networkName(self):
     #     async with self.modem_lock:
@@ -327,7 +579,7 @@ class TestGsmModemGeneralApi(TestUsingMockModem):
     #                 # Some Huawei modems have a ZTE-like response, but add an addition \r character at the end of each listed command
     #                 (['Q\r\r\n', 'QWERTY\r\r\n', '^DTMF\r\r\n', 'OK\r\n'], ['Q', 'QWERTY', '^DTMF']))
     #         for responseSequence, expected in tests:
-    #             for r in responseSequence: response_sequence.put(r)
+    #             for r in responseSequence: response_sequence.append(r)
     #             commands = await self.modem.supportedCommands()
     #             self.assertEqual(expected, commands)
     #         # TODO: solve this, default reponse should be ERROR I think
@@ -557,53 +809,42 @@ class TestUssd(TestUsingMockModem):
         """ Standard USSD tests """
         # tests tuple format: (USSD_STRING_TO_WRITE, MODEM_WRITE, MODEM_RESPONSE, USSD_MESSAGE, USSD_SESSION_ACTIVE)
         for test in self.tests:
-            def writeCallbackFunc(data):
-                self.assertEqual(test[1], data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format(test[1], data))
-            set_response_sequence(['OK\r\n', test[2]])
-            set_writeCallbackFunc(writeCallbackFunc)
-            ussd = await self.modem.sendUssd(test[0])
+            set_response_sequence([_OK, test[2]])
+            script = _ScriptedWrites([(test[1], None)])
+            with write_callback(script.dispatch):
+                ussd = await self.modem.sendUssd(test[0])
+            script.check(self)
             self.assertIsInstance(ussd, gsmmodem.modem.Ussd)
-            self.assertEqual(ussd.sessionActive, test[4], 'Session state is invalid for test case: {0}'.format(test))
+            self.assertEqual(ussd.sessionActive, test[4], _LazyMsg(lambda: f'Session state is invalid for test case: {test}'))
             self.assertEqual(ussd.message, test[3])
-            if ussd.sessionActive:
-                def writeCallbackFunc2(data):
-                    self.assertEqual('AT+CUSD=2\r', data, 'Invalid data written to modem; expected "AT+CUSD=2", got: "{0}"'.format(data))
-                set_writeCallbackFunc(writeCallbackFunc2)
+            # cancelling an inactive session shouldn't write anything
+            script = _ScriptedWrites([('AT+CUSD=2\r', None)] if ussd.sessionActive else [])
+            with write_callback(script.dispatch):
                 await ussd.cancel()
-            else:
-                await ussd.cancel() # This call shouldn't do anything
+            script.check(self)
             del ussd
-        set_writeCallbackFunc()
 
-    # TODO: this is different!
-    def test_sendUssd_differentModems(self):
+    async def test_sendUssd_differentModems(self):
         """ Tests sendUssd functionality with different modem behaviours (some modems require mode switching) """
         tests = [('*101#', 'Testing 123')]
-        global FAKE_MODEM
         for ussdStr, ussdResponse in tests:
-            for fakeModem in fakemodems.createModems():
+            for fakeModem in self.fakeModems():
                 fakeModem.responses['AT+CUSD=1,"{0}",15\r'.format(ussdStr)] = ['+CUSD: 2,"{0}",15\r\n'.format(ussdResponse), 'OK\r\n']
-                # Init modem and preload SMSC number
-                FAKE_MODEM = fakeModem
-                mockSerial = MockSerialPackage()
-                gsmmodem.serial_comms.serial = mockSerial        
-                modem = gsmmodem.modem.GsmModem('-- PORT IGNORED DURING TESTS --')
-                modem.connect()
-                response = modem.sendUssd(ussdStr)
+                # reconnect through the test's mock modem, which now acts as this fake modem
+                await self.connectModem(fakeModem)
+                response = await self.modem.sendUssd(ussdStr)
                 self.assertEqual(ussdResponse, response.message)
-                modem.close()
-        FAKE_MODEM = None
-    
+
     async def test_sendUssdReply(self):
         """ Test replying in a USSD session via Ussd.reply() """
         test = ('First menu. Reply with 1 for blah blah blah...', 'Second menu')
-        set_response_sequence(['+CUSD: 1,"{0}",15\r\n'.format(test[0]), 'OK\r\n'])
+        set_response_sequence([f'+CUSD: 1,"{test[0]}",15\r\n', _OK])
         ussd = await self.modem.sendUssd('*101#')
         self.assertIsInstance(ussd, gsmmodem.modem.Ussd)
         self.assertTrue(ussd.sessionActive, 'Session should be active')
         self.assertEqual(ussd.message, test[0])
         # Reply to this active session
-        set_response_sequence(['+CUSD: 2,"{0}",15\r\n'.format(test[1]), 'OK\r\n'])
+        set_response_sequence([f'+CUSD: 2,"{test[1]}",15\r\n', _OK])
         ussd = await ussd.reply('1')
         self.assertIsInstance(ussd, gsmmodem.modem.Ussd)
         self.assertFalse(ussd.sessionActive, 'Session should be inactive')
@@ -617,24 +858,21 @@ class TestUssd(TestUsingMockModem):
         """ Tests +CUSD responses that arrive before the +CUSD command's OK is issued (non-standard behaviour) - reported by user """
         # tests tuple format: (USSD_STRING_TO_WRITE, MODEM_WRITE, MODEM_RESPONSE, USSD_MESSAGE, USSD_SESSION_ACTIVE)
         for test in self.tests:
-            def writeCallbackFunc(data):
-                self.assertEqual(test[1], data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format(test[1], data))
             # Note: The +CUSD response will now be sent before the command is acknowledged
-            set_response_sequence([test[2], 'OK\r\n'])
-            set_writeCallbackFunc(writeCallbackFunc)
-            ussd = await self.modem.sendUssd(test[0])
+            set_response_sequence([test[2], _OK])
+            script = _ScriptedWrites([(test[1], None)])
+            with write_callback(script.dispatch):
+                ussd = await self.modem.sendUssd(test[0])
+            script.check(self)
             self.assertIsInstance(ussd, gsmmodem.modem.Ussd)
-            self.assertEqual(ussd.sessionActive, test[4], 'Session state is invalid for test case: {0}'.format(test))
+            self.assertEqual(ussd.sessionActive, test[4], _LazyMsg(lambda: f'Session state is invalid for test case: {test}'))
             self.assertEqual(ussd.message, test[3])
-            if ussd.sessionActive:
-                def writeCallbackFunc2(data):
-                    self.assertEqual('AT+CUSD=2\r', data, 'Invalid data written to modem; expected "AT+CUSD=2", got: "{0}"'.format(data))
-                set_writeCallbackFunc(writeCallbackFunc2)
+            # cancelling an inactive session shouldn't write anything
+            script = _ScriptedWrites([('AT+CUSD=2\r', None)] if ussd.sessionActive else [])
+            with write_callback(script.dispatch):
                 await ussd.cancel()
-            else:
-                await ussd.cancel() # This call shouldn't do anything
+            script.check(self)
             del ussd
-        set_writeCallbackFunc()
 
     # TODO: fix
     async def test_sendUssdExtraRelease(self):
@@ -642,17 +880,18 @@ class TestUssd(TestUsingMockModem):
         tests = (('*100#', 'Wrong order test message', ['+CUSD: 2,"Initiating Release",15\r\n', '+CUSD: 0,"Wrong order test message",15\r\n', 'OK\r\n']),
                  ('*101#', 'Notifications test', ['OK\r\n', '+CUSD: 2,"Initiating Release",15\r\n', '+CUSD: 0,"Notifications test",15\r\n']),
                  ('*101#', 'Test2', ['OK\r\n', '+CUSD: 3,"Other local client responded",15\r\n', '+CUSD: 0,"Test2",15\r\n']))
-        for test in tests:            
-            set_response_sequence(test[2])
-            ussd = await self.modem.sendUssd(test[0])
-            self.assertIsInstance(ussd, gsmmodem.modem.Ussd)
-            self.assertEqual(ussd.message, test[1], 'Invalid message received; expected "{0}", got "{1}"'.format(test[1], ussd.message))
-            self.assertEqual(ussd.sessionActive, False, 'Invalid session state - should be inactive')
-            # Make sure the next call does not include any of the USSD extras
-            atResponse = await self.modem.write('AT')
-            self.assertEqual(len(atResponse), 1)
-            self.assertEqual(atResponse[0], 'OK')
-            asyncio.sleep(0)
+        for test in tests:
+            with self.subTest(test=test):
+                set_response_sequence(test[2])
+                ussd = await self.modem.sendUssd(test[0])
+                self.assertIsInstance(ussd, gsmmodem.modem.Ussd)
+                self.assertEqual(ussd.message, test[1], 'Invalid message received')
+                self.assertEqual(ussd.sessionActive, False, 'Invalid session state - should be inactive')
+                # Make sure the next call does not include any of the USSD extras
+                atResponse = await self.modem.write('AT')
+                self.assertEqual(len(atResponse), 1)
+                self.assertEqual(atResponse[0], 'OK')
+                asyncio.sleep(0)
     
     async def test_sendUssdError(self):
         """ Test error handling in a USSD session """
@@ -662,23 +901,24 @@ class TestUssd(TestUsingMockModem):
         set_response_sequence(['+CMS ERROR: 500\r\n'])
         with self.assertRaises(gsmmodem.exceptions.CmsError):
             await self.modem.sendUssd('*101#')
-        set_response_sequence(['ERROR\r\n'])
+        set_response_sequence([_ERROR])
         with self.assertRaises(gsmmodem.exceptions.CommandError):
             await self.modem.sendUssd('*101#')
         
     # TODO: fix
     async def test_sendUssdExtraLinesInResponse(self):
         """ Test parsing USSD response if it contains extra unsolicited notifications """
-        tests = (('Notification appended', ['OK\r\n', 0.1, '+CUSD: 2,"Notification appended",15\r\n', 'Some random notification!\r\n']),
-                 ('Notification prepended', ['OK\r\n', 0.1, 'Another random notification!\r\n', '+CUSD: 2,"Notification prepended",15\r\n']),
-                 ('Notification before OK', ['Yet another random notification!\r\n', 'OK\r\n', 0.1, '+CUSD: 2,"Notification before OK",15\r\n']))
+        # no delay needed between the OK and the notification: lines after the OK are never part of the command response
+        tests = (('Notification appended', ['OK\r\n', '+CUSD: 2,"Notification appended",15\r\n', 'Some random notification!\r\n']),
+                 ('Notification prepended', ['OK\r\n', 'Another random notification!\r\n', '+CUSD: 2,"Notification prepended",15\r\n']),
+                 ('Notification before OK', ['Yet another random notification!\r\n', 'OK\r\n', '+CUSD: 2,"Notification before OK",15\r\n']))
         for message, responseSeq in tests:
-            set_response_sequence(responseSeq)
-            ussd = await self.modem.sendUssd('*101#')
-            self.assertIsInstance(ussd, gsmmodem.modem.Ussd)
-            self.assertEqual(ussd.message, message)
+            with self.subTest(message=message):
+                set_response_sequence(responseSeq)
+                ussd = await self.modem.sendUssd('*101#')
+                self.assertIsInstance(ussd, gsmmodem.modem.Ussd)
+                self.assertEqual(ussd.message, message)
     
-    # TODO: fix
     async def test_sendUssd_responseTimeout(self):
         """ Test sendUssd() response timeout event """
         # The following should timeout very quickly due to no +CUSD update being issued
@@ -686,766 +926,657 @@ class TestUssd(TestUsingMockModem):
             await self.modem.sendUssd(ussdString='*101#', responseTimeout=0.05)
 
 
-class TestEdgeCases(IsolatedAsyncioTestCase):
+class TestEdgeCases(TestUsingMockModem):
     """ Edge-case testing; some modems do funny things during seemingly normal operations """    
 
-    def test_smscPreloaded(self):
+    log = logging.getLogger('gsmmodem.test.TestEdgeCases')
+
+    # every test connects to a fake modem of its own
+    connectHandshake = False
+
+    async def _runConnect(self, responseOverrides, expectedWrites, **fakeModemAttrs):
+        """ Connects to a generic fake modem with the given responses (and attributes) overridden
+
+        :return: dict mapping each of expectedWrites to whether it was written to the modem during connect()
+        """
+        fakeModem = self.genericFakeModem()
+        for attr, value in fakeModemAttrs.items():
+            setattr(fakeModem, attr, value)
+        fakeModem.responses.update(responseOverrides)
+        written = dict.fromkeys(expectedWrites, False)
+        with write_callback(_flagWrites(written)):
+            await self.connectModem(fakeModem)
+        return written
+
+    async def test_smscPreloaded(self):
         """ Tests reading the SMSC number if it was pre-loaded on the SIM (some modems delete the number during connect()) """
         tests = [None, '+12345678']
-        global FAKE_MODEM
         for test in tests:
-            for fakeModem in fakemodems.createModems():
+            for fakeModem in self.fakeModems():
                 # Init modem and preload SMSC number
                 fakeModem.smscNumber = test
                 fakeModem.simBusyErrorCounter = 3 # Enable "SIM busy" errors for modem for more accurate testing
-                FAKE_MODEM = fakeModem
-                mockSerial = MockSerialPackage()
-                gsmmodem.serial_comms.serial = mockSerial        
-                modem = gsmmodem.modem.GsmModem('-- PORT IGNORED DURING TESTS --')
-                modem.connect()
+                await self.createModem(fakeModem)
+                self.modem._simBusyRetryDelay = 0 # Retry straight away; there is no real SIM to wait for
+                await self.modem.connect()
                 # Make sure SMSC number was prevented from being deleted (some modems do this when setting text-mode paramters AT+CSMP)
-                self.assertEqual(test, modem.smsc, 'SMSC number was changed/deleted during connect()')
-                modem.close()
-        FAKE_MODEM = None
+                self.assertEqual(test, await self.modem.smsc(), 'SMSC number was changed/deleted during connect()')
     
-    def test_cfun0(self):
+    async def test_cfun0(self):
         """ Tests case where a modem's functionality setting is 0 at startup """
-        global FAKE_MODEM
-        for fakeModem in fakemodems.createModems():
+        for fakeModem in self.fakeModems():
             fakeModem.cfun = 0
-            FAKE_MODEM = fakeModem        
             # This should pass without any problem, and AT+CFUN=1 should be set during connect()
-            cfunWritten = [False]
-            def writeCallbackFunc(data):
-                if data == 'AT+CFUN=1\r':
-                    cfunWritten[0] = True
-            global SERIAL_WRITE_CALLBACK_FUNC
-            SERIAL_WRITE_CALLBACK_FUNC = writeCallbackFunc         
-            mockSerial = MockSerialPackage()
-            gsmmodem.serial_comms.serial = mockSerial
-            modem = gsmmodem.modem.GsmModem('-- PORT IGNORED DURING TESTS --')        
-            modem.connect()
-            SERIAL_WRITE_CALLBACK_FUNC = None
-            self.assertTrue(cfunWritten[0], 'Modem CFUN setting not set to 1 during connect()')
-            modem.close()
-            FAKE_MODEM = None
+            written = {_AT_CFUN1: False}
+            with write_callback(_flagWrites(written)):
+                await self.connectModem(fakeModem)
+            self.assertTrue(written[_AT_CFUN1], 'Modem CFUN setting not set to 1 during connect()')
     
-    def test_cfunNotSupported(self):
+    async def test_cfunNotSupported(self):
         """ Tests case where a modem does not support the AT+CFUN command """
-        global FAKE_MODEM            
-        FAKE_MODEM = copy(fakemodems.GenericTestModem())
-        FAKE_MODEM.cfun = -1 # disable
-        FAKE_MODEM.responses['AT+CFUN?\r'] = ['ERROR\r\n']
-        FAKE_MODEM.responses['AT+CFUN=1\r'] = ['ERROR\r\n']
         # This should pass without any problem, and AT+CFUN? should at least have been checked during connect()
-        cfunWritten = [False]
-        def writeCallbackFunc(data):
-            if data == 'AT+CFUN?\r':
-                cfunWritten[0] = True
-        global SERIAL_WRITE_CALLBACK_FUNC
-        SERIAL_WRITE_CALLBACK_FUNC = writeCallbackFunc
-        mockSerial = MockSerialPackage()
-        gsmmodem.serial_comms.serial = mockSerial
-        modem = gsmmodem.modem.GsmModem('-- PORT IGNORED DURING TESTS --')        
-        modem.connect()
-        SERIAL_WRITE_CALLBACK_FUNC = None        
-        self.assertTrue(cfunWritten[0], 'Modem CFUN setting not set to 1 during connect()')
-        modem.close()
-        FAKE_MODEM = None
-
-    def test_commandNotSupported(self):
+        written = await self._runConnect({_AT_CFUN_Q: ['ERROR\r\n'], _AT_CFUN1: ['ERROR\r\n']}, [_AT_CFUN_Q], cfun=-1)
+        self.assertTrue(written[_AT_CFUN_Q], 'Modem CFUN setting not set to 1 during connect()')
+
+    async def test_commandNotSupported(self):
         """ Some Huawei modems response with "COMMAND NOT SUPPORT" instead of "ERROR" or "OK"; ensure we detect this """
-        global FAKE_MODEM
-        FAKE_MODEM = copy(fakemodems.GenericTestModem())
-        FAKE_MODEM.responses['AT+WIND?\r'] = ['COMMAND NOT SUPPORT\r\n']
-        mockSerial = MockSerialPackage()
-        gsmmodem.serial_comms.serial = mockSerial
-        modem = gsmmodem.modem.GsmModem('-- PORT IGNORED DURING TESTS --')
-        modem.connect()
-        self.assertRaises(CommandError, modem.write, 'AT+WIND?')
-        modem.close()
-        FAKE_MODEM = None
+        fakeModem = self.genericFakeModem({'AT+WIND?\r': ['COMMAND NOT SUPPORT\r\n']})
+        # no connect() handshake needed, just the serial link
+        await self.connectModem(fakeModem, handshake=False)
+        with self.assertRaises(CommandError):
+            await self.modem.write('AT+WIND?')
         
-    def test_wavecomConnectSpecifics(self):
+    async def test_wavecomConnectSpecifics(self):
         """ Wavecom-specific test cases that might not be covered by the modem profiles in fakemodems.py
         - this is mostly to attain 100% code coverage in tests
         """
-        global FAKE_MODEM
-        FAKE_MODEM = copy(fakemodems.WavecomMultiband900E1800())
+        fakeModem = fakemodems.WavecomMultiband900E1800.clone()
         # Test the case where AT+CLAC returns a response for Wavecom devices, and it includes +WIND and +VTS
-        FAKE_MODEM.responses['AT+CLAC\r'] = ['+CLAC: D,+CUSD,+WIND,+VTS\r\n', 'OK\r\n']
+        fakeModem.responses['AT+CLAC\r'] = ['+CLAC: D,+CUSD,+WIND,+VTS\r\n', 'OK\r\n']
         # Test the case where the +WIND setting is already what we want it to be
-        FAKE_MODEM.responses['AT+WIND?\r'] = ['+WIND: 50\r\n', 'OK\r\n']
-        mockSerial = MockSerialPackage()
-        gsmmodem.serial_comms.serial = mockSerial
-        modem = gsmmodem.modem.GsmModem('-- PORT IGNORED DURING TESTS --')
-        modem.connect()
+        fakeModem.responses['AT+WIND?\r'] = ['+WIND: 50\r\n', 'OK\r\n']
+        await self.connectModem(fakeModem)
         self.assertTrue(gsmmodem.modem.Call.dtmfSupport, '+VTS in AT+CLAC response should have indicated DTMF support')
-        modem.close()
-        FAKE_MODEM = None
 
-    def test_zteConnectSpecifics(self):
+    async def test_zteConnectSpecifics(self):
         """ ZTE-specific test cases that might not be covered by the modem profiles in fakemodems.py
         - this is mostly to attain 100% code coverage in tests
         """
-        global FAKE_MODEM
-        FAKE_MODEM = copy(fakemodems.ZteK3565Z())
+        fakeModem = fakemodems.ZteK3565Z.clone()
         # Test the case where AT+CLAC returns a response for ZTE devices, and it includes +ZPAS and +VTS
-        FAKE_MODEM.responses['AT+CLAC\r'][-1] = '+ZPAS\r\n'
-        FAKE_MODEM.responses['AT+CLAC\r'].append('OK\r\n')
-        mockSerial = MockSerialPackage()
-        gsmmodem.serial_comms.serial = mockSerial
-        modem = gsmmodem.modem.GsmModem('-- PORT IGNORED DURING TESTS --')
-        modem.connect()
+        fakeModem.responses['AT+CLAC\r'] = fakeModem.responses['AT+CLAC\r'][:-1] + ['+ZPAS\r\n', '+VTS\r\n', 'OK\r\n']
+        await self.connectModem(fakeModem)
         self.assertTrue(gsmmodem.modem.Call.dtmfSupport, '+VTS in AT+CLAC response should have indicated DTMF support')
-        modem.close()
-        FAKE_MODEM = None
 
-    def test_huaweiConnectSpecifics(self):
+    async def test_zteConnectWithoutClac(self):
+        """ Tests connecting to a ZTE modem that does not support AT+CLAC: standard +VTS DTMF support is assumed """
+        # neither AT+CLAC nor any of the commands probed for instead are supported - only AT+ZPAS? identifies the modem
+        unsupported = ['AT+CLAC\r', 'AT+WIND?\r'] + [f'AT{command}=?\r' for command in ('^CVOICE', '+VTS', '^DTMF', '^USSDMODE', '+WIND', '+ZPAS', '+CSCS', '+CNUM')]
+        fakeModem = fakemodems.ZteK3565Z.clone(dict.fromkeys(unsupported, [_ERROR]))
+        with patch.object(gsmmodem.modem.Call, 'dtmfSupport', False):
+            await self.connectModem(fakeModem)
+            self.assertTrue(gsmmodem.modem.Call.dtmfSupport, 'ZTE modems without AT+CLAC should be assumed to support +VTS')
+
+    async def test_huaweiConnectSpecifics(self):
         """ Huawei-specific test cases that might not be covered by the modem profiles in fakemodems.py
         - this is mostly to attain 100% code coverage in tests
         """
-        global FAKE_MODEM
-        FAKE_MODEM = copy(fakemodems.HuaweiK3715())
         # Test the case where AT+CLAC returns no response for Huawei devices; causing the need for other methods to detect phone type
-        FAKE_MODEM.responses['AT+CLAC\r'] = ['ERROR\r\n']
-        mockSerial = MockSerialPackage()
-        gsmmodem.serial_comms.serial = mockSerial
-        modem = gsmmodem.modem.GsmModem('-- PORT IGNORED DURING TESTS --')
-        modem.connect()
+        fakeModem = fakemodems.HuaweiK3715.clone({'AT+CLAC\r': ['ERROR\r\n']})
+        await self.connectModem(fakeModem)
         # Huawei modems should have DTMF support
         self.assertTrue(gsmmodem.modem.Call.dtmfSupport, 'Huawei modems should have DTMF support')
-        modem.close()
-        FAKE_MODEM = None
 
-    def test_smscSpecifiedBeforeConnect(self):
+    async def test_smscSpecifiedBeforeConnect(self):
         """ Tests connect() operation when an SMSC number is set before connect() is called """
         smscNumber = '123454321'
-        global FAKE_MODEM
-        FAKE_MODEM = copy(fakemodems.GenericTestModem())
-        FAKE_MODEM.smsc = None
-        mockSerial = MockSerialPackage()
-        gsmmodem.serial_comms.serial = mockSerial
-        modem = gsmmodem.modem.GsmModem('-- PORT IGNORED DURING TESTS --')
+        fakeModem = self.genericFakeModem()
+        fakeModem.smsc = None
+        await self.createModem(fakeModem)
         # Look for the AT+CSCA write
-        cscaWritten = [False]
-        def writeCallbackFunc(data):
-            if data == 'AT+CSCA="{0}"\r'.format(smscNumber):
-                cscaWritten[0] = True
-        global SERIAL_WRITE_CALLBACK_FUNC
-        SERIAL_WRITE_CALLBACK_FUNC = writeCallbackFunc
-        # Set the SMSC number before calling connect()
-        modem.smsc = smscNumber
-        self.assertFalse(cscaWritten[0])
-        modem.connect()
-        self.assertTrue(cscaWritten[0], 'Preset SMSC value not written to modem during connect()')
-        self.assertEqual(modem.smsc, smscNumber, 'Pre-set SMSC not stored correctly during connect()')
-        modem.close()
-        FAKE_MODEM = None
-
-    def test_cpmsNotSupported(self):
+        csca = 'AT+CSCA="{0}"\r'.format(smscNumber)
+        written = {csca: False}
+        set_writeCallbackFunc(_flagWrites(written))
+        # Set the SMSC number before calling connect() (smsc() itself needs a connected modem to write to)
+        self.modem._smscNumber = smscNumber
+        self.assertFalse(written[csca])
+        await self.modem.connect()
+        self.assertTrue(written[csca], 'Preset SMSC value not written to modem during connect()')
+        self.assertEqual(await self.modem.smsc(), smscNumber, 'Pre-set SMSC not stored correctly during connect()')
+
+    async def test_cpmsNotSupported(self):
         """ Tests case where a modem does not support the AT+CPMS command """
-        global FAKE_MODEM            
-        FAKE_MODEM = copy(fakemodems.GenericTestModem())
-        FAKE_MODEM.responses['AT+CPMS=?\r'] = ['+CMS ERROR: 302\r\n']
         # This should pass without any problem, and AT+CPMS=? should at least have been checked during connect()
-        cpmsWritten = [False]
-        def writeCallbackFunc(data):
-            if data == 'AT+CPMS=?\r':
-                cpmsWritten[0] = True
-        global SERIAL_WRITE_CALLBACK_FUNC
-        SERIAL_WRITE_CALLBACK_FUNC = writeCallbackFunc
-        mockSerial = MockSerialPackage()
-        gsmmodem.serial_comms.serial = mockSerial
-        modem = gsmmodem.modem.GsmModem('-- PORT IGNORED DURING TESTS --')        
-        modem.connect()
-        SERIAL_WRITE_CALLBACK_FUNC = None        
-        self.assertTrue(cpmsWritten[0], 'Modem CPMS allowed values not checked during connect()')
-        modem.close()
-        FAKE_MODEM = None
-
-    def test_cnmiNotSupported(self):
+        written = await self._runConnect({_AT_CPMS_Q: ['+CMS ERROR: 302\r\n']}, [_AT_CPMS_Q])
+        self.assertTrue(written[_AT_CPMS_Q], 'Modem CPMS allowed values not checked during connect()')
+
+    async def test_cnmiNotSupported(self):
         """ Tests case where a modem does not support the AT+CNMI command (but does support other SMS-related commands) """
-        global FAKE_MODEM            
-        FAKE_MODEM = copy(fakemodems.GenericTestModem())
-        FAKE_MODEM.responses['AT+CNMI=2,1,0,2\r'] = ['ERROR\r\n']
-        FAKE_MODEM.responses['AT+CNMI=2,1,0,1,0\r'] = ['ERROR\r\n']
         # This should pass without any problem, and AT+CNMI=2,1,0,2 should at least have been attempted during connect()
-        cnmiWritten = [False]
-        def writeCallbackFunc(data):
-            if data == 'AT+CNMI=2,1,0,2\r':
-                cnmiWritten[0] = True
-        global SERIAL_WRITE_CALLBACK_FUNC
-        SERIAL_WRITE_CALLBACK_FUNC = writeCallbackFunc
-        mockSerial = MockSerialPackage()
-        gsmmodem.serial_comms.serial = mockSerial
-        modem = gsmmodem.modem.GsmModem('-- PORT IGNORED DURING TESTS --')        
-        modem.connect()
-        SERIAL_WRITE_CALLBACK_FUNC = None        
-        self.assertTrue(cnmiWritten[0], 'AT+CNMI setting not written to modem during connect()')
-        self.assertFalse(modem._smsReadSupported, 'Modem\'s internal SMS read support flag should be False if AT+CNMI is not supported')
-        modem.close()
-        FAKE_MODEM = None
-
-    def test_clipNotSupported(self):
+        written = await self._runConnect({_AT_CNMI_STD: ['ERROR\r\n'], 'AT+CNMI=2,1,0,1,0\r': ['ERROR\r\n']}, [_AT_CNMI_STD])
+        self.assertTrue(written[_AT_CNMI_STD], 'AT+CNMI setting not written to modem during connect()')
+        self.assertFalse(self.modem._smsReadSupported, 'Modem\'s internal SMS read support flag should be False if AT+CNMI is not supported')
+
+    async def test_fastInit(self):
+        """ Tests setting the SMS storage and notifications with one chained command line during connect() """
+        chained = 'AT+CPMS="ME","ME","ME";+CNMI=2,1,0,2\r'
+        for response, expectChained in ((['OK\r\n'], True), (['ERROR\r\n'], False)):
+            with self.subTest(response=response):
+                fakeModem = self.genericFakeModem({chained: response})
+                written = dict.fromkeys((chained, 'AT+CPMS="ME","ME","ME"\r', _AT_CNMI_STD), False)
+                await self.createModem(fakeModem)
+                self.modem.fastInit = True
+                with write_callback(_flagWrites(written)):
+                    await self.modem.connect()
+                self.assertTrue(written[chained], 'Chained AT+CPMS/AT+CNMI command not written to modem during connect()')
+                # a modem rejecting the chained command gets the settings one at a time
+                self.assertEqual(written['AT+CPMS="ME","ME","ME"\r'], not expectChained)
+                self.assertEqual(written[_AT_CNMI_STD], not expectChained)
+                self.assertTrue(self.modem._smsReadSupported)
+
+    async def test_asyncWith(self):
+        """ Tests using GsmModem as an async context manager that closes the modem on exit """
+        for connect in (True, False):
+            with self.subTest(connect=connect):
+                await self.createModem(self.genericFakeModem())
+                async with self.modem as modem:
+                    self.assertIs(modem, self.modem)
+                    if connect:
+                        await modem.connect()
+                        self.assertIsNotNone(modem._loop)
+                self.assertIsNone(self.modem._loop, 'Modem not closed on leaving the async with block')
+                # closing again (as tearDown does) is a no-op
+                await self.modem.close()
+
+    async def test_clipNotSupported(self):
         """ Tests case where a modem does not support the AT+CLIP command """
-        global FAKE_MODEM            
-        FAKE_MODEM = copy(fakemodems.GenericTestModem())
-        FAKE_MODEM.responses['AT+CLIP=1\r'] = ['ERROR\r\n']
         # This should pass without any problem, and AT+CLIP=1 should at least have been attempted during connect()
-        clipWritten = [False]
-        crcWritten = [False]
-        def writeCallbackFunc(data):
-            if data == 'AT+CLIP=1\r':
-                clipWritten[0] = True
-            elif data == 'AT+CRC=1\r':
-                crcWritten[0] = True
-        global SERIAL_WRITE_CALLBACK_FUNC
-        SERIAL_WRITE_CALLBACK_FUNC = writeCallbackFunc
-        mockSerial = MockSerialPackage()
-        gsmmodem.serial_comms.serial = mockSerial
-        modem = gsmmodem.modem.GsmModem('-- PORT IGNORED DURING TESTS --')        
-        modem.connect()
-        SERIAL_WRITE_CALLBACK_FUNC = None        
-        self.assertTrue(clipWritten[0], 'AT+CLIP=1 not written to modem during connect()')
-        self.assertFalse(crcWritten[0], 'AT+CRC=1 should not be attempted if AT+CLIP is not supported')
-        self.assertFalse(modem._callingLineIdentification, 'Modem\'s internal calling line identification flag should be False if AT+CLIP is not supported')
-        self.assertFalse(modem._extendedIncomingCallIndication, 'Modem\'s internal extended calling line identification information flag should be False if AT+CLIP is not supported')
-        modem.close()
-        FAKE_MODEM = None
-
-    def test_crcNotSupported(self):
+        written = await self._runConnect({_AT_CLIP1: ['ERROR\r\n']}, [_AT_CLIP1, _AT_CRC1])
+        self.assertTrue(written[_AT_CLIP1], 'AT+CLIP=1 not written to modem during connect()')
+        self.assertFalse(written[_AT_CRC1], 'AT+CRC=1 should not be attempted if AT+CLIP is not supported')
+        self.assertFalse(self.modem._callingLineIdentification, 'Modem\'s internal calling line identification flag should be False if AT+CLIP is not supported')
+        self.assertFalse(self.modem._extendedIncomingCallIndication, 'Modem\'s internal extended calling line identification information flag should be False if AT+CLIP is not supported')
+
+    async def test_crcNotSupported(self):
         """ Tests case where a modem does not support the AT+CRC command """
-        global FAKE_MODEM            
-        FAKE_MODEM = copy(fakemodems.GenericTestModem())
-        FAKE_MODEM.responses['AT+CRC=1\r'] = ['ERROR\r\n']
         # This should pass without any problem, and AT+CRC=1 should at least have been attempted during connect()
-        clipWritten = [False]
-        crcWritten = [False]
-        def writeCallbackFunc(data):
-            if data == 'AT+CLIP=1\r':
-                clipWritten[0] = True
-            elif data == 'AT+CRC=1\r':
-                crcWritten[0] = True
-        global SERIAL_WRITE_CALLBACK_FUNC
-        SERIAL_WRITE_CALLBACK_FUNC = writeCallbackFunc
-        mockSerial = MockSerialPackage()
-        gsmmodem.serial_comms.serial = mockSerial
-        modem = gsmmodem.modem.GsmModem('-- PORT IGNORED DURING TESTS --')        
-        modem.connect()
-        SERIAL_WRITE_CALLBACK_FUNC = None        
-        self.assertTrue(clipWritten[0], 'AT+CLIP=1 not written to modem during connect()')
-        self.assertTrue(crcWritten[0], 'AT+CRC=1 not written to modem during connect()')
-        self.assertTrue(modem._callingLineIdentification, 'Modem\'s internal calling line identification flag should be True if AT+CLIP is supported')
-        self.assertFalse(modem._extendedIncomingCallIndication, 'Modem\'s internal extended calling line identification information flag should be False if AT+CRC is not supported')
-        modem.close()
-        FAKE_MODEM = None
-
-
-class TestGsmModemDial(IsolatedAsyncioTestCase):
+        written = await self._runConnect({_AT_CRC1: ['ERROR\r\n']}, [_AT_CLIP1, _AT_CRC1])
+        self.assertTrue(written[_AT_CLIP1], 'AT+CLIP=1 not written to modem during connect()')
+        self.assertTrue(written[_AT_CRC1], 'AT+CRC=1 not written to modem during connect()')
+        self.assertTrue(self.modem._callingLineIdentification, 'Modem\'s internal calling line identification flag should be True if AT+CLIP is supported')
+        self.assertFalse(self.modem._extendedIncomingCallIndication, 'Modem\'s internal extended calling line identification information flag should be False if AT+CRC is not supported')
+
+
+class TestGsmModemDial(TestUsingMockModem):
+    """ Tests dialing outgoing calls """
+
+    log = logging.getLogger('gsmmodem.test.TestGsmModemDial')
+
+    # Seconds between call status polls in these tests (the modem's default is 0.5s) - keeps polling fake modems quick
+    _CALL_STATUS_POLL_INTERVAL = 0.05
+
+    async def asyncSetUp(self):
+        # (fakeModem, callId, callType): pre-call-init wait and call initiated notification to send after the ATD response
+        self._callInitSequences = {}
+        return await super().asyncSetUp()
+
+    async def _dial(self, fakeModem, number, callId, callType, writeCallbackFunc, **kwargs):
+        """ Dials number, with the mock modem responding to ATD as fakeModem would """
+        set_writeCallbackFunc(writeCallbackFunc)
+        key = (fakeModem, callId, callType)
+        callInit = self._callInitSequences.get(key)
+        if callInit is None:
+            callInit = self._callInitSequences[key] = fakeModem.getPreCallInitWaitSequence() + fakeModem.getCallInitNotification(callId, callType)
+        # ATD response, followed by a faked call initiated notification - queued up in one go. The ATD response is not
+        # cached: polling fake modems (GenericTestModem) track the call's state through it
+        set_response_sequence(itertools.chain(fakeModem.getAtdResponse(number), callInit))
+        return await self.modem.dial(number, **kwargs)
+
+    async def createModem(self, fakeModem=None):
+        """ Also shortens the modem's call status polling interval, and keeps count of its running call status polls
+        in self._callStatusPolls[0] """
+        await super().createModem(fakeModem)
+        self.modem._callStatusPollInterval = self._CALL_STATUS_POLL_INTERVAL
+        # a list of its own for every modem, so polls of a previous modem ending late don't throw off the count
+        polls = self._callStatusPolls = [0]
+        pollCallStatus = self.modem._pollCallStatus
+        activity = self.mockState.activity
+        async def countedPollCallStatus(*args, **kwargs):
+            polls[0] += 1
+            try:
+                return await pollCallStatus(*args, **kwargs)
+            finally:
+                polls[0] -= 1
+                activity.set()
+        self.modem._pollCallStatus = countedPollCallStatus
+
+    def _notifyRemote(self, notification):
+        """ Fakes a remote call status change """
+        send_response_sequence(notification)
 
-    async def asyncTearDown(self):
-        await self.modem.close()
-        global FAKE_MODEM
-        FAKE_MODEM = None
-    
-    async def init_modem(self, modem):
-        global FAKE_MODEM
-        FAKE_MODEM = modem
-        self.mockSerial = MockSerialPackage()
-        gsmmodem.serial_comms.serial = self.mockSerial        
-        self.modem = gsmmodem.modem.GsmModem('-- PORT IGNORED DURING TESTS --')
-        await self.modem.connect()
-    
     async def test_dial(self):
         """ Tests dialing without specifying a callback function """
         
         tests = (['0123456789', '1', '0'],)
         
-        global MODEMS
-        testModems = fakemodems.createModems()
-        testModems.append(fakemodems.GenericTestModem()) # Test polling only
+        testModems = self.fakeModems()
+        testModems.append(self.genericFakeModem()) # Test polling only
         for fakeModem in testModems:
-            self.init_modem(fakeModem)
-            
-            modem = self.modem.serial.modem # load the copy()-ed modem instance
+            await self.connectModem(fakeModem)
             
             for number, callId, callType in tests:
+                atd = 'ATD{0};\r'.format(number)
                 def writeCallbackFunc(data):
-                    if self.modem._mustPollCallStatus and data.startswith('AT+CLCC'):
-                        return # Can happen due to polling
-                    self.assertEqual('ATD{0};\r'.format(number), data, 'Invalid data written to modem; expected "{0}", got: "{1}". Modem: {2}'.format('ATD{0};'.format(number), data[:-1] if data[-1] == '\r' else data, modem))
-                    set_writeCallbackFunc()
-                set_writeCallbackFunc(writeCallbackFunc                )
-                self.modem.serial.responseSequence = modem.getAtdResponse(number)
-                self.modem.serial.responseSequence.extend(modem.getPreCallInitWaitSequence())
-                # Fake call initiated notification
-                self.modem.serial.responseSequence.extend(modem.getCallInitNotification(callId, callType))
-                call = self.modem.dial(number)
-                # Wait for the read buffer to clear
-                while len(self.modem.serial._readQueue) > 0 or len(self.modem.serial.responseSequence) > 0:
-                    time.sleep(0.05)
-                if self.modem._mustPollCallStatus:
-                    time.sleep(0.6)
+                    if data == atd:
+                        set_writeCallbackFunc()
+                    elif not (self.modem._mustPollCallStatus and data.startswith('AT+CLCC')): # Can happen due to polling
+                        self.fail(f'Invalid data written to modem; expected "{atd[:-1]}", got: "{data.rstrip(chr(13))}". Modem: {fakeModem}')
+                call = await self._dial(fakeModem, number, callId, callType, writeCallbackFunc)
                 self.assertIsInstance(call, gsmmodem.modem.Call)
                 self.assertIs(call.number, number)
                 # Check status
-                self.assertTrue(call.active, 'Call state invalid: should be active. Modem: {0}'.format(modem))
-                self.assertFalse(call.answered, 'Call state invalid: should not yet be answered. Modem: {0}'.format(modem))            
+                self.assertTrue(call.active, _LazyMsg(lambda: f'Call state invalid: should be active. Modem: {fakeModem}'))
+                self.assertFalse(call.answered, _LazyMsg(lambda: f'Call state invalid: should not yet be answered. Modem: {fakeModem}'))            
                 self.assertIn(call.id, self.modem.activeCalls)
                 self.assertEqual(len(self.modem.activeCalls), 1)
-                # Fake an answer
-                self.modem.serial.responseSequence = modem.getRemoteAnsweredNotification(callId, callType)
-                # Wait a bit for the event to be picked up
-                while len(self.modem.serial._readQueue) > 0 or len(self.modem.serial.responseSequence) > 0:                    
-                    time.sleep(0.05)
-                if self.modem._mustPollCallStatus:
-                    time.sleep(0.6) # Ensure polling picks up event
-                elif not self.modem._waitForCallInitUpdate:
-                    time.sleep(0.1) # Ensure event is picked up
-                self.assertTrue(call.answered, 'Remote call answer was not detected. Modem: {0}'.format(modem))
-                self.assertTrue(call.active, 'Call state invalid: should be active. Modem: {0}'.format(modem))
+                # Fake an answer, and wait for the event to be picked up
+                self._notifyRemote(fakeModem.getRemoteAnsweredNotification(callId, callType))
+                await self.waitFor(lambda: call.answered, _LazyMsg(lambda: f'Remote call answer was not detected. Modem: {fakeModem}'))
+                self.assertTrue(call.active, _LazyMsg(lambda: f'Call state invalid: should be active. Modem: {fakeModem}'))
                 def hangupCallback(data):
-                    if self.modem._mustPollCallStatus and data.startswith('AT+CLCC'):
-                        return # Can happen due to polling
-                    self.assertEqual('ATH\r'.format(number), data, 'Invalid data written to modem; expected "{0}", got: "{1}". Modem: {2}'.format('ATH'.format(number), data[:-1] if data[-1] == '\r' else data, modem))
+                    if data != 'ATH\r' and not (self.modem._mustPollCallStatus and data.startswith('AT+CLCC')): # Can happen due to polling
+                        self.fail(f'Invalid data written to modem; expected "ATH", got: "{data.rstrip(chr(13))}". Modem: {fakeModem}')
                 set_writeCallbackFunc(hangupCallback)
-                call.hangup()
-                self.assertFalse(call.answered, 'Hangup call did not change answered state. Modem: {0}'.format(modem))
-                self.assertFalse(call.active, 'Call state invalid: should not be active (local hangup). Modem: {0}'.format(modem))
+                await call.hangup()
+                set_writeCallbackFunc()
+                self.assertFalse(call.answered, _LazyMsg(lambda: f'Hangup call did not change answered state. Modem: {fakeModem}'))
+                self.assertFalse(call.active, _LazyMsg(lambda: f'Call state invalid: should not be active (local hangup). Modem: {fakeModem}'))
                 self.assertNotIn(call.id, self.modem.activeCalls)
                 self.assertEqual(len(self.modem.activeCalls), 0)
+                # Let the call end on the (fake) modem's side as well, and make sure call status polling has stopped
+                # before dialing again - it would otherwise end the next call, which gets the same call ID
+                fakeModem.getRemoteHangupNotification(callId, callType)
+                await self.waitFor(lambda: not self._callStatusPolls[0], _LazyMsg(lambda: f'Call status polling did not stop. Modem: {fakeModem}'))
 
                 ############## Check remote hangup detection ###############
-                set_writeCallbackFunc(writeCallbackFunc)
-                self.modem.serial.responseSequence = modem.getAtdResponse(number)
-                self.modem.serial.responseSequence.extend(modem.getPreCallInitWaitSequence())
-                # Fake call initiated notification
-                self.modem.serial.responseSequence.extend(modem.getCallInitNotification(callId, callType))                
-                call = self.modem.dial(number)
-                self.assertTrue(call.active, 'Call state invalid: should be active. Modem: {0}'.format(modem))
-                # Wait a bit for the event to be picked up
-                while len(self.modem.serial._readQueue) > 0 or len(self.modem.serial.responseSequence) > 0:
-                    time.sleep(0.05)
-                if self.modem._mustPollCallStatus:
-                    time.sleep(0.6) # Ensure polling picks up event
+                call = await self._dial(fakeModem, number, callId, callType, writeCallbackFunc)
+                self.assertTrue(call.active, _LazyMsg(lambda: f'Call state invalid: should be active. Modem: {fakeModem}'))
                 # Fake remote answer
-                self.modem.serial.responseSequence = modem.getRemoteAnsweredNotification(callId, callType)
-                while len(self.modem.serial._readQueue) > 0 or len(self.modem.serial.responseSequence) > 0:
-                    time.sleep(0.05)
-                if self.modem._mustPollCallStatus:
-                    time.sleep(0.5) # Ensure polling picks up event
-                elif not self.modem._waitForCallInitUpdate:
-                    time.sleep(0.1) # Ensure event is picked up
-                self.assertTrue(call.answered, 'Remote call answer was not detected. Modem: {0}'.format(modem))
+                self._notifyRemote(fakeModem.getRemoteAnsweredNotification(callId, callType))
+                await self.waitFor(lambda: call.answered, _LazyMsg(lambda: f'Remote call answer was not detected. Modem: {fakeModem}'))
                 self.assertIn(call.id, self.modem.activeCalls)
                 self.assertEqual(len(self.modem.activeCalls), 1)
                 # Now fake a remote hangup
-                self.modem.serial.responseSequence = modem.getRemoteHangupNotification(callId, callType)
-                # Wait a bit for the event to be picked up
-                while len(self.modem.serial._readQueue) > 0 or len(self.modem.serial.responseSequence) > 0:
-                    time.sleep(0.05)
-                if self.modem._mustPollCallStatus:
-                    time.sleep(0.6) # Ensure polling picks up event
-                self.assertFalse(call.answered, 'Remote hangup was not detected. Modem: {0}'.format(modem))
-                self.assertFalse(call.active, 'Call state invalid: should not be active (remote hangup). Modem: {0}'.format(modem))
+                self._notifyRemote(fakeModem.getRemoteHangupNotification(callId, callType))
+                await self.waitFor(lambda: not call.active, _LazyMsg(lambda: f'Remote hangup was not detected. Modem: {fakeModem}'))
+                self.assertFalse(call.answered, _LazyMsg(lambda: f'Remote hangup was not detected. Modem: {fakeModem}'))
                 self.assertNotIn(call.id, self.modem.activeCalls)
                 self.assertEqual(len(self.modem.activeCalls), 0)
 
                 ############## Check remote call rejection (hangup before answering) ###############
-                set_writeCallbackFunc(writeCallbackFunc)
-                self.modem.serial.responseSequence = modem.getAtdResponse(number)
-                self.modem.serial.responseSequence.extend(modem.getPreCallInitWaitSequence())
-                # Fake call initiated notification
-                self.modem.serial.responseSequence.extend(modem.getCallInitNotification(callId, callType))
-                call = self.modem.dial(number)
-                self.assertTrue(call.active, 'Call state invalid: should be active. Modem: {0}'.format(modem))
-                # Wait a bit for the event to be picked up
-                while len(self.modem.serial._readQueue) > 0 or len(self.modem.serial.responseSequence) > 0:
-                    time.sleep(0.05)
-                if self.modem._mustPollCallStatus:
-                    time.sleep(0.6) # Ensure polling picks up event
-                self.assertFalse(call.answered, 'Call should not have been in "answered" state. Modem: {0}'.format(modem))
+                call = await self._dial(fakeModem, number, callId, callType, writeCallbackFunc)
+                self.assertTrue(call.active, _LazyMsg(lambda: f'Call state invalid: should be active. Modem: {fakeModem}'))
+                self.assertFalse(call.answered, _LazyMsg(lambda: f'Call should not have been in "answered" state. Modem: {fakeModem}'))
                 self.assertIn(call.id, self.modem.activeCalls)
                 self.assertEqual(len(self.modem.activeCalls), 1)
                 # Now reject the call
-                self.modem.serial.responseSequence = modem.getRemoteRejectCallNotification(callId, callType)
-                # Wait a bit for the event to be picked up
-                while len(self.modem.serial._readQueue) > 0 or len(self.modem.serial.responseSequence) > 0:
-                    time.sleep(0.05)
-                if self.modem._mustPollCallStatus:
-                    time.sleep(0.6) # Ensure polling picks up event
-                time.sleep(0.05)
-                self.assertFalse(call.answered, 'Call state invalid: should not be answered (remote call rejection). Modem: {0}'.format(modem))
-                self.assertFalse(call.active, 'Call state invalid: should not be active (remote rejection). Modem: {0}'.format(modem))
+                self._notifyRemote(fakeModem.getRemoteRejectCallNotification(callId, callType))
+                await self.waitFor(lambda: not call.active, _LazyMsg(lambda: f'Call state invalid: should not be active (remote rejection). Modem: {fakeModem}'))
+                self.assertFalse(call.answered, _LazyMsg(lambda: f'Call state invalid: should not be answered (remote call rejection). Modem: {fakeModem}'))
                 self.assertNotIn(call.id, self.modem.activeCalls)
                 self.assertEqual(len(self.modem.activeCalls), 0)
-            await self.modem.close()
-
-        async def test_dialCallback(self):
-            """ Tests the dial method's callback mechanism """
-            tests = (['12345678', '1', '0'],)
-
-            global MODEMS
-            testModems = fakemodems.createModems()
-            testModems.append(fakemodems.GenericTestModem()) # Test polling only
-            for fakeModem in testModems:
-                self.init_modem(fakeModem)
 
-                modem = self.modem.serial.modem # load the copy()-ed modem instance
+    async def test_dialCallback(self):
+        """ Tests the dial method's callback mechanism """
+        tests = (['12345678', '1', '0'],)
 
-                for number, callId, callType in tests:
+        testModems = self.fakeModems()
+        testModems.append(self.genericFakeModem()) # Test polling only
+        for fakeModem in testModems:
+            await self.connectModem(fakeModem)
 
-                    callbackVars = [None, False, 0]
+            for number, callId, callType in tests:
 
-                    def callUpdateCallbackFunc1(call):
-                        self.assertIsInstance(call, gsmmodem.modem.Call)
-                        self.assertEqual(call, callbackVars[0])
-                        # Check call status
-                        if callbackVars[2] == 0: # Expected "answer" event
-                            self.assertTrue(call.active, 'Call state invalid: should be active. Modem: {0}'.format(modem))
-                            self.assertTrue(call.answered, 'Call state invalid: should have been answered. Modem: {0}'.format(modem))
-                        elif callbackVars[2] == 1: # Expected "hangup" event
-                            self.assertFalse(call.answered, 'Call state invalid: "answered" should be false after hangup. Modem: {0}'.format(modem))
-                            self.assertFalse(call.active, 'Call state invalid: should be inactive. Modem: {0}'.format(modem))
-                        callbackVars[1] = True # set "callback called" flag
+                callbackVars = [None, False, 0]
 
-                    call = self.modem.dial(number, callStatusUpdateCallbackFunc=callUpdateCallbackFunc1)
+                def callUpdateCallbackFunc1(call):
                     self.assertIsInstance(call, gsmmodem.modem.Call)
-                    callbackVars[0] = call
-                    self.assertTrue(call.active, 'Call state invalid: should be active. Modem: {0}'.format(modem))
-                    self.assertFalse(call.answered, 'Call state invalid: should not yet be answered. Modem: {0}'.format(modem))
-                    # Fake an answer...
-                    self.modem.serial.responseSequence = modem.getRemoteAnsweredNotification(callId, callType)
-                    # ...and wait for the callback to be called
-                    while not callbackVars[1]:
-                        time.sleep(0.05)
-                    # Double check local call variable
-                    self.assertTrue(call.active, 'Call state invalid: should be active. Modem: {0}'.format(modem))
-                    self.assertTrue(call.answered, 'Call state invalid: should have been answered. Modem: {0}'.format(modem))
-                    # Fake remote hangup...
-                    callbackVars[1] = False
-                    callbackVars[2] = 1
-                    self.modem.serial.responseSequence = modem.getRemoteAnsweredNotification(callId, callType)
-                    # ...and wait for the callback to be called
-                    while not callbackVars[1]:
-                        time.sleep(0.05)
-                    # Double check local call variable
-                    self.assertFalse(call.answered, 'Call state invalid: "answered" should be false after hangup. Modem: {0}'.format(modem))
-                    self.assertFalse(call.active, 'Call state invalid: should be inactive. Modem: {0}'.format(modem))
-
-            await self.modem.close()
+                    self.assertEqual(call, callbackVars[0])
+                    # Check call status
+                    if callbackVars[2] == 0: # Expected "answer" event
+                        self.assertTrue(call.active, _LazyMsg(lambda: f'Call state invalid: should be active. Modem: {fakeModem}'))
+                        self.assertTrue(call.answered, _LazyMsg(lambda: f'Call state invalid: should have been answered. Modem: {fakeModem}'))
+                    elif callbackVars[2] == 1: # Expected "hangup" event
+                        self.assertFalse(call.answered, _LazyMsg(lambda: f'Call state invalid: "answered" should be false after hangup. Modem: {fakeModem}'))
+                        self.assertFalse(call.active, _LazyMsg(lambda: f'Call state invalid: should be inactive. Modem: {fakeModem}'))
+                    callbackVars[1] = True # set "callback called" flag
+
+                call = await self._dial(fakeModem, number, callId, callType, None, callStatusUpdateCallbackFunc=callUpdateCallbackFunc1)
+                self.assertIsInstance(call, gsmmodem.modem.Call)
+                callbackVars[0] = call
+                self.assertTrue(call.active, _LazyMsg(lambda: f'Call state invalid: should be active. Modem: {fakeModem}'))
+                self.assertFalse(call.answered, _LazyMsg(lambda: f'Call state invalid: should not yet be answered. Modem: {fakeModem}'))
+                # Fake an answer...
+                self._notifyRemote(fakeModem.getRemoteAnsweredNotification(callId, callType))
+                # ...and wait for the callback to be called
+                await self.waitFor(lambda: callbackVars[1], _LazyMsg(lambda: f'Call status update callback not called (answer). Modem: {fakeModem}'))
+                # Double check local call variable
+                self.assertTrue(call.active, _LazyMsg(lambda: f'Call state invalid: should be active. Modem: {fakeModem}'))
+                self.assertTrue(call.answered, _LazyMsg(lambda: f'Call state invalid: should have been answered. Modem: {fakeModem}'))
+                # Fake remote hangup...
+                callbackVars[1] = False
+                callbackVars[2] = 1
+                self._notifyRemote(fakeModem.getRemoteHangupNotification(callId, callType))
+                # ...and wait for the callback to be called
+                await self.waitFor(lambda: callbackVars[1], _LazyMsg(lambda: f'Call status update callback not called (hangup). Modem: {fakeModem}'))
+                # Double check local call variable
+                self.assertFalse(call.answered, _LazyMsg(lambda: f'Call state invalid: "answered" should be false after hangup. Modem: {fakeModem}'))
+                self.assertFalse(call.active, _LazyMsg(lambda: f'Call state invalid: should be inactive. Modem: {fakeModem}'))
     
-    def test_dialError(self):
+    async def test_dialError(self):
         """ Test error handling when dialing """
-        self.init_modem(fakemodems.HuaweiK3715()) # Use a modem that supports call update notifications
+        await self.connectModem(fakemodems.HuaweiK3715.clone()) # Use a modem that supports call update notifications
         set_response_sequence(['+CME ERROR: 30\r\n'])
-        self.assertRaises(gsmmodem.exceptions.CmeError, self.modem.dial, '123')
+        with self.assertRaises(gsmmodem.exceptions.CmeError):
+            await self.modem.dial('123')
         set_response_sequence(['+CMS ERROR: 500\r\n'])
-        self.assertRaises(gsmmodem.exceptions.CmsError, self.modem.dial, '123')
+        with self.assertRaises(gsmmodem.exceptions.CmsError):
+            await self.modem.dial('123')
         set_response_sequence(['ERROR\r\n'])
-        self.assertRaises(gsmmodem.exceptions.CommandError, self.modem.dial, '123')
+        with self.assertRaises(gsmmodem.exceptions.CommandError):
+            await self.modem.dial('123')
     
-    def test_dial_callInitEventTimeout(self):
+    async def test_dial_callInitEventTimeout(self):
         """ Test dial() timeout event: call initiated event never occurs """
-        self.init_modem(fakemodems.HuaweiK3715()) # Use a modem that supports call update notifications
+        await self.connectModem(fakemodems.HuaweiK3715.clone()) # Use a modem that supports call update notifications
         # The following should timeout very quickly - ATD does not timeout, but no call is established
-        self.assertRaises(gsmmodem.exceptions.TimeoutException, self.modem.dial, **{'number': '123', 'timeout': 0.05})
+        # (dial() times out through asyncio.wait_for() itself; the outer deadline only stops a hang if it doesn't)
+        with self.assertRaises(gsmmodem.exceptions.TimeoutException):
+            await asyncio.wait_for(self.modem.dial(number='123', timeout=0.05), 1)
+        self.assertIsNone(self.modem._dialEvent, 'Call init event not cleared after dial() timed out')
     
-    def test_dial_atdTimeout(self):
+    async def test_dial_atdTimeout(self):
         """ Test dial() timeout event: ATD command timeout """
-        self.init_modem(fakemodems.GenericTestModem())
         # Disable ATD response
-        self.modem.serial.modem.responses['ATD123;\r'] = []
+        fakeModem = self.genericFakeModem({'ATD123;\r': []})
+        await self.connectModem(fakeModem)
         # The following should timeout very quickly - no ATD command response received
-        self.assertRaises(gsmmodem.exceptions.TimeoutException, self.modem.dial, **{'number': '123', 'timeout': 0.05})
+        with self.assertRaises(gsmmodem.exceptions.TimeoutException):
+            await asyncio.wait_for(self.modem.dial(number='123', timeout=0.05), 1)
 
 
-class TestGsmModemPinConnect(IsolatedAsyncioTestCase):
+class TestGsmModemPinConnect(TestUsingMockModem):
     """ Tests PIN unlocking and connect() method of GsmModem class (excluding connect/close) """
-    
-    async def asyncTearDown(self):
-        global FAKE_MODEM
-        FAKE_MODEM = None
-    
-    def init_modem(self, modem):
-        global FAKE_MODEM
-        FAKE_MODEM = modem
-        self.mockSerial = MockSerialPackage()
-        gsmmodem.serial_comms.serial = self.mockSerial
-        self.modem = gsmmodem.modem.GsmModem('-- PORT IGNORED DURING TESTS --')        
-        
+
+    log = logging.getLogger('gsmmodem.test.TestGsmModemPinConnect')
+
+    # every test connects to (PIN-locked) fake modems of its own
+    connectHandshake = False
+
     async def test_connectPinLockedNoPin(self):
         """ Test connecting to the modem with a SIM PIN code - no PIN specified"""
-        testModems = fakemodems.createModems()
+        testModems = self.fakeModems()
         for modem in testModems:
-            modem.pinLock = True
-            self.init_modem(modem)
-            self.assertRaises(PinRequiredError, self.modem.connect)
-            await self.modem.close()
-    
+            with self.subTest(modem=str(modem)):
+                modem.pinLock = True
+                await self.createModem(modem)
+                with self.assertRaises(PinRequiredError):
+                    await self.modem.connect()
+
     async def test_connectPinLockedWithPin(self):
         """ Test connecting to the modem with a SIM PIN code - PIN specified"""
-        testModems = fakemodems.createModems()
+        testModems = self.fakeModems()
         # Also test a modem that allows only CMEE commands before PIN is entered
-        edgeCaseModem = fakemodems.GenericTestModem()
+        edgeCaseModem = self.genericFakeModem()
         edgeCaseModem.commandsNoPinRequired = ['AT+CMEE=1\r']
         testModems.append(edgeCaseModem)
         for modem in testModems:
-            modem.pinLock = True
-            self.init_modem(modem)
-            # This should succeed
-            try:
-                self.modem.connect(pin='1234')
-            except PinRequiredError:
-                self.fail("Pin required exception thrown for modem {0}".format(modem))
-            finally:
-                await self.modem.close()
-    
+            with self.subTest(modem=str(modem)):
+                modem.pinLock = True
+                await self.createModem(modem)
+                # This should succeed
+                try:
+                    await self.modem.connect(pin='1234')
+                except PinRequiredError:
+                    self.fail(f'Pin required exception thrown for modem {modem}')
+
     async def test_connectPin_incorrect(self):
         """ Test connecting to the modem with a SIM PIN code - incorrect PIN specified """
         def writeCallbackFunc(data):
             if data.startswith('AT+CPIN="'):
                 # Fake "incorrect PIN" response
                 set_response_sequence(['+CME ERROR: 16\r\n'])
-        global SERIAL_WRITE_CALLBACK_FUNC
-        SERIAL_WRITE_CALLBACK_FUNC = writeCallbackFunc
-        fakeModem = fakemodems.GenericTestModem()
+        fakeModem = self.genericFakeModem()
         fakeModem.pinLock = True
-        self.init_modem(fakeModem)
-        self.assertRaises(gsmmodem.exceptions.IncorrectPinError, self.modem.connect, **{'pin': '1234'})
-        await self.modem.close()
-        SERIAL_WRITE_CALLBACK_FUNC = None
-    
+        await self.createModem(fakeModem)
+        with write_callback(writeCallbackFunc), self.assertRaises(gsmmodem.exceptions.IncorrectPinError):
+            await self.modem.connect(pin='1234')
+
     async def test_connectPin_pukRequired(self):
         """ Test connecting to the modem with a SIM PIN code - SIM locked; PUK required """
         def writeCallbackFunc(data):
             if data.startswith('AT+CPIN="'):
                 # Fake "PUK required" response
                 set_response_sequence(['+CME ERROR: 12\r\n'])
-        global SERIAL_WRITE_CALLBACK_FUNC
-        SERIAL_WRITE_CALLBACK_FUNC = writeCallbackFunc
-        fakeModem = fakemodems.GenericTestModem()
+        fakeModem = self.genericFakeModem()
         fakeModem.pinLock = True
-        self.init_modem(fakeModem)
-        self.assertRaises(gsmmodem.exceptions.PukRequiredError, self.modem.connect, **{'pin': '1234'})
-        await self.modem.close()
-        SERIAL_WRITE_CALLBACK_FUNC = None
-    
+        await self.createModem(fakeModem)
+        with write_callback(writeCallbackFunc), self.assertRaises(gsmmodem.exceptions.PukRequiredError):
+            await self.modem.connect(pin='1234')
+
     async def test_connectPin_timeoutEvents(self):
         """ Test different TimeoutException scenarios when checking PIN status (github issue #19) """
-        
+
         tests = (([0.05], True), (['+CPIN: READY\r\n'], False), (['FIRST LINE\r\n', 'SECOND LINE\r\n'], True))
-        
+
         for response, shouldTimeout in tests:
             def writeCallbackFunc(data):
                 if data.startswith('AT+CPIN?'):
                     # Fake "incorrect PIN" response
-                    self.modem.serial.responseSequence = response
-        
-            global SERIAL_WRITE_CALLBACK_FUNC
-            SERIAL_WRITE_CALLBACK_FUNC = writeCallbackFunc
-            fakeModem = fakemodems.GenericTestModem()
+                    set_response_sequence(response)
+
+            fakeModem = self.genericFakeModem()
             fakeModem.pinLock = False
-            self.init_modem(fakeModem)
-            if shouldTimeout:
-                self.assertRaises(gsmmodem.exceptions.TimeoutException, self.modem.connect)
-            else:
-                await self.modem.connect() # should run fine
-            await self.modem.close()
-            SERIAL_WRITE_CALLBACK_FUNC = None
+            await self.createModem(fakeModem)
+            with write_callback(writeCallbackFunc):
+                if shouldTimeout:
+                    with self.assertRaises(gsmmodem.exceptions.TimeoutException):
+                        await self.modem.connect()
+                else:
+                    await self.modem.connect() # should run fine
 
 
-class TestIncomingCall(IsolatedAsyncioTestCase):
-    
-    async def asyncTearDown(self):
-        global FAKE_MODEM
-        FAKE_MODEM = None
-        await self.modem.close()
-    
-    async def init_modem(self, modem, incomingCallCallbackFunc):
-        global FAKE_MODEM
-        FAKE_MODEM = modem
-        self.mockSerial = MockSerialPackage()
-        gsmmodem.serial_comms.serial = self.mockSerial        
-        self.modem = gsmmodem.modem.GsmModem('-- PORT IGNORED DURING TESTS --', incomingCallCallbackFunc=incomingCallCallbackFunc)
+class TestIncomingCall(TestUsingMockModem):
+    """ Tests handling incoming calls """
+
+    log = logging.getLogger('gsmmodem.test.TestIncomingCall')
+
+    # every test connects to a fake modem of its own, with its own incoming call handler
+    connectHandshake = False
+
+    async def init_modem(self, fakeModem, incomingCallCallbackFunc):
+        await self.createModem(fakeModem)
+        self._callDone = asyncio.Event()
+        self._callbackError = None
+        async def callbackFunc(call):
+            # incoming call notifications are handled outside the test, so record failures for _waitForCall() to raise
+            try:
+                await incomingCallCallbackFunc(call)
+            except BaseException as e:
+                self._callbackError = e
+            finally:
+                self._callDone.set()
+        self.modem.incomingCallCallback = callbackFunc
         await self.modem.connect()
-    
+
+    async def _waitForCall(self, timeout=5):
+        """ Waits for the incoming call handler to finish, re-raising anything it failed with """
+        try:
+            await asyncio.wait_for(self._callDone.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.fail(f'Incoming call handler not called within {timeout} seconds')
+        self._callDone.clear()
+        if self._callbackError is not None:
+            raise self._callbackError
+
     async def test_incomingCallAnswer(self):
 
-        for modem in fakemodems.createModems():
-            callReceived = [False, 'VOICE', '']
-            def incomingCallCallbackFunc(call):
-                try:                    
+        for modem in self.fakeModems():
+            with self.subTest(modem=str(modem)):
+                callReceived = ['VOICE', '']
+                # the subTest already names the modem, and unittest's tuple diff shows which field differs
+                async def incomingCallCallbackFunc(call):
                     self.assertIsInstance(call, gsmmodem.modem.IncomingCall)
-                    self.assertIn(call.id, self.modem.activeCalls)
-                    self.assertEqual(len(self.modem.activeCalls), 1)
-                    self.assertEqual(call.number, callReceived[2], 'Caller ID (caller number) incorrect. Expected: "{0}", got: "{1}". Modem: {2}'.format(callReceived[2], call.number, modem))
-                    self.assertFalse(call.answered, 'Call state invalid: should not yet be answered. Modem: {0}'.format(modem))
-                    self.assertIsInstance(call.type, int)
-                    self.assertEqual(call.type, callReceived[1], 'Invalid call type; expected "{0}", got "{1}". Modem: {2}'.format(callReceived[1], call.type, modem))
+                    # (registered as active call, number of active calls, caller ID, answered, call type is int, call type)
+                    self.assertEqual((call.id in self.modem.activeCalls, len(self.modem.activeCalls), call.number, call.answered, isinstance(call.type, int), call.type),
+                                     (True, 1, callReceived[1], False, True, callReceived[0]), 'Incoming call state invalid')
                     def writeCallbackFunc1(data):
-                        self.assertEqual('ATA\r', data, 'Invalid data written to modem; expected "{0}", got: "{1}". Modem: {2}'.format('ATA\r', data, modem))
+                        if data != 'ATA\r':
+                            self.fail(f'Invalid data written to modem; expected "ATA\\r", got: "{data}"')
                     set_writeCallbackFunc(writeCallbackFunc1)
-                    call.answer()
-                    self.assertTrue(call.answered, 'Call state invalid: should be answered. Modem: {0}'.format(modem))
+                    await call.answer()
+                    self.assertTrue(call.answered, 'Call state invalid: should be answered')
                     # Call answer() again - shouldn't do anything
                     def writeCallbackShouldNotBeCalled(data):
-                        self.fail('Nothing should have been written to modem, but got: {0}'.format(data))
+                        self.fail(f'Nothing should have been written to modem, but got: {data}')
                     set_writeCallbackFunc(writeCallbackShouldNotBeCalled)
-                    call.answer()
+                    await call.answer()
                     # Hang up
                     def writeCallbackFunc2(data):
-                        self.assertEqual('ATH\r', data, 'Invalid data written to modem; expected "{0}", got: "{1}". Modem: {2}'.format('ATH\r', data, modem))
+                        if data != 'ATH\r':
+                            self.fail(f'Invalid data written to modem; expected "ATH\\r", got: "{data}"')
                     set_writeCallbackFunc(writeCallbackFunc2)
-                    call.hangup()
-                    self.assertFalse(call.answered, 'Call state invalid: hangup did not change call state. Modem: {0}'.format(modem))
-                    self.assertNotIn(call.id, self.modem.activeCalls)
-                    self.assertEqual(len(self.modem.activeCalls), 0)
+                    await call.hangup()
+                    self.assertEqual((call.answered, call.id in self.modem.activeCalls, len(self.modem.activeCalls)),
+                                     (False, False, 0), 'Call state invalid: hangup did not end the call')
                     # Call hangup() again - shouldn't do anything
                     set_writeCallbackFunc(writeCallbackShouldNotBeCalled)
-                    call.hangup()
-                finally:
-                    callReceived[0] = True
-        
-            self.init_modem(modem, incomingCallCallbackFunc)
-        
-            tests = (('+27820001234', 'VOICE', 0),)
-        
-            for number, cringParam, callType in tests:
-                callReceived[0] = False
-                callReceived[1] = callType
-                callReceived[2] = number
-                # Fake incoming voice call                
-                self.modem.serial.responseSequence = modem.getIncomingCallNotification(number, cringParam)
-                # Wait for the handler function to finish
-                while callReceived[0] == False:
-                    time.sleep(0.05)
-            await self.modem.close()
-    
-    def test_incomingCallCrcNotSupported(self):
+                    await call.hangup()
+                    set_writeCallbackFunc()
+
+                await self.init_modem(modem, incomingCallCallbackFunc)
+
+                tests = (('+27820001234', 'VOICE', 0),)
+
+                for number, cringParam, callType in tests:
+                    callReceived[0] = callType
+                    callReceived[1] = number
+                    # Fake incoming voice call
+                    send_response_sequence(modem.getIncomingCallNotification(number, cringParam))
+                    # Wait for the handler function to finish
+                    await self._waitForCall()
+
+    async def test_incomingCallCrcNotSupported(self):
         """ Tests handling incoming calls without +CRC support """
-        callReceived = [False]
-        def callbackFunc(call):
+        async def callbackFunc(call):
             self.assertIsInstance(call, gsmmodem.modem.IncomingCall)
-            self.assertEqual(call.type, None, 'Invalid call type; expected "{0}", got "{1}".'.format(None, call.type))
-            callReceived[0] = True
-        
-        testModem = copy(fakemodems.GenericTestModem())
-        testModem.responses['AT+CRC?\r'] = ['ERROR\r\n']
-        testModem.responses['AT+CRC=1\r'] = ['ERROR\r\n']
-        self.init_modem(testModem, incomingCallCallbackFunc=callbackFunc)
-        
+            self.assertEqual(call.type, None, 'Invalid call type')
+
+        testModem = self.genericFakeModem({'AT+CRC?\r': ['ERROR\r\n'], 'AT+CRC=1\r': ['ERROR\r\n']})
+        await self.init_modem(testModem, incomingCallCallbackFunc=callbackFunc)
+
         # Ensure extended incoming call indications are active
         self.assertFalse(self.modem._extendedIncomingCallIndication, 'Extended incoming call indicator flag should be False')
         # Fake incoming voice call using basic incoming call indication format
-        set_response_sequence(['RING\r\n', '+CLIP: "+27821231234",145,,,,0\r\n'])
+        send_response_sequence(['RING\r\n', '+CLIP: "+27821231234",145,,,,0\r\n'])
         # Wait for the handler function to finish
-        while callReceived[0] == False:
-            time.sleep(0.1)
+        await self._waitForCall()
         self.assertFalse(self.modem._extendedIncomingCallIndication, 'Extended incoming call indicator flag should be False')
-    
-    def test_incomingCallCrcChangedExternally(self):
+
+    async def test_incomingCallCrcChangedExternally(self):
         """ Tests handling incoming call notifications when the +CRC setting \
         was modfied by some external program (issue #18) """
-        
-        callReceived = [False]
-        def callbackFunc(call):
+
+        async def callbackFunc(call):
             self.assertIsInstance(call, gsmmodem.modem.IncomingCall)
-            callReceived[0] = True
-        
-        self.init_modem(None, incomingCallCallbackFunc=callbackFunc)
-        
+
+        testModem = self.genericFakeModem()
+        await self.init_modem(testModem, incomingCallCallbackFunc=callbackFunc)
+
         # Ensure extended incoming call indications are active
         self.assertTrue(self.modem._extendedIncomingCallIndication, 'Extended incoming call indicator flag should be True')
         # Fake incoming voice call using extended incoming call indication format
-        set_response_sequence(['+CRING: VOICE\r\n', '+CLIP: "+27821231234",145,,,,0\r\n'])
+        send_response_sequence(['+CRING: VOICE\r\n', '+CLIP: "+27821231234",145,,,,0\r\n'])
         # Wait for the handler function to finish
-        while callReceived[0] == False:
-            time.sleep(0.1)
-        callReceived[0] = False
+        await self._waitForCall()
         # Now fake incoming call using basic incoming call indication format (without informing GsmModem class about change)
-        set_response_sequence(['RING\r\n', '+CLIP: "+27821231234",145,,,,0\r\n'])
+        send_response_sequence(['RING\r\n', '+CLIP: "+27821231234",145,,,,0\r\n'])
         # Wait for the handler function to finish
-        while callReceived[0] == False:
-            time.sleep(0.05)
+        await self._waitForCall()
         # Ensure extended incoming call indications have been re-enabled
         self.assertTrue(self.modem._extendedIncomingCallIndication, 'Extended incoming call indicator flag should be True')
-        
+
         # Now repeat the test, but cause re-enabling the +CRC setting to fail
-        self.modem.serial.modem.responses['AT+CRC=1\r'] = ['ERROR\r\n']
-        callReceived[0] = False
+        testModem.responses['AT+CRC=1\r'] = ['ERROR\r\n']
         # Basic incoming call indication format (without informing GsmModem class about change)
-        set_response_sequence(['RING\r\n', '+CLIP: "+27821231234",145,,,,0\r\n'])
+        send_response_sequence(['RING\r\n', '+CLIP: "+27821231234",145,,,,0\r\n'])
         # Wait for the handler function to finish
-        while callReceived[0] == False:
-            time.sleep(0.05)
+        await self._waitForCall()
         # Since re-enabling the extended format failed,  extended incoming call indications flag should be False
         self.assertFalse(self.modem._extendedIncomingCallIndication, 'Extended incoming call indicator flag should be False because AT+CRC=1 failed')
 
 
-class TestCall(IsolatedAsyncioTestCase):
+class TestCall(TestUsingMockModem):
     """ Tests Call object APIs that are not covered by TestIncomingCall and TestGsmModemDial """
-    
-    async def init_modem(self, modem):
-        global FAKE_MODEM
-        FAKE_MODEM = modem
-        gsmmodem.serial_comms.serial = MockSerialPackage()
-        self.modem = gsmmodem.modem.GsmModem('-- PORT IGNORED DURING TESTS --')
-        await self.modem.connect()
-        FAKE_MODEM = None
+
+    log = logging.getLogger('gsmmodem.test.TestCall')
 
     async def testDtmf(self):
         """ Tests sending DTMF tones in a phone call """
         originalBaseDtmfCommand = gsmmodem.modem.Call.DTMF_COMMAND_BASE
-        for fakeModem in fakemodems.createModems():
-            gsmmodem.modem.Call.DTMF_COMMAND_BASE = originalBaseDtmfCommand
-            await self.init_modem(fakeModem)
-            # Make sure everything is set up correctly during connect()
-            self.assertEqual(gsmmodem.modem.Call.DTMF_COMMAND_BASE, fakeModem.dtmfCommandBase, 'Invalid base DTMF command for modem: {0}; expected "{1}", got "{2}"'.format(fakeModem, fakeModem.dtmfCommandBase, gsmmodem.modem.Call.DTMF_COMMAND_BASE))
-            # Test sending DTMF tones in a call
-            call = gsmmodem.modem.Call(self.modem, 1, 1, '+270000000')
-            call.answered = True
-            
-            tests = (('3', 'AT{0}3\r'.format(fakeModem.dtmfCommandBase.format(cid=call.id))),
-                     ('1234', 'AT{0}1;{0}2;{0}3;{0}4\r'.format(fakeModem.dtmfCommandBase.format(cid=call.id))),
-                     ('#0*', 'AT{0}#;{0}0;{0}*\r'.format(fakeModem.dtmfCommandBase.format(cid=call.id))))
-
-            for tones, expectedCommand in tests:
-                def writeCallbackFunc(data):
-                    expectedCommand = 'AT{0}{1}\r'.format(fakeModem.dtmfCommandBase.format(cid=call.id), tones[self.currentTone])
-                    self.currentTone += 1;
-                    self.assertEqual(expectedCommand, data, 'Invalid data written to modem for tones: "{0}"; expected "{1}", got: "{2}". Modem: {3}'.format(tones, expectedCommand[:-1].format(cid=self.id), data[:-1] if data[-1] == '\r' else data, fakeModem))
-                set_writeCallbackFunc(writeCallbackFunc)
-                self.currentTone = 0;
-            
-            # Now attempt to send DTMF tones in an inactive call
-            set_writeCallbackFunc()
-            call.hangup()
-            self.assertRaises(gsmmodem.exceptions.InvalidStateException, call.sendDtmfTone, '1')
-            await self.modem.close()
+        for fakeModem in self.fakeModems():
+            with self.subTest(modem=str(fakeModem)):
+                gsmmodem.modem.Call.DTMF_COMMAND_BASE = originalBaseDtmfCommand
+                await self.connectModem(fakeModem)
+                # Make sure everything is set up correctly during connect()
+                self.assertEqual(gsmmodem.modem.Call.DTMF_COMMAND_BASE, fakeModem.dtmfCommandBase, 'Invalid base DTMF command')
+                # Test sending DTMF tones in a call
+                call = gsmmodem.modem.Call(self.modem, 1, 1, '+270000000')
+                call.answered = True
+                # one command per tone; the call ID is filled into the modem's base DTMF command only once
+                base = fakeModem.dtmfCommandBase.format(cid=call.id)
+
+                for tones in ('3', '1234', '#0*'):
+                    script = _ScriptedWrites([('AT{0}{1}\r'.format(base, tone), None) for tone in tones])
+                    with write_callback(script.dispatch):
+                        await call.sendDtmfTone(tones)
+                    script.check(self)
+
+                # Now attempt to send DTMF tones in an inactive call
+                await call.hangup()
+                with self.assertRaises(gsmmodem.exceptions.InvalidStateException):
+                    await call.sendDtmfTone('1')
         gsmmodem.modem.Call.DTMF_COMMAND_BASE = originalBaseDtmfCommand
-    
+
     async def testDtmfInterrupted(self):
         """ Tests interrupting the playback of DTMF tones """
-        await self.init_modem(fakemodems.GenericTestModem())
         call = gsmmodem.modem.Call(self.modem, 1, 1, '+270000000')
         call.answered = True
         # Fake an interruption - no network service
-        set_response_sequence([0.1, '+CME ERROR: 30\r\n'])
-        self.assertRaises(gsmmodem.exceptions.InterruptedException, call.sendDtmfTone, '5')
+        set_response_sequence(['+CME ERROR: 30\r\n'])
+        with self.assertRaises(gsmmodem.exceptions.InterruptedException):
+            await call.sendDtmfTone('5')
         # Fake an interruption - operation not allowed
-        set_response_sequence([0.1, '+CME ERROR: 3\r\n'])
-        self.assertRaises(gsmmodem.exceptions.InterruptedException, call.sendDtmfTone, '5')
+        set_response_sequence(['+CME ERROR: 3\r\n'])
+        with self.assertRaises(gsmmodem.exceptions.InterruptedException):
+            await call.sendDtmfTone('5')
         # Fake some other CME error
-        set_response_sequence([0.1, '+CME ERROR: 1234\r\n'])
-        self.assertRaises(gsmmodem.exceptions.CmeError, call.sendDtmfTone, '5')
-        await self.modem.close()
-        
+        set_response_sequence(['+CME ERROR: 1234\r\n'])
+        with self.assertRaises(gsmmodem.exceptions.CmeError):
+            await call.sendDtmfTone('5')
+
+    async def testCallEndedCallback(self):
+        """ Tests that the call status update callback sees an ended call as inactive """
+        states = []
+        call = gsmmodem.modem.Call(self.modem, 1, 1, '+270000000', lambda call: states.append((call.active, call.answered)))
+        call._answered = True
+        self.modem.activeCalls[call.id] = call
+        await self.modem._handleCallEnded(None, callId=call.id)
+        self.assertEqual([(False, False)], states, 'Callback should see the call as inactive and not answered')
+        self.assertNotIn(call.id, self.modem.activeCalls)
+
     async def testCallAnsweredCallback(self):
         """ Tests Call object's "call answered" callback mechanism """
-        await self.init_modem(fakemodems.GenericTestModem())
-        
         callbackCalled = [False]
         def callbackFunc(callObj):
             self.assertEqual(callObj, call)
@@ -1454,12 +1585,13 @@ class TestCall(IsolatedAsyncioTestCase):
         # Answer the call "remotely" - this should trigger the callback
         call.answered = True
         self.assertTrue(callbackCalled[0], "Call status update callback not called for answer event")
-        await self.modem.close()
 
 
-class TestSms(IsolatedAsyncioTestCase):
+class TestSms(TestUsingMockModem):
     """ Tests the SMS API of GsmModem class """
-    
+
+    log = logging.getLogger('gsmmodem.test.TestSms')
+
     async def asyncSetUp(self):
         self.tests = (('+0123456789', 'Hello world!',                        
                        1,
@@ -1481,19 +1613,39 @@ class TestSms(IsolatedAsyncioTestCase):
                       )
         # address_text data to use for tests when testing PDU mode
         self.testsPduAddressText = ('', '"abc123"', '""', 'Test User 123', '9876543231')
-    
+        return await super().asyncSetUp()
+
     async def initModem(self, smsReceivedCallbackFunc):
-        # Override the pyserial import        
-        self.mockSerial = MockSerialPackage()
-        gsmmodem.serial_comms.serial = self.mockSerial
-        self.modem = gsmmodem.modem.GsmModem('-- PORT IGNORED DURING TESTS --', smsReceivedCallbackFunc=smsReceivedCallbackFunc)        
-        await self.modem.connect()
+        """ Installs the test's SMS received handler (if any) on the modem asyncSetUp() connected - the handler is only
+        needed once +CMTI notifications arrive, so there's no need to reconnect for it """
+        if smsReceivedCallbackFunc is not None:
+            self._smsDone = asyncio.Event()
+            self._smsCallbackError = None
+            async def callbackFunc(sms):
+                # GsmModem logs and swallows callback exceptions, so record failures for _waitForSms() to raise
+                try:
+                    await smsReceivedCallbackFunc(sms)
+                except BaseException as e:
+                    self._smsCallbackError = e
+                finally:
+                    self._smsDone.set()
+            self.modem.smsReceivedCallback = callbackFunc
+
+    async def _waitForSms(self, timeout=5):
+        """ Waits for the SMS received handler to finish, re-raising anything it failed with """
+        try:
+            await asyncio.wait_for(self._smsDone.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.fail(f'SMS received handler not called within {timeout} seconds')
+        self._smsDone.clear()
+        if self._smsCallbackError is not None:
+            raise self._smsCallbackError
 
     async def test_sendSmsLeaveTextModeOnInvalidCharacter(self):
         """ Tests sending SMS messages in text mode """
-        self.initModem(None)
-        self.modem.smsTextMode = True # Set modem to text mode
-        self.assertTrue(self.modem.smsTextMode)
+        await self.initModem(None)
+        await self.modem.smsTextMode(True) # Set modem to text mode
+        self.assertTrue(self.modem._smsTextMode)
         # PDUs checked on https://www.diafaan.com/sms-tutorials/gsm-modem-tutorial/online-sms-pdu-decoder/
         tests = (('+0123456789', 'Helló worłd!',
                   1,
@@ -1535,296 +1687,161 @@ class TestSms(IsolatedAsyncioTestCase):
                   'GSM'),)
 
         for number, message, index, smsTime, smsc, pdus, mem, encoding in tests:
-            def writeCallbackFunc(data):
-                def writeCallbackFunc2(data):
-                    # Second step - get available encoding schemes
-                    self.assertEqual('AT+CSCS=?\r', data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CSCS=?', data))
-                    set_writeCallbackFunc(writeCallbackFunc3)
-
-                def writeCallbackFunc3(data):
-                    # Third step - set encoding
-                    self.assertEqual('AT+CSCS="{0}"\r'.format(encoding), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CSCS="{0}"\r'.format(encoding), data))
-                    set_writeCallbackFunc(writeCallbackFunc4)
-
-                def writeCallbackFunc4(data):
-                    # Fourth step - send PDU length
-                    tpdu_length = pdus[self.currentPdu][1]
-                    ref = pdus[self.currentPdu][2]
-                    self.assertEqual('AT+CMGS={0}\r'.format(tpdu_length), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGS={0}'.format(tpdu_length), data))
-                    set_writeCallbackFunc(writeCallbackFunc5)
-                    self.modem.serial.flushResponseSequence = False
-                    set_response_sequence(['> \r\n', '+CMGS: {0}\r\n'.format(ref), 'OK\r\n'])
-
-                def writeCallbackFuncRaiseError(data):
-                    self.assertEqual(self.currentPdu, len(pdus) - 1, 'Invalid data written to modem; expected {0} PDUs, got {1} PDU'.format(len(pdus), self.currentPdu + 1))
-
-                def writeCallbackFunc5(data):
-                    # Fifth step - send SMS PDU
-                    pdu = pdus[self.currentPdu][0]
-                    self.assertEqual('{0}{1}'.format(pdu, chr(26)), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('{0}{1}'.format(pdu, chr(26)), data))
-                    self.modem.serial.flushResponseSequence = True
-                    self.currentPdu += 1
-                    if len(pdus) > self.currentPdu:
-                        set_writeCallbackFunc(writeCallbackFunc4)
-                    else:
-                        set_writeCallbackFunc(writeCallbackFuncRaiseError)
-
-                # First step - change to PDU mode
-                self.assertEqual('AT+CMGF=0\r', data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGF=0', data))
-                set_writeCallbackFunc(writeCallbackFunc2)
-                self.currentPdu = 0
-                self.modem._smsRef = pdus[self.currentPdu][2]
-
-            set_writeCallbackFunc(writeCallbackFunc)
-            self.modem.serial.flushResponseSequence = True
-            sms = self.modem.sendSms(number, message)
-            self.assertFalse(self.modem.smsTextMode)
-            self.assertEqual(self.modem._smsEncoding, encoding, 'Modem uses invalid encoding. Expected "{0}", got "{1}"'.format(encoding, self.modem._smsEncoding))
-            self.assertIsInstance(sms, gsmmodem.modem.SentSms)
-            self.assertEqual(sms.number, number, 'Sent SMS has invalid number. Expected "{0}", got "{1}"'.format(number, sms.number))
-            self.assertEqual(sms.text, message, 'Sent SMS has invalid text. Expected "{0}", got "{1}"'.format(message, sms.text))
-            self.assertIsInstance(sms.reference, int, 'Sent SMS reference type incorrect. Expected "{0}", got "{1}"'.format(int, type(sms.reference)))
-            ref = pdus[0][2] # All refference numbers should be equal
-            self.assertEqual(sms.reference, ref, 'Sent SMS reference incorrect. Expected "{0}", got "{1}"'.format(ref, sms.reference))
-            self.assertEqual(sms.status, gsmmodem.modem.SentSms.ENROUTE, 'Sent SMS status should have been {0} ("ENROUTE"), but is: {1}'.format(gsmmodem.modem.SentSms.ENROUTE, sms.status))
-            # Reset mode and encoding
-            self.modem._smsTextMode = True # Set modem to text mode
-            self.modem._smsEncoding = "GSM" # Set encoding to GSM-7
-            self.modem._smsSupportedEncodingNames = None # Force modem to ask about possible encoding names
-        await self.modem.close()
+            with self.subTest(number=number, index=index):
+                # switch to PDU mode and set the encoding (the supported encodings are only queried the first time), then write each PDU
+                steps = [('AT+CMGF=0\r', None)]
+                if self.modem._smsSupportedEncodingNames is None:
+                    steps.append(('AT+CSCS=?\r', None))
+                steps.append(('AT+CSCS="{0}"\r'.format(encoding), None))
+                for pdu, tpduLength, ref in pdus:
+                    steps.append((f'AT+CMGS={tpduLength}\r', ['> \r\n']))
+                    steps.append((f'{pdu}{CTRLZ}', [f'+CMGS: {ref}\r\n', _OK]))
+                script = _ScriptedWrites(steps)
+                self.modem._smsRef = pdus[0][2]
+                with write_callback(script.dispatch):
+                    sms = await self.modem.sendSms(number, message)
+                script.check(self)
+                self.assertFalse(self.modem._smsTextMode)
+                self.assertEqual(self.modem._smsEncoding, encoding, 'Modem uses invalid encoding')
+                self.assertIsInstance(sms, SentSms)
+                ref = pdus[0][2] # All refference numbers should be equal
+                self.assertIsInstance(sms.reference, int, 'Sent SMS reference type incorrect')
+                self.assertEqual((sms.number, sms.text, sms.reference, sms.status), (number, message, ref, SentSms.ENROUTE), 'Sent SMS (number, text, reference, status) incorrect')
+                # Reset mode and encoding (the supported encoding names found by the first test are kept)
+                self.modem._smsTextMode = True # Set modem to text mode
+                self.modem._smsEncoding = "GSM" # Set encoding to GSM-7
 
     async def test_sendSmsTextMode(self):
         """ Tests sending SMS messages in text mode """
-        self.initModem(None)
-        self.modem.smsTextMode = True # Set modem to text mode
-        self.assertTrue(self.modem.smsTextMode)
+        await self.initModem(None)
+        await self.modem.smsTextMode(True) # Set modem to text mode
+        self.assertTrue(self.modem._smsTextMode)
         for number, message, index, smsTime, smsc, pdu, tpdu_length, ref, mem in self.tests:
-            self.modem._smsRef = ref
-            def writeCallbackFunc(data):
-                def writeCallbackFunc2(data):
-                    self.assertEqual('{0}{1}'.format(message, chr(26)), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('{0}{1}'.format(message, chr(26)), data))
-                    self.modem.serial.flushResponseSequence = True                
-                self.assertEqual('AT+CMGS="{0}"\r'.format(number), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGS="{0}"'.format(number), data))
-                set_writeCallbackFunc(writeCallbackFunc2)
-            set_writeCallbackFunc(writeCallbackFunc)
-            self.modem.serial.flushResponseSequence = False
-            set_response_sequence(['> \r\n', '+CMGS: {0}\r\n'.format(ref), 'OK\r\n'])
-            sms = self.modem.sendSms(number, message)
-            self.assertIsInstance(sms, gsmmodem.modem.SentSms)
-            self.assertEqual(sms.number, number, 'Sent SMS has invalid number. Expected "{0}", got "{1}"'.format(number, sms.number))
-            self.assertEqual(sms.text, message, 'Sent SMS has invalid text. Expected "{0}", got "{1}"'.format(message, sms.text))
-            self.assertIsInstance(sms.reference, int, 'Sent SMS reference type incorrect. Expected "{0}", got "{1}"'.format(int, type(sms.reference)))
-            self.assertEqual(sms.reference, ref, 'Sent SMS reference incorrect. Expected "{0}", got "{1}"'.format(ref, sms.reference))
-            self.assertEqual(sms.status, gsmmodem.modem.SentSms.ENROUTE, 'Sent SMS status should have been {0} ("ENROUTE"), but is: {1}'.format(gsmmodem.modem.SentSms.ENROUTE, sms.status))
-        await self.modem.close()
-
-    async def test_sendSmsPduMode(self):
-        """ Tests sending a SMS messages in PDU mode """
-        self.initModem(None)
-        self.modem.smsTextMode = False # Set modem to PDU mode
+            with self.subTest(number=number, index=index):
+                self.modem._smsRef = ref
+                script = _ScriptedWrites([(f'AT+CMGS="{number}"\r', ['> \r\n']),
+                                          (f'{message}{CTRLZ}', [f'+CMGS: {ref}\r\n', _OK])])
+                with write_callback(script.dispatch):
+                    sms = await self.modem.sendSms(number, message)
+                script.check(self)
+                self.assertIsInstance(sms, SentSms)
+                self.assertIsInstance(sms.reference, int, 'Sent SMS reference type incorrect')
+                self.assertEqual((sms.number, sms.text, sms.reference, sms.status), (number, message, ref, SentSms.ENROUTE), 'Sent SMS (number, text, reference, status) incorrect')
+
+    async def _sendSmsPdu(self, cmgsResponses, pduResponses):
+        """ Sends each test message in PDU mode, checking every write against a script of expected writes
+
+        :param cmgsResponses: the modem's responses to AT+CMGS
+        :param pduResponses: function returning the modem's responses to the PDU, given the message reference
+        """
+        await self.modem.smsTextMode(False) # Set modem to PDU mode
         self.modem._smsEncoding = "GSM"
-        self.assertFalse(self.modem.smsTextMode)
-        self.firstSMS = True
+        self.assertFalse(self.modem._smsTextMode)
         for number, message, index, smsTime, smsc, pdu, sms_deliver_tpdu_length, ref, mem in self.tests:
-            self.modem._smsRef = ref
-            calcPdu = gsmmodem.pdu.encodeSmsSubmitPdu(number, message, ref)[0]
-            pduHex = codecs.encode(calcPdu.data, 'hex_codec').upper()
-            pduHex = str(pduHex, 'ascii')
+            with self.subTest(number=number, index=index):
+                self.modem._smsRef = ref
+                tpduLength, pduHex = _smsSubmitPduHex(number, message, ref)
+                steps = []
+                if self.modem._smsSupportedEncodingNames is None:
+                    # only the first message queries the supported encodings
+                    steps.append((b'AT+CSCS=?\r', None))
+                steps += [(b'AT+CSCS="GSM"\r', None),
+                          (b'AT+CMGS=%d\r' % tpduLength, cmgsResponses),
+                          (pduHex + _CTRLZ, pduResponses(ref))]
+                script = _ScriptedWrites(steps)
+                with write_callback(script.dispatch, rawWrites=True):
+                    sms = await self.modem.sendSms(number, message)
+                script.check(self)
+                self.assertIsInstance(sms, SentSms)
+                self.assertIsInstance(sms.reference, int, 'Sent SMS reference type incorrect')
+                self.assertEqual((sms.number, sms.text, sms.reference, sms.status), (number, message, ref, SentSms.ENROUTE), 'Sent SMS (number, text, reference, status) incorrect')
 
-            def writeCallbackFunc(data):
-                def writeCallbackFuncReadCSCS(data):
-                    self.assertEqual('AT+CSCS=?\r', data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CSCS=?', data))
-                    self.firstSMS = False
-
-                def writeCallbackFunc2(data):
-                    self.assertEqual('AT+CMGS={0}\r'.format(calcPdu.tpduLength), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGS={0}'.format(calcPdu.tpduLength), data))
-                    set_writeCallbackFunc(writeCallbackFunc3)
-                    self.modem.serial.flushResponseSequence = False
-                    set_response_sequence(['> \r\n', '+CMGS: {0}\r\n'.format(ref), 'OK\r\n'])
-
-                def writeCallbackFunc3(data):
-                    self.assertEqual('{0}{1}'.format(pduHex, chr(26)), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('{0}{1}'.format(pduHex, chr(26)), data))
-                    self.modem.serial.flushResponseSequence = True
-
-                if self.firstSMS:
-                    return writeCallbackFuncReadCSCS(data)
-                self.assertEqual('AT+CSCS="{0}"\r'.format(self.modem._smsEncoding), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CSCS="{0}"'.format(self.modem._smsEncoding), data))
-                set_writeCallbackFunc(writeCallbackFunc2)
-
-            set_writeCallbackFunc(writeCallbackFunc)
-            sms = self.modem.sendSms(number, message)
-            self.assertIsInstance(sms, gsmmodem.modem.SentSms)
-            self.assertEqual(sms.number, number, 'Sent SMS has invalid number. Expected "{0}", got "{1}"'.format(number, sms.number))
-            self.assertEqual(sms.text, message, 'Sent SMS has invalid text. Expected "{0}", got "{1}"'.format(message, sms.text))
-            self.assertIsInstance(sms.reference, int, 'Sent SMS reference type incorrect. Expected "{0}", got "{1}"'.format(int, type(sms.reference)))
-            self.assertEqual(sms.reference, ref, 'Sent SMS reference incorrect. Expected "{0}", got "{1}"'.format(ref, sms.reference))
-            self.assertEqual(sms.status, gsmmodem.modem.SentSms.ENROUTE, 'Sent SMS status should have been {0} ("ENROUTE"), but is: {1}'.format(gsmmodem.modem.SentSms.ENROUTE, sms.status))
-        await self.modem.close()
+    async def test_sendSmsPduMode(self):
+        """ Tests sending a SMS messages in PDU mode """
+        await self.initModem(None)
+        await self._sendSmsPdu((b'> \r\n',), lambda ref: (f'+CMGS: {ref}\r\n', _OK))
 
     async def test_sendSmsResponseMixedWithUnsolictedMessages(self):
         """ Tests sending a SMS messages (PDU mode), but with unsolicted messages mixed into the modem responses
         - the only difference here is that the modem's responseSequence contains unsolicted messages
         taken from github issue #11
         """
-        self.initModem(None)
-        self.modem.smsTextMode = False # Set modem to PDU mode
-        self.modem._smsEncoding = "GSM"
-        self.firstSMS = True
-        for number, message, index, smsTime, smsc, pdu, sms_deliver_tpdu_length, ref, mem in self.tests:
-            self.modem._smsRef = ref
-            calcPdu = gsmmodem.pdu.encodeSmsSubmitPdu(number, message, ref)[0]
-            pduHex = codecs.encode(calcPdu.data, 'hex_codec').upper()
-            pduHex = str(pduHex, 'ascii')
-
-            def writeCallbackFunc(data):
-                def writeCallbackFuncReadCSCS(data):
-                    self.assertEqual('AT+CSCS=?\r', data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CSCS=?', data))
-                    self.firstSMS = False
-
-                def writeCallbackFunc2(data):
-                    self.assertEqual('AT+CMGS={0}\r'.format(calcPdu.tpduLength), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGS={0}'.format(calcPdu.tpduLength), data))
-                    set_writeCallbackFunc(writeCallbackFunc3)
-                    self.modem.serial.flushResponseSequence = True
-                    # Note thee +ZDONR and +ZPASR unsolicted messages in the "response"
-                    set_response_sequence(['+ZDONR: "METEOR",272,3,"CS_ONLY","ROAM_OFF"\r\n', '+ZPASR: "UMTS"\r\n', '> \r\n'])
-
-                def writeCallbackFunc3(data):
-                    self.assertEqual('{0}{1}'.format(pduHex, chr(26)), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('{0}{1}'.format(pduHex, chr(26)), data))
-                    # Note thee +ZDONR and +ZPASR unsolicted messages in the "response"
-                    self.modem.serial.responseSequence =  ['+ZDONR: "METEOR",272,3,"CS_ONLY","ROAM_OFF"\r\n', '+ZPASR: "UMTS"\r\n', '+ZDONR: "METEOR",272,3,"CS_PS","ROAM_OFF"\r\n', '+ZPASR: "UMTS"\r\n', '+CMGS: {0}\r\n'.format(ref), 'OK\r\n']
-
-                if self.firstSMS:
-                    return writeCallbackFuncReadCSCS(data)
-                self.assertEqual('AT+CSCS="{0}"\r'.format(self.modem._smsEncoding), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CSCS="{0}"'.format(self.modem._smsEncoding), data))
-                set_writeCallbackFunc(writeCallbackFunc2)
-
-            set_writeCallbackFunc(writeCallbackFunc)
-            sms = self.modem.sendSms(number, message)
-            self.assertIsInstance(sms, gsmmodem.modem.SentSms)
-            self.assertEqual(sms.number, number, 'Sent SMS has invalid number. Expected "{0}", got "{1}"'.format(number, sms.number))
-            self.assertEqual(sms.text, message, 'Sent SMS has invalid text. Expected "{0}", got "{1}"'.format(message, sms.text))
-            self.assertIsInstance(sms.reference, int, 'Sent SMS reference type incorrect. Expected "{0}", got "{1}"'.format(int, type(sms.reference)))
-            self.assertEqual(sms.reference, ref, 'Sent SMS reference incorrect. Expected "{0}", got "{1}"'.format(ref, sms.reference))
-        await self.modem.close()
+        await self.initModem(None)
+        # Note thee +ZDONR and +ZPASR unsolicted messages in the "responses"
+        await self._sendSmsPdu((_ZDONR_CS_ONLY, _ZPASR_UMTS, b'> \r\n'),
+                               lambda ref: (_ZDONR_CS_ONLY, _ZPASR_UMTS, _ZDONR_CS_PS, _ZPASR_UMTS, f'+CMGS: {ref}\r\n', _OK))
     
-    async def test_receiveSmsTextMode(self):
-        """ Tests receiving SMS messages in text mode """
-        callbackInfo = [False, '', '', -1, None, '', None]
-        def smsReceivedCallbackFuncText(sms):
-            try:
-                self.assertIsInstance(sms, gsmmodem.modem.ReceivedSms)
-                self.assertEqual(sms.number, callbackInfo[1], 'SMS sender number incorrect. Expected: "{0}", got: "{1}"'.format(callbackInfo[1], sms.number))
-                self.assertEqual(sms.text, callbackInfo[2], 'SMS text incorrect. Expected: "{0}", got: "{1}"'.format(callbackInfo[2], sms.text))
-                self.assertIsInstance(sms.time, datetime, 'SMS received time type invalid. Expected: datetime.datetime, got: {0}"'.format(type(sms.time)))
-                self.assertEqual(sms.time, callbackInfo[4], 'SMS received time incorrect. Expected: "{0}", got: "{1}"'.format(callbackInfo[4], sms.time))
-                self.assertEqual(sms.status, gsmmodem.modem.Sms.STATUS_RECEIVED_UNREAD)
-                self.assertEqual(sms.smsc, None, 'Text-mode SMS should not have any SMSC information')
-            finally:
-                callbackInfo[0] = True
-
-        self.initModem(smsReceivedCallbackFunc=smsReceivedCallbackFuncText)
-        self.modem.smsTextMode = True # Set modem to text mode
-        self.assertTrue(self.modem.smsTextMode)
-        for number, message, index, smsTime, smsc, pdu, tpdu_length, ref, mem in self.tests:            
-            # Wait for the handler function to finish
-            callbackInfo[0] = False # "done" flag
-            callbackInfo[1] = number
-            callbackInfo[2] = message
-            callbackInfo[3] = index
-            callbackInfo[4] = smsTime
-            
-            # Time string as returned by modem in text modem
-            tzDelta = smsTime.utcoffset()
-            if tzDelta.days >= 0:
-                tzValStr = '+{0:0>2}'.format(int(tzDelta.seconds / 60 / 15)) # calculate offset in 0.25 hours
-            if tzDelta.days < 0: # negative
-                tzValStr = '-{0:0>2}'.format(int((tzDelta.days * -3600 * 24 - tzDelta.seconds) / 60 / 15))
-            textModeStr = smsTime.strftime('%y/%m/%d,%H:%M:%S') + tzValStr
-            def writeCallbackFunc(data):
-                """ Intercept the "read stored message" command """        
-                def writeCallbackFunc2(data):                    
-                    self.assertEqual('AT+CMGR={0}\r'.format(index), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGR={0}'.format(index), data))
-                    set_response_sequence(['+CMGR: "REC UNREAD","{0}",,"{1}"\r\n'.format(number, textModeStr), '{0}\r\n'.format(message), 'OK\r\n'])
-                    def writeCallbackFunc3(data):
-                        self.assertEqual('AT+CMGD={0},0\r'.format(index), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGD={0}'.format(index), data))
-                    set_writeCallbackFunc(writeCallbackFunc3)
-                if self.modem._smsMemReadDelete != mem:
-                    self.assertEqual('AT+CPMS="{0}"\r'.format(mem), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CPMS="{0}"'.format(mem), data))
-                    set_writeCallbackFunc(writeCallbackFunc2)
-                else:
-                    # Modem does not need to change read memory
-                    writeCallbackFunc2(data)
-            set_writeCallbackFunc(writeCallbackFunc)
+    async def _receiveSms(self, mem, index, cmgrResponses):
+        """ Fakes a +CMTI notification for the stored message at index in memory mem, checking that the modem reads
+        (cmgrResponses answering the AT+CMGR) and then deletes it, and waits for the SMS received handler """
+        script = _ScriptedWrites(_readAndDeleteSteps(self.modem, mem, index, cmgrResponses))
+        with write_callback(script.dispatch):
             # Fake a "new message" notification
-            set_response_sequence(['+CMTI: "{0}",{1}\r\n'.format(mem, index)])
+            send_response_sequence([f'+CMTI: "{mem}",{index}\r\n'])
             # Wait for the handler function to finish
-            while callbackInfo[0] == False:
-                time.sleep(0.1)
-        await self.modem.close()
-        
-    async def test_receiveSmsPduMode(self):
-        """ Tests receiving SMS messages in PDU mode """
-        callbackInfo = [False, '', '', -1, None, '', None]
-        def smsReceivedCallbackFuncPdu(sms):
-            try:
-                self.assertIsInstance(sms, gsmmodem.modem.ReceivedSms)
-                self.assertEqual(sms.number, callbackInfo[1], 'SMS sender number incorrect. Expected: "{0}", got: "{1}"'.format(callbackInfo[1], sms.number))
-                self.assertEqual(sms.text, callbackInfo[2], 'SMS text incorrect. Expected: "{0}", got: "{1}"'.format(callbackInfo[2], sms.text))
-                self.assertIsInstance(sms.time, datetime, 'SMS received time type invalid. Expected: datetime.datetime, got: {0}"'.format(type(sms.time)))
-                self.assertEqual(sms.time, callbackInfo[4], 'SMS received time incorrect. Expected: "{0}", got: "{1}"'.format(callbackInfo[4], sms.time))
-                self.assertEqual(sms.status, gsmmodem.modem.Sms.STATUS_RECEIVED_UNREAD)
-                self.assertEqual(sms.smsc, callbackInfo[5], 'PDU-mode SMS SMSC number incorrect. Expected: "{0}", got: "{1}"'.format(callbackInfo[5], sms.smsc))
-            finally:
-                callbackInfo[0] = True
+            await self._waitForSms()
+            # the message is only deleted once the handler returns - don't let the next notification interrupt that
+            await self.waitFor(lambda: not script.steps, 'Stored SMS not deleted')
+        script.check(self)
 
-        self.initModem(smsReceivedCallbackFunc=smsReceivedCallbackFuncPdu)
-        self.modem.smsTextMode = False # Set modem to PDU mode
-        self.assertFalse(self.modem.smsTextMode)
-        for pduAddressText in self.testsPduAddressText:
-            for number, message, index, smsTime, smsc, pdu, tpdu_length, ref, mem in self.tests:
-                if smsc == None or pdu == None:
-                    continue # not enough info for a PDU test, skip it
-                # Wait for the handler function to finish
-                callbackInfo[0] = False # "done" flag
+    async def test_receiveSmsTextMode(self):
+        """ Tests receiving SMS messages in text mode """
+        callbackInfo = [None, '', '', -1, None, '', None]
+        async def smsReceivedCallbackFuncText(sms):
+            self.assertIsInstance(sms, ReceivedSms)
+            self.assertEqual(sms.number, callbackInfo[1], 'SMS sender number incorrect')
+            self.assertEqual(sms.text, callbackInfo[2], 'SMS text incorrect')
+            self.assertIsInstance(sms.time, datetime, 'SMS received time type invalid')
+            self.assertEqual(sms.time, callbackInfo[4], 'SMS received time incorrect')
+            self.assertEqual(sms.status, Sms.STATUS_RECEIVED_UNREAD)
+            self.assertEqual(sms.smsc, None, 'Text-mode SMS should not have any SMSC information')
+
+        await self.initModem(smsReceivedCallbackFunc=smsReceivedCallbackFuncText)
+        await self.modem.smsTextMode(True) # Set modem to text mode
+        self.assertTrue(self.modem._smsTextMode)
+        for number, message, index, smsTime, smsc, pdu, tpdu_length, ref, mem in self.tests:
+            with self.subTest(number=number, index=index):
                 callbackInfo[1] = number
                 callbackInfo[2] = message
                 callbackInfo[3] = index
                 callbackInfo[4] = smsTime
-                callbackInfo[5] = smsc
-            
-                def writeCallbackFunc(data):
-                    def writeCallbackFunc2(data):
-                        """ Intercept the "read stored message" command """
-                        self.assertEqual('AT+CMGR={0}\r'.format(index), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGR={0}'.format(index), data))
-                        set_response_sequence(['+CMGR: 0,{0},{1}\r\n'.format(pduAddressText, tpdu_length), '{0}\r\n'.format(pdu), 'OK\r\n']                )
-                        def writeCallbackFunc3(data):
-                            self.assertEqual('AT+CMGD={0},0\r'.format(index), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGD={0}'.format(index), data))
-                        set_writeCallbackFunc(writeCallbackFunc3)
-                    if self.modem._smsMemReadDelete != mem:
-                        self.assertEqual('AT+CPMS="{0}"\r'.format(mem), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CPMS="{0}"'.format(mem), data))
-                        set_writeCallbackFunc(writeCallbackFunc2)
-                    else:
-                        # Modem does not need to change read memory
-                        writeCallbackFunc2(data)
-                set_writeCallbackFunc(writeCallbackFunc)
-                # Fake a "new message" notification
-                set_response_sequence(['+CMTI: "SM",{0}\r\n'.format(index)])
-                # Wait for the handler function to finish
-                while callbackInfo[0] == False:
-                    time.sleep(0.1)
-        await self.modem.close()
+                await self._receiveSms(mem, index, [f'+CMGR: "REC UNREAD","{number}",,"{_textModeTimestamp(smsTime)}"\r\n', f'{message}\r\n', _OK])
+
+    async def test_receiveSmsPduMode(self):
+        """ Tests receiving SMS messages in PDU mode """
+        callbackInfo = [None, '', '', -1, None, '', None]
+        async def smsReceivedCallbackFuncPdu(sms):
+            self.assertIsInstance(sms, ReceivedSms)
+            self.assertEqual(sms.number, callbackInfo[1], 'SMS sender number incorrect')
+            self.assertEqual(sms.text, callbackInfo[2], 'SMS text incorrect')
+            self.assertIsInstance(sms.time, datetime, 'SMS received time type invalid')
+            self.assertEqual(sms.time, callbackInfo[4], 'SMS received time incorrect')
+            self.assertEqual(sms.status, Sms.STATUS_RECEIVED_UNREAD)
+            self.assertEqual(sms.smsc, callbackInfo[5], 'PDU-mode SMS SMSC number incorrect')
+
+        await self.initModem(smsReceivedCallbackFunc=smsReceivedCallbackFuncPdu)
+        await self.modem.smsTextMode(False) # Set modem to PDU mode
+        self.assertFalse(self.modem._smsTextMode)
+        for pduAddressText in self.testsPduAddressText:
+            for number, message, index, smsTime, smsc, pdu, tpdu_length, ref, mem in self.tests:
+                with self.subTest(pduAddressText=pduAddressText, number=number, index=index):
+                    if smsc == None or pdu == None:
+                        continue # not enough info for a PDU test, skip it
+                    callbackInfo[1] = number
+                    callbackInfo[2] = message
+                    callbackInfo[3] = index
+                    callbackInfo[4] = smsTime
+                    callbackInfo[5] = smsc
+                    await self._receiveSms(mem, index, [f'+CMGR: 0,{pduAddressText},{tpdu_length}\r\n', f'{pdu}\r\n', _OK])
 
     async def test_sendSms_refCount(self):
         """ Test the SMS reference counter operation when sending SMSs """
-        self.initModem(None)
+        await self.initModem(None)
         
         ref = 0
         def writeCallbackFunc(data):
             if data.startswith('AT+CMGS'):
-                self.modem.serial.flushResponseSequence = False
                 set_response_sequence(['> \r\n', '+CMGS: {0}\r\n'.format(ref), 'OK\r\n'])
-            else:
-                self.modem.serial.flushResponseSequence = True
         set_writeCallbackFunc(writeCallbackFunc)
         
         ref = 0
@@ -1848,254 +1865,211 @@ class TestSms(IsolatedAsyncioTestCase):
     
     async def test_sendSms_waitForDeliveryReport(self):
         """ Test waiting for the status report when sending SMSs """
-        self.initModem(None)
+        await self.initModem(None)
         causeTimeout = [False]
         def writeCallbackFunc(data):
             if data.startswith('AT+CMGS'):
-                self.modem.serial.flushResponseSequence = False
+                set_response_sequence(['> \r\n'])
+            elif data.endswith(CTRLZ):
                 if causeTimeout[0]:
-                    set_response_sequence(['> \r\n', '+CMGS: 183\r\n', 'OK\r\n'])
+                    set_response_sequence(['+CMGS: 183\r\n', _OK])
                 else:
-                    # Fake a delivery report notification after sending SMS
-                    set_response_sequence(['> \r\n', '+CMGS: 183\r\n', 'OK\r\n', 0.1, '+CDSI: "SM",3\r\n'])
+                    # Fake a delivery report notification right after sending the SMS; sendSms() waits for the
+                    # status report event, so the notification needs no delay
+                    set_response_sequence(['+CMGS: 183\r\n', _OK, '+CDSI: "SM",3\r\n'])
             elif data.startswith('AT+CMGR'):
                 # Provide a fake status report - these are tested by the TestSmsStatusReports class
-                set_response_sequence(['+CMGR: 0,,24\r\n', '07917248014000F506B70AA18092020000317071518590803170715185418000\r\n', 'OK\r\n'])
-            else:
-                self.modem.serial.flushResponseSequence = True
+                set_response_sequence(['+CMGR: 0,,24\r\n', '07917248014000F506B70AA18092020000317071518590803170715185418000\r\n', _OK])
         set_writeCallbackFunc(writeCallbackFunc)
         # Prepare send SMS response as well as "delivered" notification
         self.modem._smsRef = 183
-        sms = self.modem.sendSms('0829200000', 'Test message', waitForDeliveryReport=True)
-        self.assertIsInstance(sms, gsmmodem.modem.SentSms)
+        sms = await self.modem.sendSms('0829200000', 'Test message', waitForDeliveryReport=True)
+        self.assertIsInstance(sms, SentSms)
         self.assertNotEqual(sms.report, None, 'Sent SMS\'s "report" attribute should not be None')
-        self.assertIsInstance(sms.report, gsmmodem.modem.StatusReport)
-        self.assertEqual(sms.status, gsmmodem.modem.SentSms.DELIVERED, 'Sent SMS status should have been {0} ("DELIVERED"), but is: {1}'.format(gsmmodem.modem.SentSms.DELIVERED, sms.status))
+        self.assertIsInstance(sms.report, StatusReport)
+        self.assertEqual(sms.status, SentSms.DELIVERED, 'Sent SMS status should have been DELIVERED')
         # Now test timeout event when waiting for delivery report
         causeTimeout[0] = True
         self.modem._smsRef = 183
         # Set deliveryTimeout to 0.05 - should timeout very quickly
-        self.assertRaises(gsmmodem.exceptions.TimeoutException, self.modem.sendSms, **{'destination': '0829200000', 'text': 'Test message', 'waitForDeliveryReport': True, 'deliveryTimeout': 0.05})
-        await self.modem.close()
+        with self.assertRaises(gsmmodem.exceptions.TimeoutException):
+            await self.modem.sendSms('0829200000', 'Test message', waitForDeliveryReport=True, deliveryTimeout=0.05)
+        self.assertIsNone(self.modem._smsStatusReportEvent, 'Status report event not cleared after the delivery timeout')
+        set_writeCallbackFunc()
     
     async def test_sendSms_reply(self):
         """ Test the reply() method of the ReceivedSms class """
-        self.initModem(None)
+        await self.initModem(None)
         
         def writeCallbackFunc(data):
             if data.startswith('AT+CMGS'):
-                self.modem.serial.flushResponseSequence = False
                 set_response_sequence(['> \r\n', '+CMGS: 0\r\n', 'OK\r\n'])
-            else:
-                self.modem.serial.flushResponseSequence = True
         set_writeCallbackFunc(writeCallbackFunc)
         
-        receivedSms = gsmmodem.modem.ReceivedSms(self.modem, gsmmodem.modem.ReceivedSms.STATUS_RECEIVED_READ, '+27820000000', datetime(2013, 3, 8, 15, 2, 16, tzinfo=SimpleOffsetTzInfo(2)), 'Text message', '+9876543210')
+        receivedSms = ReceivedSms(self.modem, ReceivedSms.STATUS_RECEIVED_READ, '+27820000000', datetime(2013, 3, 8, 15, 2, 16, tzinfo=SimpleOffsetTzInfo(2)), 'Text message', '+9876543210')
         sms = receivedSms.reply('This is the reply')
-        self.assertIsInstance(sms, gsmmodem.modem.SentSms)
+        self.assertIsInstance(sms, SentSms)
         self.assertEqual(sms.number, receivedSms.number)
         self.assertEqual(sms.text, 'This is the reply')
         await self.modem.close()
         
     async def test_sendSms_noCgmsResponse(self):
         """ Test GsmModem.sendSms() but issue an invalid response from the modem """
-        self.initModem(None)
+        await self.initModem(None)
         # Modem is just going to respond with "OK" to the send SMS command
         self.assertRaises(gsmmodem.exceptions.CommandError, self.modem.sendSms, '+27820000000', 'Test message')
         await self.modem.close()
 
-class TestStoredSms(IsolatedAsyncioTestCase):
+def _storedSmsFields(sms):
+    """ :return: the fields TestStoredSms compares stored messages by, as one tuple """
+    return sms.number, sms.status, sms.text, sms.time
+
+@functools.lru_cache(maxsize=2)
+def _storedSmsResponses(textMode):
+    """ :return: the fake modem's responses (by command) for listing/reading TestStoredSms's stored messages, built once
+    per mode - the responses are tuples, so tests can only override them in their fake modem clone, not change them here """
+    ok, error = ('OK\r\n',), ('ERROR\r\n',)
+    responses = {}
+    if textMode:
+        responses['AT+CMGL="REC UNREAD"\r'] = ('+CMGL: 0,"REC UNREAD","+27748577604",,"13/01/28,14:51:42+08"\r\n', 'Hello raspberry pi\r\n',
+                                               'OK\r\n')
+        responses['AT+CMGL="REC READ"\r'] = ('+CMGL: 1,"REC READ","+2784000153099999",,"13/02/07,01:31:44+08"\r\n', 'New and here to stay! Don\'t just recharge SUPACHARGE and get your recharged airtime+FREE CellC to CellC mins & SMSs+Free data to use anytime. T&C apply. Cell C\r\n',
+                                             '+CMGL: 2,"REC READ","+27840001463",,"13/02/07,06:24:02+08"\r\n', 'Standard Bank: Your accounts are no longer FICA compliant. Please bring ID & proof of residence to any branch to reactivate your accounts. Queries? 0860003422.\r\n',
+                                             'OK\r\n')
+        responses['AT+CMGL="ALL"\r'] = responses['AT+CMGL="REC UNREAD"\r'][:-1] + responses['AT+CMGL="REC READ"\r']
+        responses.update(dict.fromkeys(('AT+CMGL="STO UNSENT"\r', 'AT+CMGL="STO SENT"\r'), ok))
+        responses.update(dict.fromkeys(('AT+CMGL=0\r', 'AT+CMGL=1\r', 'AT+CMGL=2\r', 'AT+CMGL=3\r', 'AT+CMGL=4\r'), error))
+    else:
+        responses['AT+CMGL=0\r'] = ('+CMGL: 0,0,,35\r\n', '07917248014000F3240B917247587706F400003110824115248012C8329BFD06C9C373B8B82C97E741F034\r\n',
+                                    'OK\r\n') 
+        responses['AT+CMGL=1\r'] = ('+CMGL: 1,1,,161\r\n', '07917248010080F020109172480010359099990000312070101344809FCEF21D14769341E8B2BC0CA2BF41737A381F0211DFEE131DA4AECFE92079798C0ECBCF65D0B40A0D0E9141E9B1080ABBC9A073990ECABFEB7290BC3C4687E5E73219144ECBE9E976796594168BA06199CD1E82E86FD0B0CC660F41EDB47B0E3281A6CDE97C659497CB2072981E06D1DFA0FABC0C0ABBF3F474BBEC02514D4350180E67E75DA06199CD060D01\r\n',
+                                    '+CMGL: 2,1,,159\r\n', '07917248010080F0240B917248001064F30000312070604220809F537AD84D0ECBC92061D8BDD681B2EFBA1C141E8FDF75377D0E0ACBCB20F71BC47EBBCF6539C8981C0641E3771BCE4E87DD741708CA2E87E76590589E769F414922C80482CBDF6F33E86D06C9CBF334B9EC1E9741F43728ECCE83C4F2B07B8C06D1DF2079393CA6A7ED617A19947FD7E5A0F078FCAEBBE97317285A2FCBD3E5F90F04C3D96030D88C2693B900\r\n',
+                                    'OK\r\n')
+        responses['AT+CMGL=4\r'] = responses['AT+CMGL=0\r'][:-1] + responses['AT+CMGL=1\r']
+        responses.update(dict.fromkeys(('AT+CMGL=2\r', 'AT+CMGL=3\r'), ok))
+        responses.update(dict.fromkeys(('AT+CMGL="REC UNREAD"\r', 'AT+CMGL="REC READ"\r', 'AT+CMGL="STO UNSENT"\r', 'AT+CMGL="STO SENT"\r', 'AT+CMGL="ALL"\r'), error))
+        responses['AT+CMGR=0\r'] = ('+CMGR: 0,,35\r\n', '07917248014000F3240B917247587706F400003110824115248012C8329BFD06C9C373B8B82C97E741F034\r\n', 'OK\r\n')
+    return responses
+
+class TestStoredSms(TestUsingMockModem):
     """ Tests processing/accessing SMS messages stored on the SIM card """
-    
+
+    log = logging.getLogger('gsmmodem.test.TestStoredSms')
+    # every test connects to its own stored messages fake modem (see initModem()), so only open the link in asyncSetUp()
+    connectHandshake = False
+
     async def initModem(self, textMode, smsReceivedCallbackFunc):
-        global FAKE_MODEM
-        # Override the pyserial import
-        mockSerial = MockSerialPackage()
-        gsmmodem.serial_comms.serial = mockSerial
-        self.modem = gsmmodem.modem.GsmModem('-- PORT IGNORED DURING TESTS --', smsReceivedCallbackFunc=smsReceivedCallbackFunc)
-        self.modem.smsTextMode = textMode
-        await self.modem.connect()
-        FAKE_MODEM = None
-    
-    async def asyncSetUp(self):
-        self.modem = None
-    
-    async def asyncTearDown(self):
-        if self.modem != None:
-            await self.modem.close()
-    
+        """ Connects the modem to the fake modem set up by initFakeModemResponses(), in the given SMS mode """
+        await self.connectModem(self.fakeModem)
+        if smsReceivedCallbackFunc is not None:
+            self.modem.smsReceivedCallback = smsReceivedCallbackFunc
+        await self.modem.smsTextMode(textMode)
+
     def initFakeModemResponses(self, textMode):
-        global FAKE_MODEM
-        FAKE_MODEM = copy(fakemodems.GenericTestModem())
-        modem = gsmmodem.modem.GsmModem('--weak ref object--')
+        self.fakeModem = self.genericFakeModem(_storedSmsResponses(textMode))
+        # the expected messages only need some modem to (weakly) refer to - no need to create one
+        modem = self.modem
         self.expectedMessages = [ReceivedSms(modem, Sms.STATUS_RECEIVED_UNREAD, '+27748577604', datetime(2013, 1, 28, 14, 51, 42, tzinfo=SimpleOffsetTzInfo(2)), 'Hello raspberry pi', None),
                                  ReceivedSms(modem, Sms.STATUS_RECEIVED_READ, '+2784000153099999', datetime(2013, 2, 7, 1, 31, 44, tzinfo=SimpleOffsetTzInfo(2)), 'New and here to stay! Don\'t just recharge SUPACHARGE and get your recharged airtime+FREE CellC to CellC mins & SMSs+Free data to use anytime. T&C apply. Cell C', None),
-                                 ReceivedSms(modem, Sms.STATUS_RECEIVED_READ, '+27840001463', datetime(2013, 2, 7, 6, 24, 2, tzinfo=SimpleOffsetTzInfo(2)), 'Standard Bank: Your accounts are no longer FICA compliant. Please bring ID & proof of residence to any branch to reactivate your accounts. Queries? 0860003422.')]       
-        if textMode:
-            FAKE_MODEM.responses['AT+CMGL="REC UNREAD"\r'] = ['+CMGL: 0,"REC UNREAD","+27748577604",,"13/01/28,14:51:42+08"\r\n', 'Hello raspberry pi\r\n',
-                                                              'OK\r\n']
-            FAKE_MODEM.responses['AT+CMGL="REC READ"\r'] = ['+CMGL: 1,"REC READ","+2784000153099999",,"13/02/07,01:31:44+08"\r\n', 'New and here to stay! Don\'t just recharge SUPACHARGE and get your recharged airtime+FREE CellC to CellC mins & SMSs+Free data to use anytime. T&C apply. Cell C\r\n',
-                                                            '+CMGL: 2,"REC READ","+27840001463",,"13/02/07,06:24:02+08"\r\n', 'Standard Bank: Your accounts are no longer FICA compliant. Please bring ID & proof of residence to any branch to reactivate your accounts. Queries? 0860003422.\r\n',
-                                                            'OK\r\n']
-            allMessages = FAKE_MODEM.responses['AT+CMGL="REC UNREAD"\r'][:-1]
-            allMessages.extend(FAKE_MODEM.responses['AT+CMGL="REC READ"\r'])
-            FAKE_MODEM.responses['AT+CMGL="ALL"\r'] = allMessages
-            FAKE_MODEM.responses['AT+CMGL="STO UNSENT"\r'] = FAKE_MODEM.responses['AT+CMGL="STO SENT"\r'] = ['OK\r\n']
-            FAKE_MODEM.responses['AT+CMGL=0\r'] = FAKE_MODEM.responses['AT+CMGL=1\r'] = FAKE_MODEM.responses['AT+CMGL=2\r'] = FAKE_MODEM.responses['AT+CMGL=3\r'] = FAKE_MODEM.responses['AT+CMGL=4\r'] = ['ERROR\r\n']
-        else:
-            FAKE_MODEM.responses['AT+CMGL=0\r'] = ['+CMGL: 0,0,,35\r\n', '07917248014000F3240B917247587706F400003110824115248012C8329BFD06C9C373B8B82C97E741F034\r\n',
-                                                   'OK\r\n'] 
-            FAKE_MODEM.responses['AT+CMGL=1\r'] = ['+CMGL: 1,1,,161\r\n', '07917248010080F020109172480010359099990000312070101344809FCEF21D14769341E8B2BC0CA2BF41737A381F0211DFEE131DA4AECFE92079798C0ECBCF65D0B40A0D0E9141E9B1080ABBC9A073990ECABFEB7290BC3C4687E5E73219144ECBE9E976796594168BA06199CD1E82E86FD0B0CC660F41EDB47B0E3281A6CDE97C659497CB2072981E06D1DFA0FABC0C0ABBF3F474BBEC02514D4350180E67E75DA06199CD060D01\r\n',
-                                                   '+CMGL: 2,1,,159\r\n', '07917248010080F0240B917248001064F30000312070604220809F537AD84D0ECBC92061D8BDD681B2EFBA1C141E8FDF75377D0E0ACBCB20F71BC47EBBCF6539C8981C0641E3771BCE4E87DD741708CA2E87E76590589E769F414922C80482CBDF6F33E86D06C9CBF334B9EC1E9741F43728ECCE83C4F2B07B8C06D1DF2079393CA6A7ED617A19947FD7E5A0F078FCAEBBE97317285A2FCBD3E5F90F04C3D96030D88C2693B900\r\n',
-                                                   'OK\r\n']
-            allMessages = FAKE_MODEM.responses['AT+CMGL=0\r'][:-1]
-            allMessages.extend(FAKE_MODEM.responses['AT+CMGL=1\r'])
-            FAKE_MODEM.responses['AT+CMGL=4\r'] = allMessages
-            FAKE_MODEM.responses['AT+CMGL=2\r'] = FAKE_MODEM.responses['AT+CMGL=3\r'] = ['OK\r\n']
-            FAKE_MODEM.responses['AT+CMGL="REC UNREAD"\r'] = FAKE_MODEM.responses['AT+CMGL="REC READ"\r'] = FAKE_MODEM.responses['AT+CMGL="STO UNSENT"\r'] = FAKE_MODEM.responses['AT+CMGL="STO SENT"\r'] = FAKE_MODEM.responses['AT+CMGL="ALL"\r'] = ['ERROR\r\n']
-            FAKE_MODEM.responses['AT+CMGR=0\r'] = ['+CMGR: 0,,35\r\n', '07917248014000F3240B917247587706F400003110824115248012C8329BFD06C9C373B8B82C97E741F034\r\n', 'OK\r\n']
-
-    def test_listStoredSms_pdu(self):
+                                 ReceivedSms(modem, Sms.STATUS_RECEIVED_READ, '+27840001463', datetime(2013, 2, 7, 6, 24, 2, tzinfo=SimpleOffsetTzInfo(2)), 'Standard Bank: Your accounts are no longer FICA compliant. Please bring ID & proof of residence to any branch to reactivate your accounts. Queries? 0860003422.')]
+        self.expectedFields = [_storedSmsFields(sms) for sms in self.expectedMessages]
+
+    async def test_listStoredSms_pdu(self):
         """ Tests listing/reading SMSs that are currently stored on the SIM card (PDU mode) """
         self.initFakeModemResponses(textMode=False)
-        self.initModem(False, None)
+        await self.initModem(False, None)
         # Test getting all messages
         def writeCallbackFunc(data):
-            self.assertEqual('AT+CMGL=4\r', data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGL=4', data))
+            self.assertEqual('AT+CMGL=4\r', data, 'Invalid data written to modem')
         set_writeCallbackFunc(writeCallbackFunc)
-        messages = self.modem.listStoredSms()
+        messages = await self.modem.listStoredSms()
         self.assertIsInstance(messages, list)
-        self.assertEqual(len(messages), 3, 'Invalid number of messages returned; expected 3, got {0}'.format(len(messages)))
+        self.assertEqual(len(messages), 3, 'Invalid number of messages returned')
         
-        for i in range(len(messages)):
-            message = messages[i]
-            expected = self.expectedMessages[i]
-            self.assertIsInstance(message, expected.__class__)
-            self.assertEqual(message.number, expected.number)
-            self.assertEqual(message.status, expected.status)
-            self.assertEqual(message.text, expected.text)
-            self.assertEqual(message.time, expected.time)
-        del messages
+        for message, expected in zip(messages, self.expectedFields):
+            self.assertIsInstance(message, ReceivedSms)
+            self.assertEqual(_storedSmsFields(message), expected)
         
         # Test filtering
         tests = ((Sms.STATUS_RECEIVED_UNREAD, 1), (Sms.STATUS_RECEIVED_READ, 2), (Sms.STATUS_STORED_SENT, 0), (Sms.STATUS_STORED_UNSENT, 0))
         for status, numberOfMessages in tests:
-            def writeCallbackFunc2(data):
-                self.assertEqual('AT+CMGL={0}\r'.format(status), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGL={0}'.format(status), data))
-            set_writeCallbackFunc(writeCallbackFunc2)
-            messages = self.modem.listStoredSms(status=status)
+            script = _ScriptedWrites([(f'AT+CMGL={status}\r', None)])
+            with write_callback(script.dispatch):
+                messages = await self.modem.listStoredSms(status=status)
+            script.check(self)
             self.assertIsInstance(messages, list)
-            self.assertEqual(len(messages), numberOfMessages, 'Invalid number of messages returned for status: {0}; expected {1}, got {2}'.format(status, numberOfMessages, len(messages)))        
-            del messages
+            self.assertEqual(len(messages), numberOfMessages, _LazyMsg(lambda: f'Invalid number of messages returned for status: {status}'))
         
-        # Test deleting messages after retrieval
-        # Test deleting all messages
-        expectedFilter = [4, ['1,4']]
-        delCount = [0]
-        def writeCallbackFunc3(data):
-            self.assertEqual('AT+CMGL={0}\r'.format(expectedFilter[0]), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGL={0}'.format(expectedFilter[0]), data))
-            def writeCallbackFunc4(data):
-                self.assertEqual('AT+CMGD={0}\r'.format(expectedFilter[1][delCount[0]]), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGD={0}'.format(expectedFilter[1][delCount[0]]), data))
-                delCount[0] += 1
-            set_writeCallbackFunc(writeCallbackFunc4)
-        set_writeCallbackFunc(writeCallbackFunc3)
-        messages = self.modem.listStoredSms(status=Sms.STATUS_ALL, delete=True)
-        self.assertIsInstance(messages, list)
-        self.assertEqual(len(messages), 3, 'Invalid number of messages returned; expected 3, got {0}'.format(len(messages)))
-        
-        # Test deleting filtered messages
-        expectedFilter[0] = 1
-        expectedFilter[1] = ['1,0', '2,0']
-        delCount[0] = 0
-        set_writeCallbackFunc(writeCallbackFunc3)
-        messages = self.modem.listStoredSms(status=Sms.STATUS_RECEIVED_READ, delete=True)
+        # Test deleting messages after retrieval: all messages at once, or each of the filtered ones
+        tests = ((Sms.STATUS_ALL, '4', ('1,4',), 3), (Sms.STATUS_RECEIVED_READ, '1', ('1,0', '2,0'), 2))
+        for status, cmglArg, cmgdArgs, numberOfMessages in tests:
+            script = _ScriptedWrites([(f'AT+CMGL={cmglArg}\r', None)] + [(f'AT+CMGD={arg}\r', None) for arg in cmgdArgs])
+            with write_callback(script.dispatch):
+                messages = await self.modem.listStoredSms(status=status, delete=True)
+            script.check(self)
+            self.assertIsInstance(messages, list)
+            self.assertEqual(len(messages), numberOfMessages, _LazyMsg(lambda: f'Invalid number of messages returned for status: {status}'))
         
         # Test error handling if an invalid line is added between PDU data (line should be ignored)
         set_writeCallbackFunc()
-        self.modem.serial.modem.responses['AT+CMGL=4\r'].insert(1, 'AFSDLF SDKFJSKDLFJLKSDJF SJDLKFSKLDJFKSDFS\r\n')
-        messages = self.modem.listStoredSms()
+        responses = self.fakeModem.responses
+        responses['AT+CMGL=4\r'] = responses['AT+CMGL=4\r'][:1] + ('AFSDLF SDKFJSKDLFJLKSDJF SJDLKFSKLDJFKSDFS\r\n',) + responses['AT+CMGL=4\r'][1:]
+        messages = await self.modem.listStoredSms()
         self.assertIsInstance(messages, list)
-        self.assertEqual(len(messages), 3, 'Invalid number of messages returned; expected 3, got {0}'.format(len(messages)))
+        self.assertEqual(len(messages), 3, 'Invalid number of messages returned')
 
-    def test_listStoredSms_text(self):
+    async def test_listStoredSms_text(self):
         """ Tests listing/reading SMSs that are currently stored on the SIM card (text mode) """
         self.initFakeModemResponses(textMode=True)
-        self.initModem(True, None)
+        await self.initModem(True, None)
         
         # Test getting all messages
         def writeCallbackFunc(data):
-            self.assertEqual('AT+CMGL="ALL"\r', data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGL="ALL"', data))
+            self.assertEqual('AT+CMGL="ALL"\r', data, 'Invalid data written to modem')
         set_writeCallbackFunc(writeCallbackFunc)
-        messages = self.modem.listStoredSms()
+        messages = await self.modem.listStoredSms()
         self.assertIsInstance(messages, list)
-        self.assertEqual(len(messages), 3, 'Invalid number of messages returned; expected 3, got {0}'.format(len(messages)))
+        self.assertEqual(len(messages), 3, 'Invalid number of messages returned')
         
-        for i in range(len(messages)):
-            message = messages[i]
-            expected = self.expectedMessages[i]
-            self.assertIsInstance(message, expected.__class__)
-            self.assertEqual(message.number, expected.number)
-            self.assertEqual(message.status, expected.status)
-            self.assertEqual(message.text, expected.text)
-            self.assertEqual(message.time, expected.time)
-        del messages
+        for message, expected in zip(messages, self.expectedFields):
+            self.assertIsInstance(message, ReceivedSms)
+            self.assertEqual(_storedSmsFields(message), expected)
         
         # Test filtering
         tests = ((Sms.STATUS_RECEIVED_UNREAD, 'REC UNREAD', 1), (Sms.STATUS_RECEIVED_READ, 'REC READ', 2), (Sms.STATUS_STORED_SENT, 'STO SENT', 0), (Sms.STATUS_STORED_UNSENT, 'STO UNSENT', 0))
         for status, statusStr, numberOfMessages in tests:
-            def writeCallbackFunc2(data):
-                self.assertEqual('AT+CMGL="{0}"\r'.format(statusStr), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGL="{0}"'.format(statusStr), data))
-            set_writeCallbackFunc(writeCallbackFunc2)
-            messages = self.modem.listStoredSms(status=status)
+            script = _ScriptedWrites([(f'AT+CMGL="{statusStr}"\r', None)])
+            with write_callback(script.dispatch):
+                messages = await self.modem.listStoredSms(status=status)
+            script.check(self)
             self.assertIsInstance(messages, list)
-            self.assertEqual(len(messages), numberOfMessages, 'Invalid number of messages returned for status: {0}; expected {1}, got {2}'.format(status, numberOfMessages, len(messages)))
-            del messages
+            self.assertEqual(len(messages), numberOfMessages, _LazyMsg(lambda: f'Invalid number of messages returned for status: {status}'))
         
-        # Test deleting messages after retrieval
-        # Test deleting all messages
-        expectedFilter = ['ALL', ['1,4']]
-        delCount = [0]
-        def writeCallbackFunc3(data):
-            self.assertEqual('AT+CMGL="{0}"\r'.format(expectedFilter[0]), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGL="{0}"'.format(expectedFilter[0]), data))
-            def writeCallbackFunc4(data):
-                self.assertEqual('AT+CMGD={0}\r'.format(expectedFilter[1][delCount[0]]), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGD={0}'.format(expectedFilter[1][delCount[0]]), data))
-                delCount[0] += 1
-            set_writeCallbackFunc(writeCallbackFunc4)
-        set_writeCallbackFunc(writeCallbackFunc3)
-        messages = self.modem.listStoredSms(status=Sms.STATUS_ALL, delete=True)
-        self.assertIsInstance(messages, list)
-        self.assertEqual(len(messages), 3, 'Invalid number of messages returned; expected 3, got {0}'.format(len(messages)))
-        
-        # Test deleting filtered messages
-        expectedFilter[0] = 'REC READ'
-        expectedFilter[1] = ['1,0', '2,0']
-        delCount[0] = 0
-        set_writeCallbackFunc(writeCallbackFunc3)
-        messages = self.modem.listStoredSms(status=Sms.STATUS_RECEIVED_READ, delete=True)
+        # Test deleting messages after retrieval: all messages at once, or each of the filtered ones
+        tests = ((Sms.STATUS_ALL, '"ALL"', ('1,4',), 3), (Sms.STATUS_RECEIVED_READ, '"REC READ"', ('1,0', '2,0'), 2))
+        for status, cmglArg, cmgdArgs, numberOfMessages in tests:
+            script = _ScriptedWrites([(f'AT+CMGL={cmglArg}\r', None)] + [(f'AT+CMGD={arg}\r', None) for arg in cmgdArgs])
+            with write_callback(script.dispatch):
+                messages = await self.modem.listStoredSms(status=status, delete=True)
+            script.check(self)
+            self.assertIsInstance(messages, list)
+            self.assertEqual(len(messages), numberOfMessages, _LazyMsg(lambda: f'Invalid number of messages returned for status: {status}'))
         
         # Test error handling when specifying an invalid SMS status value
         set_writeCallbackFunc()
-        self.assertRaises(ValueError, self.modem.listStoredSms, **{'status': 99})
+        with self.assertRaises(ValueError):
+            await self.modem.listStoredSms(status=99)
     
-    def test_processStoredSms(self):
+    async def test_processStoredSms(self):
         """ Tests processing and then "receiving" SMSs that are currently stored on the SIM card """
         self.initFakeModemResponses(textMode=False)
         
-        expectedMessages = copy(self.expectedMessages)
-        unread = expectedMessages.pop(0)
-        expectedMessages.append(unread)
+        # messages are "received" in order; only collect them here, as GsmModem swallows exceptions raised by the handler
+        received = []
+        async def smsCallbackFunc(sms):
+            received.append(sms)
         
-        i = [0]
-        def smsCallbackFunc(sms):
-            expected = expectedMessages[i[0]]
-            self.assertIsInstance(sms, ReceivedSms)
-            self.assertEqual(sms.number, expected.number)
-            self.assertEqual(sms.status, expected.status)
-            self.assertEqual(sms.text, expected.text)
-            self.assertEqual(sms.time, expected.time)
-            i[0] += 1
-        
-        self.initModem(False, smsCallbackFunc)
+        await self.initModem(False, smsCallbackFunc)
         
         commandsWritten = [False, False]
         def writeCallbackFunc(data):
@@ -2105,119 +2079,132 @@ class TestStoredSms(IsolatedAsyncioTestCase):
                 commandsWritten[1] = True
         set_writeCallbackFunc(writeCallbackFunc)
         
-        self.modem.processStoredSms()
+        await self.modem.processStoredSms()
         self.assertTrue(commandsWritten[0], 'AT+CMGL command not written to modem')
         self.assertTrue(commandsWritten[1], 'AT+CMGD command not written to modem')
-        self.assertEqual(i[0], 3, 'Message received callback count incorrect; expected 3, got {0}'.format(i[0]))
+        self.assertTrue(all(isinstance(sms, ReceivedSms) for sms in received))
+        # the unread message is "received" last
+        self.assertEqual([_storedSmsFields(sms) for sms in received], self.expectedFields[1:] + self.expectedFields[:1])
         
         # Test unread only
         commandsWritten[0] = commandsWritten[1] = False
-        i[0] = 0
-        expectedMessages = [unread]
-        self.modem.processStoredSms(unreadOnly=True)
+        received.clear()
+        await self.modem.processStoredSms(unreadOnly=True)
         self.assertTrue(commandsWritten[0], 'AT+CMGL command not written to modem')
         self.assertTrue(commandsWritten[1], 'AT+CMGD command not written to modem')
-        self.assertEqual(i[0], 1, 'Message received callback count incorrect; expected 1, got {0}'.format(i[0]))
+        self.assertEqual([_storedSmsFields(sms) for sms in received], self.expectedFields[:1])
     
-    def test_deleteStoredSms(self):
+    async def test_deleteStoredSms(self):
         self.initFakeModemResponses(textMode=True)
-        self.initModem(True, None)
+        await self.initModem(True, None)
         
         tests = (1,2,3)
-        for index in tests:        
-            def writeCallbackFunc(data):
-                self.assertEqual('AT+CMGD={0},0\r'.format(index), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGD={0},0'.format(index), data))
-            set_writeCallbackFunc(writeCallbackFunc)
-            self.modem.deleteStoredSms(index)
-        # Test switching SMS memory
-        tests = ((5, 'TEST1'), (32, 'ME'))
-        for index, mem in tests:
-            def writeCallbackFunc(data):
-                self.assertEqual('AT+CPMS="{0}"\r'.format(mem), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CPMS="{0}"'.format(mem), data))
-                def writeCallbackFunc2(data):
-                    self.assertEqual('AT+CMGD={0},0\r'.format(index), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGD={0},0'.format(index), data))
-                set_writeCallbackFunc(writeCallbackFunc2)
-            set_writeCallbackFunc(writeCallbackFunc)
-            self.modem.deleteStoredSms(index, memory=mem)
+        memTests = ((5, 'TEST1'), (32, 'ME'))
+        # every write the whole test expects, so one script checks them all
+        steps = [(f'AT+CMGD={index},0\r', None) for index in tests]
+        for index, mem in memTests:
+            steps += [(f'AT+CPMS="{mem}"\r', None), (f'AT+CMGD={index},0\r', None)]
+        script = _ScriptedWrites(steps)
+        with write_callback(script.dispatch):
+            for index in tests:
+                await self.modem.deleteStoredSms(index)
+            # Test switching SMS memory
+            for index, mem in memTests:
+                await self.modem.deleteStoredSms(index, memory=mem)
+        script.check(self)
             
-    def test_deleteMultipleStoredSms(self):
+    async def test_deleteMultipleStoredSms(self):
         self.initFakeModemResponses(textMode=True)
-        self.initModem(True, None)
+        await self.initModem(True, None)
         
         tests = (4,3,2,1)
-        for delFlag in tests:        
-            # Test getting all messages
-            def writeCallbackFunc(data):
-                self.assertEqual('AT+CMGD=1,{0}\r'.format(delFlag), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGD=1,{0}'.format(delFlag), data))
-            set_writeCallbackFunc(writeCallbackFunc)
-            self.modem.deleteMultipleStoredSms(delFlag)
-        # Test switching SMS memory
-        tests = ((4, 'TEST1'), (4, 'ME'))
-        for delFlag, mem in tests:
-            def writeCallbackFunc(data):
-                self.assertEqual('AT+CPMS="{0}"\r'.format(mem), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CPMS="{0}"'.format(mem), data))
-                def writeCallbackFunc2(data):
-                    self.assertEqual('AT+CMGD=1,{0}\r'.format(delFlag), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGD=1,{0}'.format(delFlag), data))
-                set_writeCallbackFunc(writeCallbackFunc2)
-            set_writeCallbackFunc(writeCallbackFunc)
-            self.modem.deleteMultipleStoredSms(delFlag, memory=mem)
-        # Test default delFlag value
-        delFlag = 4
-        def writeCallbackFunc3(data):
-            self.assertEqual('AT+CMGD=1,{0}\r'.format(delFlag), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGD=1,{0}'.format(delFlag), data))
-        set_writeCallbackFunc(writeCallbackFunc3)
-        self.modem.deleteMultipleStoredSms()
+        memTests = ((4, 'TEST1'), (4, 'ME'))
+        # every write the whole test expects (the last one deletes with the default delFlag, 4)
+        steps = [(f'AT+CMGD=1,{delFlag}\r', None) for delFlag in tests]
+        for delFlag, mem in memTests:
+            steps += [(f'AT+CPMS="{mem}"\r', None), (f'AT+CMGD=1,{delFlag}\r', None)]
+        steps.append(('AT+CMGD=1,4\r', None))
+        script = _ScriptedWrites(steps)
+        with write_callback(script.dispatch):
+            for delFlag in tests:
+                await self.modem.deleteMultipleStoredSms(delFlag)
+            # Test switching SMS memory
+            for delFlag, mem in memTests:
+                await self.modem.deleteMultipleStoredSms(delFlag, memory=mem)
+            # Test default delFlag value
+            await self.modem.deleteMultipleStoredSms()
+        script.check(self)
         # Test invalid delFlag values
         tests = (0, 5, -3)
         for delFlag in tests:
-            self.assertRaises(ValueError, self.modem.deleteMultipleStoredSms, **{'delFlag': delFlag})
+            with self.assertRaises(ValueError):
+                await self.modem.deleteMultipleStoredSms(delFlag=delFlag)
     
-    def test_readStoredSms_pdu(self):
+    async def test_readStoredSms_pdu(self):
         """ Tests reading stored SMS messages (PDU mode) """
         self.initFakeModemResponses(textMode=False)
-        self.initModem(False, None)
-        
-        # Test basic reading
-        index = 0
-        def writeCallbackFunc(data):
-            self.assertEqual('AT+CMGR={0}\r'.format(index), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGR={0}'.format(index), data))
-        set_writeCallbackFunc(writeCallbackFunc)
-        message = self.modem.readStoredSms(index)
-        expected = self.expectedMessages[index]
-        self.assertIsInstance(message, expected.__class__)
-        self.assertEqual(message.number, expected.number)
-        self.assertEqual(message.status, expected.status)
-        self.assertEqual(message.text, expected.text)
-        self.assertEqual(message.time, expected.time)
+        await self.initModem(False, None)
         
-        # Test switching SMS memory
         tests = ((0, 'TEST1'), (0, 'ME'))
+        # every write the whole test expects: a basic read, then reads that switch the SMS memory first
+        steps = [('AT+CMGR=0\r', None)]
         for index, mem in tests:
-            def writeCallbackFunc(data):
-                self.assertEqual('AT+CPMS="{0}"\r'.format(mem), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CPMS="{0}"'.format(mem), data))
-                def writeCallbackFunc2(data):
-                    self.assertEqual('AT+CMGR={0}\r'.format(index), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGR={0}'.format(index), data))
-                set_writeCallbackFunc(writeCallbackFunc2)
-            set_writeCallbackFunc(writeCallbackFunc)
-            self.modem.readStoredSms(index, memory=mem)
-            expected = self.expectedMessages[index]
-            self.assertIsInstance(message, expected.__class__)
-            self.assertEqual(message.number, expected.number)
-            self.assertEqual(message.status, expected.status)
-            self.assertEqual(message.text, expected.text)
-            self.assertEqual(message.time, expected.time)
-
-
-class TestSmsStatusReports(IsolatedAsyncioTestCase):
+            steps += [(f'AT+CPMS="{mem}"\r', None), (f'AT+CMGR={index}\r', None)]
+        script = _ScriptedWrites(steps)
+        with write_callback(script.dispatch):
+            # Test basic reading
+            message = await self.modem.readStoredSms(0)
+            self.assertIsInstance(message, ReceivedSms)
+            self.assertEqual(_storedSmsFields(message), self.expectedFields[0])
+            
+            # Test switching SMS memory
+            for index, mem in tests:
+                message = await self.modem.readStoredSms(index, memory=mem)
+                self.assertIsInstance(message, ReceivedSms)
+                self.assertEqual(_storedSmsFields(message), self.expectedFields[index])
+        script.check(self)
+
+
+def _statusReportFields(report):
+    """ :return: the fields TestSmsStatusReports compares status reports by, as one tuple """
+    return report.status, report.number, report.reference, report.timeSent, report.timeFinalized, report.deliveryStatus, report.smsc
+
+class TestSmsStatusReports(TestUsingMockModem):
     """ Tests receiving SMS status reports """
-        
-    async def initModem(self, smsStatusReportCallback):
-        # Override the pyserial import        
-        self.mockSerial = MockSerialPackage()
-        gsmmodem.serial_comms.serial = self.mockSerial
-        self.modem = gsmmodem.modem.GsmModem('-- PORT IGNORED DURING TESTS --', smsStatusReportCallback=smsStatusReportCallback)        
-        await self.modem.connect()
-    
+
+    log = logging.getLogger('gsmmodem.test.TestSmsStatusReports')
+
+    async def initModem(self, textMode):
+        """ Switches the modem asyncSetUp() connected to the given SMS mode, and installs the status report handler """
+        self._reportReceived = asyncio.Event()
+        self._report = None
+        self.modem.smsStatusReportCallback = self._statusReportCallback
+        await self.modem.smsTextMode(textMode)
+
+    async def _statusReportCallback(self, report):
+        self._report = report
+        self._reportReceived.set()
+
+    async def _receiveStatusReport(self, mem, index, cmgrResponses, timeout=5):
+        """ Fakes a +CDSI notification for the status report at index in memory mem, checking that the modem reads
+        (cmgrResponses answering the AT+CMGR) and then deletes it
+
+        :return: the status report passed to the modem's status report handler
+        """
+        script = _ScriptedWrites(_readAndDeleteSteps(self.modem, mem, index, cmgrResponses))
+        with write_callback(script.dispatch):
+            # Fake a "new status report" notification
+            send_response_sequence([f'+CDSI: "{mem}",{index}\r\n'])
+            # The report is only passed on once it has been read and deleted
+            try:
+                await asyncio.wait_for(self._reportReceived.wait(), timeout)
+            except asyncio.TimeoutError:
+                self.fail(f'Status report handler not called within {timeout} seconds')
+        self._reportReceived.clear()
+        script.check(self)
+        self.assertIsInstance(self._report, StatusReport)
+        return self._report
+
     async def test_receiveStatusReportTextMode(self):
         """ Tests receiving SMS status reports in text mode """
         
@@ -2231,77 +2218,25 @@ class TestSmsStatusReports(IsolatedAsyncioTestCase):
                   StatusReport.DELIVERED), # delivery status
                  )
         
-        callbackDone = [False]
-        
-        for index, mem, notification, msgStatus, number, reference, sentTime, deliverTime, deliveryStatus in tests:            
-            def smsStatusReportCallbackFuncText(sms):
-                try:
-                    self.assertIsInstance(sms, gsmmodem.modem.StatusReport)
-                    self.assertEqual(sms.status, msgStatus, 'Status report read status incorrect. Expected: "{0}", got: "{1}"'.format(msgStatus, sms.status))
-                    self.assertEqual(sms.number, number, 'SMS sender number incorrect. Expected: "{0}", got: "{1}"'.format(number, sms.number))                    
-                    self.assertEqual(sms.reference, reference, 'Status report SMS reference number incorrect. Expected: "{0}", got: "{1}"'.format(reference, sms.reference))
-                    self.assertIsInstance(sms.timeSent, datetime, 'SMS sent time type invalid. Expected: datetime.datetime, got: {0}"'.format(type(sms.timeSent)))
-                    self.assertEqual(sms.timeSent, sentTime, 'SMS sent time incorrect. Expected: "{0}", got: "{1}"'.format(sentTime, sms.timeSent))
-                    self.assertIsInstance(sms.timeFinalized, datetime, 'SMS finalized time type invalid. Expected: datetime.datetime, got: {0}"'.format(type(sms.timeFinalized)))
-                    self.assertEqual(sms.timeFinalized, deliverTime, 'SMS finalized time incorrect. Expected: "{0}", got: "{1}"'.format(deliverTime, sms.timeFinalized))
-                    self.assertEqual(sms.deliveryStatus, deliveryStatus, 'SMS delivery status incorrect. Expected: "{0}", got: "{1}"'.format(deliveryStatus, sms.deliveryStatus))                
-                    self.assertEqual(sms.smsc, None, 'Text-mode SMS should not have any SMSC information')
-                finally:
-                    callbackDone[0] = True
-            self.initModem(smsStatusReportCallback=smsStatusReportCallbackFuncText)
-            self.modem.smsTextMode = True
-            def writeCallbackFunc(data):
-                def writeCallbackFunc2(data):                    
-                    self.assertEqual('AT+CMGR={0}\r'.format(index), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGR={0}'.format(index), data))
-                    set_response_sequence(['{0}\r\n'.format(notification), 'OK\r\n'])
-                    def writeCallbackFunc3(data):
-                        self.assertEqual('AT+CMGD={0},0\r'.format(index), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGD={0}'.format(index), data))
-                    set_writeCallbackFunc(writeCallbackFunc3)
-                if self.modem._smsMemReadDelete != mem:
-                    self.assertEqual('AT+CPMS="{0}"\r'.format(mem), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CPMS="{0}"'.format(mem), data))
-                    set_writeCallbackFunc(writeCallbackFunc2)
-                else:
-                    # Modem does not need to change read memory
-                    writeCallbackFunc2(data)
-            set_writeCallbackFunc(writeCallbackFunc)
-            # Fake a "new status report" notification
-            set_response_sequence(['+CDSI: "{0}",{1}\r\n'.format(mem, index)])
-            # Wait for the handler function to finish
-            while callbackDone[0] == False:
-                time.sleep(0.1)
-        await self.modem.close()
+        await self.initModem(True)
+        for index, mem, notification, msgStatus, number, reference, sentTime, deliverTime, deliveryStatus in tests:
+            with self.subTest(index=index, mem=mem):
+                report = await self._receiveStatusReport(mem, index, [f'{notification}\r\n', _OK])
+                # Text-mode status reports carry no SMSC information
+                self.assertEqual(_statusReportFields(report), (msgStatus, number, reference, sentTime, deliverTime, deliveryStatus, None))
         
-    def test_receiveSmsPduMode_problemCases(self):
+    async def test_receiveSmsPduMode_problemCases(self):
         """ Test receiving PDU-mode SMS using data captured from failed operations/bug reports """
         # AT+CMGR response from ZTE modem breaks incoming message read - simply test that we can parse it properly
-        zteResponse = ['+CMGR: ,,27\r\n', '0297F1061C0F910B487228297020F5317062419272803170624192138000\r\n', 'OK\r\n']
-        
-        callbackInfo = [False, '', '', -1, None, '', None]
-        def smsCallbackFunc1(sms):
-            try:
-                self.assertIsInstance(sms, gsmmodem.modem.StatusReport)
-                # Since the +CMGR response did not include the SMS's status, see if the default fallback was loaded correctly
-                self.assertEqual(sms.status, gsmmodem.modem.Sms.STATUS_RECEIVED_UNREAD)
-            finally:
-                callbackInfo[0] = True
-        
-        def writeCallback1(data):
-            if data.startswith('AT+CMGR'):
-                self.modem.serial.flushResponseSequence = True
-                self.modem.serial.responseSequence = zteResponse
-
-        self.initModem(smsStatusReportCallback=smsCallbackFunc1)
-        # Fake a "new message" notification
-        set_writeCallbackFunc(writeCallback1)
-        set_response_sequence(['+CDSI: "SM",1\r\n'])
-        # Wait for the handler function to finish
-        while callbackInfo[0] == False:
-            time.sleep(0.1)
+        await self.initModem(False)
+        report = await self._receiveStatusReport('SM', 1, [_ZTE_CMGR_STATUS_REPORT])
+        # Since the +CMGR response did not include the SMS's status, see if the default fallback was loaded correctly
+        self.assertEqual(report.status, Sms.STATUS_RECEIVED_UNREAD)
         
     async def test_receiveStatusReportPduMode(self):
         """ Tests receiving SMS status reports in PDU mode """
         tests = ((3, 'SM',
-                  ['+CMGR: 0,,24\r\n', '07917248014000F506B70AA18092020000317071518590803170715185418000\r\n', 'OK\r\n'],
+                  [b'+CMGR: 0,,24\r\n07917248014000F506B70AA18092020000317071518590803170715185418000\r\nOK\r\n'],
                   Sms.STATUS_RECEIVED_UNREAD, # message read status 
                   '0829200000', # number
                   183, # reference
@@ -2309,7 +2244,7 @@ class TestSmsStatusReports(IsolatedAsyncioTestCase):
                   datetime(2013, 7, 17, 15, 58, 14, tzinfo=SimpleOffsetTzInfo(2)), # deliverTime
                   StatusReport.DELIVERED), # delivery status
                  (1, 'SM', # This output was captured from a ZTE modem that seems to be broken (PDU is semi-invalid (SMSC length incorrect), and +CMGR output missing status)
-                  ['+CMGR: ,,27\r\n', '0297F1061C0F910B487228297020F5317062419272803170624192138000\r\n', 'OK\r\n'],
+                  [_ZTE_CMGR_STATUS_REPORT],
                   Sms.STATUS_RECEIVED_UNREAD,
                   '+b08427829207025', # <-- note the broken number
                   28,
@@ -2318,50 +2253,15 @@ class TestSmsStatusReports(IsolatedAsyncioTestCase):
                   StatusReport.DELIVERED),
                  )
         
-        callbackDone = [False]
-        
+        await self.initModem(False)
         for index, mem, responseSeq, msgStatus, number, reference, sentTime, deliverTime, deliveryStatus in tests:
-            callbackDone[0] = False
-            def smsStatusReportCallbackFuncText(sms):
-                try:
-                    self.assertIsInstance(sms, gsmmodem.modem.StatusReport)
-                    self.assertEqual(sms.status, msgStatus, 'Status report read status incorrect. Expected: "{0}", got: "{1}"'.format(msgStatus, sms.status))
-                    self.assertEqual(sms.number, number, 'SMS sender number incorrect. Expected: "{0}", got: "{1}"'.format(number, sms.number))
-                    self.assertEqual(sms.reference, reference, 'Status report SMS reference number incorrect. Expected: "{0}", got: "{1}"'.format(reference, sms.reference))
-                    self.assertIsInstance(sms.timeSent, datetime, 'SMS sent time type invalid. Expected: datetime.datetime, got: {0}"'.format(type(sms.timeSent)))
-                    self.assertEqual(sms.timeSent, sentTime, 'SMS sent time incorrect. Expected: "{0}", got: "{1}"'.format(sentTime, sms.timeSent))
-                    self.assertIsInstance(sms.timeFinalized, datetime, 'SMS finalized time type invalid. Expected: datetime.datetime, got: {0}"'.format(type(sms.timeFinalized)))
-                    self.assertEqual(sms.timeFinalized, deliverTime, 'SMS finalized time incorrect. Expected: "{0}", got: "{1}"'.format(deliverTime, sms.timeFinalized))
-                    self.assertEqual(sms.deliveryStatus, deliveryStatus, 'SMS delivery status incorrect. Expected: "{0}", got: "{1}"'.format(deliveryStatus, sms.deliveryStatus))                
-                    self.assertEqual(sms.smsc, None, 'Text-mode SMS should not have any SMSC information')
-                finally:
-                    callbackDone[0] = True
-            self.initModem(smsStatusReportCallback=smsStatusReportCallbackFuncText)
-            self.modem.smsTextMode = False
-            def writeCallbackFunc(data):
-                def writeCallbackFunc2(data):                    
-                    self.assertEqual('AT+CMGR={0}\r'.format(index), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGR={0}'.format(index), data))
-                    self.modem.serial.responseSequence = responseSeq
-                    def writeCallbackFunc3(data):
-                        self.assertEqual('AT+CMGD={0},0\r'.format(index), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CMGD={0}'.format(index), data))
-                    set_writeCallbackFunc(writeCallbackFunc3)
-                if self.modem._smsMemReadDelete != mem:
-                    self.assertEqual('AT+CPMS="{0}"\r'.format(mem), data, 'Invalid data written to modem; expected "{0}", got: "{1}"'.format('AT+CPMS="{0}"'.format(mem), data))
-                    set_writeCallbackFunc(writeCallbackFunc2)
-                else:
-                    # Modem does not need to change read memory
-                    writeCallbackFunc2(data)
-            set_writeCallbackFunc(writeCallbackFunc)
-            # Fake a "new status report" notification
-            set_response_sequence(['+CDSI: "{0}",{1}\r\n'.format(mem, index)])
-            # Wait for the handler function to finish
-            while callbackDone[0] == False:
-                time.sleep(0.1)
-        await self.modem.close()
+            with self.subTest(index=index, mem=mem):
+                report = await self._receiveStatusReport(mem, index, responseSeq)
+                self.assertEqual(_statusReportFields(report), (msgStatus, number, reference, sentTime, deliverTime, deliveryStatus, None))
 
-    def test_receiveSmsPduMode_invalidPDUsRecordedFromModems(self):
+    async def test_receiveSmsPduMode_invalidPDUsRecordedFromModems(self):
         """ Test receiving PDU-mode SMS using data captured from failed operations/bug reports """
-        tests = ((['+CMGR: 1,,26\r\n', '0006230E9126983575169498610103409544C26101034095448200\r\n', 'OK\r\n'], # see: babca/python-gsmmodem#15
+        tests = (([b'+CMGR: 1,,26\r\n0006230E9126983575169498610103409544C26101034095448200\r\nOK\r\n'], # see: babca/python-gsmmodem#15
                   Sms.STATUS_RECEIVED_READ, # message read status
                   '+62895357614989', # number
                   35, # reference
@@ -2370,37 +2270,11 @@ class TestSmsStatusReports(IsolatedAsyncioTestCase):
                   StatusReport.DELIVERED), # delivery status
                  )
 
-        callbackDone = [False]
-
+        await self.initModem(False)
         for modemResponse, msgStatus, number, reference, sentTime, deliverTime, deliveryStatus in tests:
-            def smsCallbackFunc1(sms):
-                try:
-                    self.assertIsInstance(sms, gsmmodem.modem.StatusReport)
-                    self.assertEqual(sms.status, msgStatus, 'Status report read status incorrect. Expected: "{0}", got: "{1}"'.format(msgStatus, sms.status))
-                    self.assertEqual(sms.number, number, 'SMS sender number incorrect. Expected: "{0}", got: "{1}"'.format(number, sms.number))
-                    self.assertEqual(sms.reference, reference, 'Status report SMS reference number incorrect. Expected: "{0}", got: "{1}"'.format(reference, sms.reference))
-                    self.assertIsInstance(sms.timeSent, datetime, 'SMS sent time type invalid. Expected: datetime.datetime, got: {0}"'.format(type(sms.timeSent)))
-                    self.assertEqual(sms.timeSent, sentTime, 'SMS sent time incorrect. Expected: "{0}", got: "{1}"'.format(sentTime, sms.timeSent))
-                    self.assertIsInstance(sms.timeFinalized, datetime, 'SMS finalized time type invalid. Expected: datetime.datetime, got: {0}"'.format(type(sms.timeFinalized)))
-                    self.assertEqual(sms.timeFinalized, deliverTime, 'SMS finalized time incorrect. Expected: "{0}", got: "{1}"'.format(deliverTime, sms.timeFinalized))
-                    self.assertEqual(sms.deliveryStatus, deliveryStatus, 'SMS delivery status incorrect. Expected: "{0}", got: "{1}"'.format(deliveryStatus, sms.deliveryStatus))
-                    self.assertEqual(sms.smsc, None, 'This SMS should not have any SMSC information')
-                finally:
-                    callbackDone[0] = True
-
-            def writeCallback1(data):
-                if data.startswith('AT+CMGR'):
-                    self.modem.serial.flushResponseSequence = True
-                    self.modem.serial.responseSequence = modemResponse
-
-            self.initModem(smsStatusReportCallback=smsCallbackFunc1)
-            # Fake a "new message" notification
-            set_writeCallbackFunc(writeCallback1)
-            self.modem.serial.flushResponseSequence = True
-            set_response_sequence(['+CDSI: "SM",1\r\n'])
-            # Wait for the handler function to finish
-            while callbackDone[0] == False:
-                time.sleep(0.1)
+            with self.subTest(number=number, reference=reference):
+                report = await self._receiveStatusReport('SM', 1, modemResponse)
+                self.assertEqual(_statusReportFields(report), (msgStatus, number, reference, sentTime, deliverTime, deliveryStatus, None))
 
 if __name__ == "__main__":
     logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.DEBUG)
@@ -83,6 +83,17 @@ class MockSerialPackage(object):
     class SerialException(Exception):
         """ Mock Serial Exception """
 
+class TestResponseTerm(unittest.TestCase):
+    """ Tests detection of command response terminator lines """
+
+    def test_responseTerm(self):
+        """ Tests lines that should (and should not) terminate a command response """
+        for line in ('OK', 'ERROR', '+CME ERROR: 11', '+CMS ERROR: 500', 'COMMAND NOT SUPPORT'):
+            self.assertTrue(gsmmodem.serial_comms._is_response_term(line), 'Line not detected as response terminator: "{0}"'.format(line))
+        for line in ('', '+CME ERROR: ', '+CMS ERROR: abc', '+CUSD: 2,"OK",15', 'COMMAND NOT SUPPORTED', '> '):
+            self.assertFalse(gsmmodem.serial_comms._is_response_term(line), 'Line incorrectly detected as response terminator: "{0}"'.format(line))
+
+
 class TestNotifications(unittest.TestCase):
     """ Tests reading unsolicited notifications from the serial devices """
     
@@ -69,6 +69,8 @@ class TestUtil(unittest.TestCase):
             self.assertEqual(tz.utcoffset(None), timedelta(hours=hours))
             self.assertEqual(tz.dst(None), timedelta(0))
             self.assertIsInstance(tz.__repr__(), str)
+        for hours, expected in ((2, '+08'), (-4, '-16'), (0, '+00'), (3.5, '+14'), (-0.25, '-01'), (12, '+48')):
+            self.assertEqual(SimpleOffsetTzInfo(hours).textModeTzStr, expected)
 
     def test_removeAtPrefix(self):
         """ Tests function: removeAtPrefix"""
@@ -14,7 +14,7 @@ def parseArgs():
     from argparse import ArgumentParser
     parser = ArgumentParser(description='User-friendly terminal for interacting with a connected GSM modem.')
     parser.add_argument('port', metavar='PORT', help='port to which the GSM modem is connected; a number or a device name.')
-    parser.add_argument('-b', '--baud', metavar='BAUDRATE', default=115200, help='set baud rate')
+    parser.add_argument('-b', '--baud', metavar='BAUDRATE', type=int, default=115200, help='set baud rate')
     parser.add_argument('-r', '--raw',  action='store_true', help='switch to raw terminal mode')
     return parser.parse_args()
 
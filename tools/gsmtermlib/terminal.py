@@ -109,6 +109,10 @@ class RawTerm(SerialComms):
 
     EXIT_CHARACTER = '\x1d'   # CTRL+]
     WRITE_TERM = '\r' # Write terminator character
+    # Typed characters are held back and written to the modem a whole line at a time (one serial write instead
+    # of one per keypress); these control characters (CTRL+C, CTRL+Z, ESC) are passed on right away, however
+    FLUSH_CHARACTERS = ('\x03', serial.to_bytes([3]), '\x1a', '\x1b')
+    WRITE_BUFFER_SIZE = 64 # Maximum number of characters held back before writing them anyway
 
     def __init__(self, port, baudrate=9600):
         super(RawTerm, self).__init__(port, baudrate, notifyCallbackFunc=self._handleModemNotification)
@@ -140,6 +144,7 @@ class RawTerm(SerialComms):
 
     def _inputLoop(self):
         """ Loop and copy console->serial until EXIT_CHARCTER character is found. """
+        txBuffer = []
         try:
             while self.alive:
                 try:
@@ -150,15 +155,26 @@ class RawTerm(SerialComms):
                 if c == self.EXIT_CHARACTER:
                     self.stop()
                 elif c == '\n':
-                    # Convert newline input into \r
-                    self.serial.write(self.WRITE_TERM)
+                    # Convert newline input into \r, and write the whole line at once
+                    txBuffer.append(self.WRITE_TERM)
+                    self.serial.write(''.join(txBuffer))
+                    txBuffer = []
                     if self.echo:
                         # Locally just echo the real newline
                         sys.stdout.write(c)
                         sys.stdout.flush()
                 else:
                     #print('writing: ', c)
-                    self.serial.write(c)
+                    if c in self.FLUSH_CHARACTERS:
+                        if txBuffer:
+                            self.serial.write(''.join(txBuffer))
+                            txBuffer = []
+                        self.serial.write(c)
+                    else:
+                        txBuffer.append(c)
+                        if len(txBuffer) >= self.WRITE_BUFFER_SIZE:
+                            self.serial.write(''.join(txBuffer))
+                            txBuffer = []
                     if self.echo:
                         sys.stdout.write(c)
                         sys.stdout.flush()
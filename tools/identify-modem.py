@@ -14,12 +14,16 @@ import sys
 from gsmmodem.modem import GsmModem
 from gsmmodem.exceptions import PinRequiredError, IncorrectPinError
 
+# AT commands whose (raw) responses are dumped in debug mode
+DEBUG_COMMANDS = ('ATI', 'AT+CGMI', 'AT+CGMM', 'AT+CGMR', 'AT+CFUN=?', 'AT+WIND=?', 'AT+WIND?', 'AT+CPMS=?',
+                  'AT+CNMI=?', 'AT+CVHU=?', 'AT+CSMP?', 'AT+GCAP', 'AT+CPIN?', 'AT+CLAC')
+
 def parseArgs():
     """ Argument parser for Python 2.7 and above """
     from argparse import ArgumentParser
     parser = ArgumentParser(description='Identify and debug attached GSM modem')
     parser.add_argument('port', metavar='PORT', help='port to which the GSM modem is connected; a number or a device name.')
-    parser.add_argument('-b', '--baud', metavar='BAUDRATE', default=115200, help='set baud rate')
+    parser.add_argument('-b', '--baud', metavar='BAUDRATE', type=int, default=115200, help='set baud rate')
     parser.add_argument('-p', '--pin', metavar='PIN', default=None, help='SIM card PIN')
     parser.add_argument('-d', '--debug',  action='store_true', help='dump modem debug information (for python-gsmmodem development)')
     parser.add_argument('-w', '--wait', type=int, default=0, help='Wait for modem to start, in seconds')
@@ -43,20 +47,9 @@ async def main():
     if args.debug:
         # Print debug info
         print('\n== MODEM DEBUG INFORMATION ==\n')
-        print('ATI', await modem.write('ATI', parseError=False))
-        print('AT+CGMI:', await modem.write('AT+CGMI', parseError=False))
-        print('AT+CGMM:', await modem.write('AT+CGMM', parseError=False))
-        print('AT+CGMR:', await modem.write('AT+CGMR', parseError=False))
-        print('AT+CFUN=?:', await modem.write('AT+CFUN=?', parseError=False))
-        print('AT+WIND=?:', await modem.write('AT+WIND=?', parseError=False))
-        print('AT+WIND?:', await modem.write('AT+WIND?', parseError=False))
-        print('AT+CPMS=?:', await modem.write('AT+CPMS=?', parseError=False))
-        print('AT+CNMI=?:', await modem.write('AT+CNMI=?', parseError=False))
-        print('AT+CVHU=?:', await modem.write('AT+CVHU=?', parseError=False))
-        print('AT+CSMP?:', await modem.write('AT+CSMP?', parseError=False))
-        print('AT+GCAP:', await modem.write('AT+GCAP', parseError=False))
-        print('AT+CPIN?', await modem.write('AT+CPIN?', parseError=False))
-        print('AT+CLAC:', await modem.write('AT+CLAC', parseError=False))
+        # one at a time: SerialComms collects a single response at a time, so commands can't be in flight together
+        for command in DEBUG_COMMANDS:
+            print(command + ':', await modem.write(command, parseError=False))
         print()
     else:
         # Print basic info
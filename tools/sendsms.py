@@ -8,16 +8,16 @@ Simple script to send an SMS message
 """
 import asyncio
 import sys, logging
+from argparse import ArgumentParser
 
 from gsmmodem.modem import GsmModem, SentSms
 from gsmmodem.exceptions import TimeoutException, PinRequiredError, IncorrectPinError
 
-def parseArgs():
-    """ Argument parser for Python 2.7 and above """
-    from argparse import ArgumentParser
+def _buildParser():
+    """ Builds the command line argument parser """
     parser = ArgumentParser(description='Simple script for sending SMS messages')
     parser.add_argument('-i', '--port', metavar='PORT', help='port to which the GSM modem is connected; a number or a device name.')
-    parser.add_argument('-b', '--baud', metavar='BAUDRATE', default=115200, help='set baud rate')
+    parser.add_argument('-b', '--baud', metavar='BAUDRATE', type=int, default=115200, help='set baud rate')
     parser.add_argument('-p', '--pin', metavar='PIN', default=None, help='SIM card PIN')
     parser.add_argument('-d', '--deliver', action='store_true', help='wait for SMS delivery report')
     parser.add_argument('-w', '--wait', type=int, default=0, help='Wait for modem to start, in seconds')
@@ -25,7 +25,13 @@ def parseArgs():
     parser.add_argument('--debug', action='store_true', help='turn on debug (serial port dump)')
     parser.add_argument('destination', metavar='DESTINATION', help='destination mobile number')
     parser.add_argument('message', nargs='?', metavar='MESSAGE', help='message to send, defaults to stdin-prompt')
-    return parser.parse_args()
+    return parser
+
+_PARSER = _buildParser()
+
+def parseArgs():
+    """ Argument parser for Python 2.7 and above """
+    return _PARSER.parse_args()
 
 async def main():
     args = parseArgs()
@@ -33,49 +39,58 @@ async def main():
         sys.stderr.write('Error: No port specified. Please specify the port to which the GSM modem is connected using the -i argument.\n')
         return
 
-    modem = GsmModem(args.port, args.baud, AT_CNMI=args.CNMI)
     if args.debug:
         # enable dump on serial port
         logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.DEBUG)
-    
-    print('Connecting to GSM modem on {0}...'.format(args.port))
-    try:
-        await modem.connect(args.pin, waitingForModemToStartInSeconds=args.wait)
-    except PinRequiredError:
-        sys.stderr.write('Error: SIM card PIN required. Please specify a PIN with the -p argument.\n')
-        return
-    except IncorrectPinError:
-        sys.stderr.write('Error: Incorrect SIM card PIN entered.\n')
-        return
-    print('Checking for network coverage...')
-    try:
-        await modem.waitForNetworkCoverage(5)
-    except TimeoutException:
-        print('Network signal strength is not sufficient, please adjust modem position/antenna and try again.')
-        await modem.close()
-        return
-    else:
+
+    # every step below waits on AT command round trips, so don't let the serial driver hold back responses
+    # (the modem gets closed on leaving the async with block, whichever way that happens)
+    async with GsmModem(args.port, args.baud, AT_CNMI=args.CNMI, lowLatency=True, fastInit=True) as modem:
+        print('Connecting to GSM modem on {0}...'.format(args.port))
+        # connect in the background while the user types the message (if it wasn't given on the command line)
+        connectTask = asyncio.create_task(modem.connect(args.pin, waitingForModemToStartInSeconds=args.wait))
         if args.message is None:
             print('\nPlease type your message and press enter to send it:')
-            text = raw_input('> ')
+            try:
+                text = await asyncio.get_running_loop().run_in_executor(None, input, '> ')
+            except BaseException:
+                # e.g. EOF (ctrl-D): stop connecting before the modem gets closed
+                connectTask.cancel()
+                try:
+                    await connectTask
+                except BaseException:
+                    pass
+                raise
         else:
             text = args.message
+        try:
+            await connectTask
+        except PinRequiredError:
+            sys.stderr.write('Error: SIM card PIN required. Please specify a PIN with the -p argument.\n')
+            return
+        except IncorrectPinError:
+            sys.stderr.write('Error: Incorrect SIM card PIN entered.\n')
+            return
+        print('Checking for network coverage...')
+        try:
+            await modem.waitForNetworkCoverage(5)
+        except TimeoutException:
+            print('Network signal strength is not sufficient, please adjust modem position/antenna and try again.')
+            return
+        sendTask = asyncio.create_task(modem.sendSms(args.destination, text, waitForDeliveryReport=args.deliver))
         if args.deliver:
             print ('\nSending SMS and waiting for delivery report...')
         else:
             print('\nSending SMS message...')
         try:
-            sms = await modem.sendSms(args.destination, text, waitForDeliveryReport=args.deliver)
+            sms = await sendTask
         except TimeoutException:
             sys.stderr.write('Failed to send message: the send operation timed out')
-            await modem.close()
             return
-        else:
-            await modem.close()
-            if sms.report:
-                print('Message sent{0}'.format(' and delivered OK.' if sms.status == SentSms.DELIVERED else ', but delivery failed.'))
-            else:
-                print('Message sent.')
+    if sms.report:
+        print('Message sent{0}'.format(' and delivered OK.' if sms.status == SentSms.DELIVERED else ', but delivery failed.'))
+    else:
+        print('Message sent.')
 
 if __name__ == '__main__':
     asyncio.run(main())